@@ -5,30 +5,28 @@ import modal
 from dotenv import load_dotenv
 
 from src.etl import extract, load, transform
+from src.etl.extract.runner import Deadline
+from src.etl.fingerprint import compute_input_fingerprint, resolve_updated_extracts
+from src.utils.logging_config import setup_logging
+from src.utils.metrics import emit_run_report, metrics
+from src.utils.modal_image import FUNCTION_CPU, FUNCTION_MEMORY_MIB, modal_image
+from src.utils.profiling import disable_profiling, enable_profiling
 
-app = modal.App('box-office-tracking')
+RUN_TIMEOUT_SECONDS = 60 * 20
+# Kept free at the end of a run for fingerprint, transform and load;
+# extraction defers whatever is left once it would cut into this
+TRANSFORM_LOAD_RESERVE_SECONDS = 5 * 60
 
-modal_image = (
-    modal.Image.debian_slim(python_version='3.12')
-    .pip_install_from_pyproject('pyproject.toml')
-    .add_local_file(
-        'src/duckdb_databases/.gitkeep',
-        remote_path='/root/src/duckdb_databases/.gitkeep',
-        copy=True,
-    )
-    .add_local_dir(
-        'src/sqlmesh_project/',
-        remote_path='/root/src/sqlmesh_project',
-    )
-    .add_local_python_source('src')
-)
+app = modal.App('box-office-tracking')
 
 
 @app.function(
     image=modal_image,
     schedule=modal.Cron('0 7 * * *'),
     secrets=[modal.Secret.from_name('box-office-tracking-secrets')],
-    timeout=60 * 20,
+    timeout=RUN_TIMEOUT_SECONDS,
+    cpu=FUNCTION_CPU,
+    memory=FUNCTION_MEMORY_MIB,
     retries=modal.Retries(
         max_retries=3,
         backoff_coefficient=1.0,
@@ -38,16 +36,47 @@ modal_image = (
 def run_pipeline(
     extract_names: list[str] | None = None,
     years: list[int] | None = None,
+    full_rewrite: bool | None = None,
+    profile: bool = False,
+    profile_output: str | None = None,
+    force: bool = False,
 ):
+    setup_logging()
+    deadline = Deadline.after(RUN_TIMEOUT_SECONDS - TRANSFORM_LOAD_RESERVE_SECONDS)
+
     if years is None:
         current_year = datetime.date.today().year
         years = [current_year, current_year - 1]
-    extract_errors = extract(extract_names=extract_names, years=years)
-    transform()
-    load()
 
-    if extract_errors:
-        failed = ', '.join(name for name, _ in extract_errors)
+    metrics.reset()
+    if profile:
+        enable_profiling(profile_output)
+    try:
+        extract_result = extract(
+            extract_names=extract_names, years=years, deadline=deadline, force=force
+        )
+
+        with metrics.timer('fingerprint'):
+            input_fingerprint = compute_input_fingerprint()
+        if full_rewrite:
+            updated_extracts = None
+        else:
+            updated_extracts = resolve_updated_extracts(
+                extract_result.updated, input_fingerprint
+            )
+
+        transform(updated_extracts=updated_extracts)
+        load(
+            full_rewrite=full_rewrite,
+            updated_extracts=updated_extracts,
+            input_fingerprint=input_fingerprint,
+        )
+    finally:
+        emit_run_report('daily')
+        disable_profiling()
+
+    if extract_result.errors:
+        failed = ', '.join(name for name, _ in extract_result.errors)
         raise RuntimeError(f'Extraction failed for: {failed}')
 
 
@@ -60,7 +89,7 @@ if __name__ == '__main__':
         nargs='+',
         help=(
             'Extract(s) to run by name (e.g. --extracts release_domestic worldwide_box_office). '
-            'Use --extracts all to force all extracts regardless of schedule.'
+            'Defaults to all extracts.'
         ),
     )
     parser.add_argument(
@@ -75,6 +104,37 @@ if __name__ == '__main__':
         default=None,
         help='Last year to extract (inclusive). Defaults to current_year.',
     )
+    parser.add_argument(
+        '--full-rewrite',
+        action='store_true',
+        default=None,
+        help=(
+            'Republish every daily_ranks partition and its combined data.parquet. '
+            'Defaults to a full rewrite on Sundays and delta publishing otherwise.'
+        ),
+    )
+    parser.add_argument(
+        '--force',
+        '--ignore-ttl',
+        action='store_true',
+        help=(
+            'Scrape every release of the release-level extracts, ignoring the '
+            'refresh TTLs and weekday shards.'
+        ),
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Profile each extract, transform and load (stack samples + tracemalloc).',
+    )
+    parser.add_argument(
+        '--profile-output',
+        default=None,
+        help=(
+            'Local directory or s3://bucket/prefix for profile reports. '
+            'Defaults to s3://$S3_BUCKET/profiles.'
+        ),
+    )
     args = parser.parse_args()
 
     current_year = datetime.date.today().year
@@ -84,4 +144,11 @@ if __name__ == '__main__':
         parser.error(f'--start-year ({start}) must be <= --end-year ({end}).')
     years = list(range(start, end + 1))
 
-    run_pipeline.local(extract_names=args.extracts, years=years)
+    run_pipeline.local(
+        extract_names=args.extracts,
+        years=years,
+        full_rewrite=args.full_rewrite,
+        profile=args.profile,
+        profile_output=args.profile_output,
+        force=args.force,
+    )
@@ -4,7 +4,10 @@ Deploys as a separate Modal app that runs daily. Each run:
 1. Discovers which years (1977 to current) are missing data in S3
 2. Picks the most recent missing year
 3. Runs all 5 extracts for that year (in dependency order)
-4. Self-completes when all years have data
+4. Once all years have data, fills release-level gaps: releases in a year's
+   release_id_lookup that a dependent extract has no raw partition for are
+   scraped again, and only those
+5. Self-completes when no year and no release is missing
 
 Deploy:
     uv run modal deploy backfill.py
@@ -25,13 +28,21 @@ import modal
 from dotenv import load_dotenv
 
 from src.etl import extract
+from src.etl.extract.runner import Deadline
 from src.utils.logging_config import setup_logging
-from src.utils.s3_utils import list_year_partitions
-
-setup_logging()
+from src.utils.metrics import emit_run_report, metrics
+from src.utils.modal_image import FUNCTION_CPU, FUNCTION_MEMORY_MIB, modal_image
+from src.utils.profiling import disable_profiling, enable_profiling
+from src.utils.s3_utils import list_year_partitions, read_json_from_s3, write_json_to_s3
 
 EARLIEST_YEAR = 1977
 
+RUN_TIMEOUT_SECONDS = 60 * 40
+# Kept free at the end of a run for writing state and the run report
+FINAL_RESERVE_SECONDS = 2 * 60
+# Release-level extracts get no per-year time budget here (time_budget=None):
+# the backfill catches up in bulk, so only the run deadline defers releases
+
 # Extracts partitioned by release_year (independent, run first)
 INDEPENDENT_EXTRACTS = [
     'worldwide_box_office',
@@ -45,22 +56,13 @@ DEPENDENT_EXTRACTS = [
     'release_worldwide_snapshot',
 ]
 
-app = modal.App('box-office-tracking-backfill')
+# Repair attempts per missing release (extract -> item_id -> attempts). Some
+# pages never yield rows (no daily table, no regional tables); they are given
+# up on after MAX_GAP_ATTEMPTS attempts rather than fetched on every run.
+GAP_ATTEMPTS_KEY = 'extract_state/backfill_gaps.json'
+MAX_GAP_ATTEMPTS = 3
 
-modal_image = (
-    modal.Image.debian_slim(python_version='3.12')
-    .pip_install_from_pyproject('pyproject.toml')
-    .add_local_file(
-        'src/duckdb_databases/.gitkeep',
-        remote_path='/root/src/duckdb_databases/.gitkeep',
-        copy=True,
-    )
-    .add_local_dir(
-        'src/sqlmesh_project/',
-        remote_path='/root/src/sqlmesh_project',
-    )
-    .add_local_python_source('src')
-)
+app = modal.App('box-office-tracking-backfill')
 
 
 def find_missing_years() -> list[int]:
@@ -87,46 +89,163 @@ def find_missing_years() -> list[int]:
     return missing
 
 
+def find_release_gaps(years: list[int] | None = None) -> dict[int, dict[str, set[str]]]:
+    """Return the release IDs missing from the dependent extracts, per year.
+
+    A release is missing from an extract when it is in the year's latest
+    release_id_lookup partition but the extract has no raw partition for
+    it. Each extract's raw prefix is listed once as the index of stored IDs.
+    Releases already attempted MAX_GAP_ATTEMPTS times are left out.
+
+    Args:
+        years: Years to check. Defaults to every year with release_id_lookup
+            data.
+
+    Returns:
+        year -> extract -> missing IDs, for the years with any missing.
+    """
+    from src.etl.extract.releases import (
+        RELEASE_URL_COLUMNS,
+        lookup_release_ids,
+        stored_release_ids,
+    )
+
+    if years is None:
+        years = sorted(list_year_partitions('release_id_lookup'), reverse=True)
+
+    stored = {name: stored_release_ids(name) for name in DEPENDENT_EXTRACTS}
+    attempts = read_json_from_s3(GAP_ATTEMPTS_KEY) or {}
+
+    gaps = {}
+    for year in years:
+        lookup_ids = lookup_release_ids(year)
+        for name in DEPENDENT_EXTRACTS:
+            tried = attempts.get(name, {})
+            missing = {
+                item_id
+                for item_id in lookup_ids[RELEASE_URL_COLUMNS[name]] - stored[name]
+                if tried.get(item_id, 0) < MAX_GAP_ATTEMPTS
+            }
+            if missing:
+                gaps.setdefault(year, {})[name] = missing
+    return gaps
+
+
+def _record_gap_attempts(
+    release_ids: dict[str, set[str]], errors: list[tuple[str, Exception]]
+) -> None:
+    """Count an attempt for the scheduled IDs that were scraped but not stored.
+
+    IDs that were deferred or failed (an outage, say) are retried without
+    using up an attempt. All IDs of an extract that failed outright count as
+    failed. Counts of IDs that have a raw partition by now are dropped.
+
+    Args:
+        release_ids: Extract -> IDs scheduled in the run.
+        errors: (extract_name, exception) failures of the run.
+    """
+    from src.etl.extract.refresh_policy import read_deferred
+    from src.etl.extract.releases import stored_release_ids
+
+    errors_by_name = dict(errors)
+    attempts = read_json_from_s3(GAP_ATTEMPTS_KEY) or {}
+    for name, item_ids in release_ids.items():
+        failed = set()
+        if name in errors_by_name:
+            failed = set(getattr(errors_by_name[name], 'failed_ids', item_ids))
+        stored = stored_release_ids(name)
+        tried = {
+            item_id: count
+            for item_id, count in attempts.get(name, {}).items()
+            if item_id not in stored
+        }
+        for item_id in item_ids - read_deferred(name) - stored - failed:
+            tried[item_id] = tried.get(item_id, 0) + 1
+        attempts[name] = tried
+    write_json_to_s3(attempts, GAP_ATTEMPTS_KEY)
+
+
 @app.function(
     image=modal_image,
     schedule=modal.Cron('30 8 * * *'),
     secrets=[modal.Secret.from_name('box-office-tracking-secrets')],
-    timeout=60 * 40,
+    timeout=RUN_TIMEOUT_SECONDS,
+    cpu=FUNCTION_CPU,
+    memory=FUNCTION_MEMORY_MIB,
     retries=modal.Retries(
         max_retries=2,
         backoff_coefficient=1.0,
         initial_delay=60.0,
     ),
 )
-def run_backfill(year_override: int | None = None):
+def run_backfill(
+    year_override: int | None = None,
+    profile: bool = False,
+    profile_output: str | None = None,
+):
     """Process one missing year of backfill data.
 
+    Once no year is missing, scrape the releases missing from the dependent
+    extracts instead (see find_release_gaps).
+
     Args:
         year_override: If provided, process this specific year instead
             of auto-discovering.
+        profile: Profile each extract and write reports to profile_output.
+        profile_output: Local directory or s3://bucket/prefix for profile
+            reports. Defaults to s3://$S3_BUCKET/profiles.
     """
+    setup_logging()
+    deadline = Deadline.after(RUN_TIMEOUT_SECONDS - FINAL_RESERVE_SECONDS)
+
+    gaps = None
     if year_override is not None:
         target_year = year_override
         logging.info(f'Backfill: processing override year {target_year}.')
     else:
         missing = find_missing_years()
-        if not missing:
-            logging.info('Backfill complete: all years 1977-present have data.')
-            return
-        target_year = missing[0]
-        logging.info(
-            f'Backfill: {len(missing)} years remaining. '
-            f'Processing year {target_year}.'
-        )
+        if missing:
+            target_year = missing[0]
+            logging.info(
+                f'Backfill: {len(missing)} years remaining. '
+                f'Processing year {target_year}.'
+            )
+        else:
+            gaps = find_release_gaps()
+            if not gaps:
+                logging.info(
+                    'Backfill complete: all years 1977-present and their '
+                    'releases have data.'
+                )
+                return
+            logging.info(
+                f'Backfill: all years have data; {len(gaps)} years have '
+                'releases missing from dependent extracts.'
+            )
+
+    metrics.reset()
+    if profile:
+        enable_profiling(profile_output)
+    try:
+        if gaps:
+            _fill_release_gaps(gaps, deadline)
+        else:
+            _run_backfill_year(target_year, [target_year], deadline)
+    finally:
+        emit_run_report('backfill')
+        disable_profiling()
 
-    years = [target_year]
 
+def _run_backfill_year(
+    target_year: int, years: list[int], deadline: Deadline | None = None
+) -> None:
     # Phase 1: independent extracts (worldwide_box_office, release_id_lookup)
     logging.info(f'Backfill phase 1: independent extracts for {target_year}.')
     phase1_errors = extract(
         extract_names=INDEPENDENT_EXTRACTS,
         years=years,
-    )
+        deadline=deadline,
+    ).errors
 
     if phase1_errors:
         failed = ', '.join(name for name, _ in phase1_errors)
@@ -137,7 +256,9 @@ def run_backfill(year_override: int | None = None):
     phase2_errors = extract(
         extract_names=DEPENDENT_EXTRACTS,
         years=years,
-    )
+        deadline=deadline,
+        time_budget=None,
+    ).errors
 
     if phase2_errors:
         failed = ', '.join(name for name, _ in phase2_errors)
@@ -146,6 +267,42 @@ def run_backfill(year_override: int | None = None):
     logging.info(f'Backfill: year {target_year} complete.')
 
 
+def _fill_release_gaps(
+    gaps: dict[int, dict[str, set[str]]], deadline: Deadline | None = None
+) -> None:
+    """Scrape only the missing releases, most recent year first."""
+    errors = []
+    for year in sorted(gaps, reverse=True):
+        if deadline and not deadline.allows(0):
+            logging.warning('Backfill: run deadline reached, leaving remaining gaps.')
+            break
+
+        release_ids = gaps[year]
+        for name, item_ids in release_ids.items():
+            metrics.increment('release_gaps', len(item_ids), extract=name)
+        logging.info(
+            f'Backfill: filling gaps for {year}: '
+            + ', '.join(f'{name} {len(ids)}' for name, ids in release_ids.items())
+        )
+        result = extract(
+            extract_names=[name for name in DEPENDENT_EXTRACTS if name in release_ids],
+            years=[year],
+            deadline=deadline,
+            release_ids=release_ids,
+            time_budget=None,
+        )
+        errors += result.errors
+
+        try:
+            _record_gap_attempts(release_ids, result.errors)
+        except Exception as e:
+            logging.warning(f'Backfill: could not record gap attempts: {e}')
+
+    if errors:
+        failed = ', '.join(sorted({name for name, _ in errors}))
+        raise RuntimeError(f'Backfill gap repair failed: {failed}')
+
+
 if __name__ == '__main__':
     load_dotenv()
 
@@ -156,6 +313,23 @@ if __name__ == '__main__':
         default=None,
         help='Specific year to backfill. If omitted, auto-discovers next missing year.',
     )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Profile each extract (stack samples + tracemalloc).',
+    )
+    parser.add_argument(
+        '--profile-output',
+        default=None,
+        help=(
+            'Local directory or s3://bucket/prefix for profile reports. '
+            'Defaults to s3://$S3_BUCKET/profiles.'
+        ),
+    )
     args = parser.parse_args()
 
-    run_backfill.local(year_override=args.year)
+    run_backfill.local(
+        year_override=args.year,
+        profile=args.profile,
+        profile_output=args.profile_output,
+    )
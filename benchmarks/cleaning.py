@@ -0,0 +1,134 @@
+"""Check and time the vectorized page text cleaning against its scalar reference.
+
+Collects the page text the parsers put in money, count, opening and date
+columns from the synthetic HTML corpus in benchmarks/fixtures/boxofficemojo,
+repeats it up to --rows values, and cleans it both per cell with the scalar
+helpers in src/etl/extract/cleaning.py and per column with the vectorized
+functions. Exits non-zero when the two disagree on any value.
+
+Run:
+    uv run python -m benchmarks.cleaning
+    uv run python -m benchmarks.cleaning --rows 1000000
+"""
+
+import argparse
+import sys
+import time
+from collections.abc import Callable
+
+import pyarrow as pa
+
+from benchmarks.parsers import _url, load_fixture_pages
+from src.etl.extract import cleaning
+from src.etl.extract.tables import release_metadata, release_worldwide_snapshot
+from src.utils.scraping import make_soup
+
+DEFAULT_ROWS = 200_000
+NULL_SAMPLES = ['-', '–', '—', 'N/A', '']
+
+
+def _reference_opening(index: int) -> Callable[[str | None], int | None]:
+    def reference(text: str | None) -> int | None:
+        value = cleaning.parse_opening(text)[index]
+        return int(value) if value else None
+
+    return reference
+
+
+def _vectorized_opening(
+    extract: Callable,
+) -> Callable[[pa.ChunkedArray], pa.ChunkedArray]:
+    return lambda values: cleaning.integers(extract(values))
+
+
+# column kind -> (scalar reference per cell, vectorized function per column)
+CLEANERS = {
+    'integer': (cleaning.parse_integer, cleaning.integers),
+    'date': (cleaning.parse_date, cleaning.dates),
+    'close_date': (
+        cleaning.parse_close_date,
+        lambda values: cleaning.dates(cleaning.close_dates(values)),
+    ),
+    'opening_amount': (
+        _reference_opening(0),
+        _vectorized_opening(cleaning.opening_amounts),
+    ),
+    'opening_theaters': (
+        _reference_opening(1),
+        _vectorized_opening(cleaning.opening_theaters),
+    ),
+}
+
+
+def collect_page_text() -> dict[str, list[str | None]]:
+    """Page text of the fixture corpus by column kind."""
+    text = {kind: list(NULL_SAMPLES) for kind in CLEANERS}
+    for page, html in load_fixture_pages('release'):
+        metadata = release_metadata.parse_release_metadata(
+            make_soup(html), page.split('/')[-1]
+        )
+        text['integer'].append(metadata.get('widest_release'))
+        text['date'].append(metadata.get('release_date'))
+        text['close_date'].append(metadata.get('release_date'))
+        text['opening_amount'].append(metadata.get('opening'))
+        text['opening_theaters'].append(metadata.get('opening'))
+    for page, html in load_fixture_pages('releasegroup'):
+        records = release_worldwide_snapshot.parse_releasegroup(
+            make_soup(html), _url(page)
+        ).to_table()
+        text['integer'] += records['opening'].to_pylist()
+        text['integer'] += records['total_gross'].to_pylist()
+        text['date'] += records['release_date'].to_pylist()
+    return text
+
+
+def benchmark_kind(kind: str, values: list[str | None], rows: int) -> dict:
+    reference, vectorized = CLEANERS[kind]
+    values = (values * (rows // len(values) + 1))[:rows]
+    column = pa.chunked_array([pa.array(values, pa.string())])
+
+    started = time.perf_counter()
+    expected = [reference(value) for value in values]
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = vectorized(column).to_pylist()
+    vectorized_seconds = time.perf_counter() - started
+
+    mismatches = sorted(
+        {
+            (value, want, got)
+            for value, want, got in zip(values, expected, actual)
+            if want != got
+        },
+        key=str,
+    )
+    return {
+        'rows': rows,
+        'scalar_ms': round(scalar_seconds * 1000, 1),
+        'vectorized_ms': round(vectorized_seconds * 1000, 1),
+        'speedup': round(scalar_seconds / vectorized_seconds, 1),
+        'mismatches': mismatches,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Check and time vectorized page text cleaning.'
+    )
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS)
+    args = parser.parse_args()
+
+    failed = False
+    print(f'{"column":<18}{"rows":>10}{"scalar ms":>12}{"vector ms":>12}{"speedup":>9}')
+    for kind, values in collect_page_text().items():
+        result = benchmark_kind(kind, values, args.rows)
+        print(
+            f'{kind:<18}{result["rows"]:>10}{result["scalar_ms"]:>12}'
+            f'{result["vectorized_ms"]:>12}{result["speedup"]:>8}x'
+        )
+        for value, want, got in result['mismatches']:
+            failed = True
+            print(f'  {value!r}: reference {want!r}, vectorized {got!r}')
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,105 @@
+"""Import-time benchmark of the pipeline entry points.
+
+Each entry point is imported in a fresh interpreter (the cost a Modal cold
+start pays before any work happens) several times, and the median wall time
+is reported along with the heaviest packages it pulled in according to
+python -X importtime.
+
+Run:
+    uv run python -m benchmarks.import_time
+    uv run python -m benchmarks.import_time --entry-points app extract:release_metadata
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from src import project_root
+from src.etl.extract.main import EXTRACT_MODULES
+
+DEFAULT_REPEATS = 5
+TOP_N_PACKAGES = 5
+PROJECT_PACKAGES = {'app', 'backfill', 'benchmarks', 'src'}
+
+# name -> statement that loads what the entry point needs before doing work
+ENTRY_POINTS = {
+    'app': 'import app',
+    'backfill': 'import backfill',
+    'extract': 'import src.etl.extract.main',
+    **{
+        f'extract:{name}': (
+            'from src.etl.extract.main import get_extract_module; '
+            f'get_extract_module({name!r})'
+        )
+        for name in EXTRACT_MODULES
+    },
+    'transform': 'import src.etl.transform.main',
+    'load': 'import src.etl.load.main',
+}
+
+
+def _run(statement: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    code = (
+        'import time; start = time.perf_counter(); '
+        f'{statement}; '
+        'print(time.perf_counter() - start)'
+    )
+    return subprocess.run(
+        [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', code],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def heaviest_packages(importtime_log: str, top_n: int = TOP_N_PACKAGES) -> dict:
+    """Return the third-party packages with the largest cumulative import time (ms)."""
+    packages: dict[str, int] = {}
+    for line in importtime_log.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        package = name.strip().split('.')[0]
+        if package in PROJECT_PACKAGES:
+            continue
+        packages[package] = max(packages.get(package, 0), int(cumulative))
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {package: round(us / 1000, 1) for package, us in ranked[:top_n]}
+
+
+def benchmark_entry_point(statement: str, repeats: int = DEFAULT_REPEATS) -> dict:
+    """Import an entry point in fresh interpreters and time it."""
+    seconds = [float(_run(statement).stdout.split()[-1]) for _ in range(repeats)]
+    return {
+        'median_ms': round(statistics.median(seconds) * 1000, 1),
+        'min_ms': round(min(seconds) * 1000, 1),
+        'heaviest_packages_ms': heaviest_packages(
+            _run(statement, importtime=True).stderr
+        ),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark entry point imports.')
+    parser.add_argument('--entry-points', nargs='+', choices=list(ENTRY_POINTS))
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--json', type=Path, help='Also write results to this file.')
+    args = parser.parse_args()
+
+    results = {}
+    for name, statement in ENTRY_POINTS.items():
+        if args.entry_points and name not in args.entry_points:
+            continue
+        results[name] = benchmark_entry_point(statement, repeats=args.repeats)
+        packages = ', '.join(
+            f'{package} {ms}'
+            for package, ms in results[name]['heaviest_packages_ms'].items()
+        )
+        print(f'{name:<36} {results[name]["median_ms"]:>8} ms  ({packages})')
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + '\n')
@@ -0,0 +1,264 @@
+"""Offline benchmark of the Box Office Mojo page parsers.
+
+Runs every page parser in src/etl/extract/tables against the HTML corpus
+in benchmarks/fixtures/boxofficemojo (no network) and reports pages/second,
+per-page latency percentiles and peak traced memory. Results are compared
+against benchmarks/baselines/parsers.json and the command exits non-zero
+when a parser regresses beyond the tolerance.
+
+The committed corpus is synthetic: hand-built pages that follow the markup
+the parsers target, with made-up titles and figures. It exercises the same
+code paths as live pages but not their exact size or quirks; run --record
+to replace it with pages downloaded from boxofficemojo.com.
+
+Run:
+    uv run python -m benchmarks.parsers                    # compare to baseline
+    uv run python -m benchmarks.parsers --update-baseline  # store a new baseline
+    uv run python -m benchmarks.parsers --record           # refresh fixtures
+"""
+
+import argparse
+import gc
+import json
+import logging
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from io import StringIO
+from pathlib import Path
+
+from src.etl.extract.tables import (
+    release_domestic,
+    release_id_lookup,
+    release_metadata,
+    release_worldwide_snapshot,
+    worldwide_box_office,
+)
+from src.utils.scraping import create_scrape_session, make_soup
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures' / 'boxofficemojo'
+BASELINE_PATH = Path(__file__).parent / 'baselines' / 'parsers.json'
+BOX_OFFICE_MOJO_BASE = 'https://www.boxofficemojo.com'
+
+DEFAULT_MIN_SECONDS = 2.0
+DEFAULT_TOLERANCE = 0.5
+
+
+def _url(page: str) -> str:
+    return f'{BOX_OFFICE_MOJO_BASE}/{page}/'
+
+
+# parser name -> (fixture page prefix, fn(page, html) -> records parsed). The
+# release extracts are timed through parse_page(), the function their parse
+# stage calls, so typing the page text into the raw schema is included.
+PARSERS: dict[str, tuple[str, Callable[[str, str], int]]] = {
+    'worldwide_box_office.parse_year_world': (
+        'year/world',
+        lambda page, html: len(worldwide_box_office.parse_year_world(html)),
+    ),
+    'release_id_lookup.parse_releasegroup_records': (
+        'year/world',
+        lambda page, html: len(
+            release_id_lookup.parse_releasegroup_records(make_soup(html))
+        ),
+    ),
+    'release_id_lookup.parse_domestic_release_url': (
+        'releasegroup',
+        lambda page, html: int(
+            release_id_lookup.parse_domestic_release_url(make_soup(html), _url(page))
+            is not None
+        ),
+    ),
+    'release_worldwide_snapshot.parse_page': (
+        'releasegroup',
+        lambda page, html: release_worldwide_snapshot.parse_page(
+            html, page.split('/')[-1], _url(page)
+        ).num_rows,
+    ),
+    'release_metadata.parse_page': (
+        'release',
+        lambda page, html: release_metadata.parse_page(
+            html, page.split('/')[-1], _url(page)
+        ).num_rows,
+    ),
+    'release_domestic.parse_release_domestic': (
+        'release',
+        lambda page, html: len(
+            release_domestic.parse_release_domestic(StringIO(html), page.split('/')[-1])
+        ),
+    ),
+}
+
+
+def load_fixture_pages(prefix: str) -> list[tuple[str, str]]:
+    """Return (page, html) for every saved page under a fixture prefix."""
+    return [
+        (str(path.parent.relative_to(FIXTURES_DIR)), path.read_text())
+        for path in sorted((FIXTURES_DIR / prefix).glob('**/index.html'))
+    ]
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def benchmark_parser(
+    parse: Callable[[str, str], int],
+    pages: list[tuple[str, str]],
+    min_seconds: float = DEFAULT_MIN_SECONDS,
+) -> dict[str, float]:
+    """Time a parser over the pages until at least min_seconds have elapsed."""
+    for page, html in pages:
+        parse(page, html)
+
+    tracemalloc.start()
+    peak_bytes = 0
+    for page, html in pages:
+        gc.collect()
+        tracemalloc.reset_peak()
+        parse(page, html)
+        peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    latencies = []
+    records = 0
+    started = time.perf_counter()
+    while not latencies or time.perf_counter() - started < min_seconds:
+        for page, html in pages:
+            start = time.perf_counter()
+            records += parse(page, html)
+            latencies.append(time.perf_counter() - start)
+    elapsed = sum(latencies)
+
+    latencies.sort()
+    return {
+        'pages': len(latencies),
+        'records_per_page': round(records / len(latencies), 1),
+        'pages_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 3),
+        'p90_ms': round(_percentile(latencies, 90) * 1000, 3),
+        'p99_ms': round(_percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'peak_kib': round(peak_bytes / 1024, 1),
+    }
+
+
+def run(
+    parsers: list[str] | None = None, min_seconds: float = DEFAULT_MIN_SECONDS
+) -> dict[str, dict[str, float]]:
+    results = {}
+    for name, (prefix, parse) in PARSERS.items():
+        if parsers and name not in parsers:
+            continue
+        pages = load_fixture_pages(prefix)
+        if not pages:
+            logging.warning(f'No fixtures under {prefix} for {name}.')
+            continue
+        results[name] = benchmark_parser(parse, pages, min_seconds=min_seconds)
+    return results
+
+
+def compare_to_baseline(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> list[str]:
+    """Return a message for every parser whose p50 or peak memory regressed."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            logging.warning(f'No baseline for {name}.')
+            continue
+        for metric in ('p50_ms', 'peak_kib'):
+            limit = baseline[name][metric] * (1 + tolerance)
+            if result[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {result[metric]} > {limit:.3f} '
+                    f'(baseline {baseline[name][metric]})'
+                )
+    return regressions
+
+
+def _print_results(results: dict[str, dict[str, float]]) -> None:
+    columns = ['pages_per_second', 'p50_ms', 'p90_ms', 'p99_ms', 'peak_kib']
+    name_width = max(len(name) for name in results)
+    print(f'{"parser":<{name_width}}  ' + '  '.join(f'{c:>16}' for c in columns))
+    for name, result in results.items():
+        print(
+            f'{name:<{name_width}}  ' + '  '.join(f'{result[c]:>16}' for c in columns)
+        )
+
+
+def record_fixtures(pages: list[str] | None = None) -> None:
+    """Download pages from boxofficemojo.com into the fixture corpus.
+
+    Args:
+        pages: Page paths such as 'release/rl1234567890'. Defaults to every
+            page already in the corpus.
+    """
+    if not pages:
+        pages = [
+            str(path.parent.relative_to(FIXTURES_DIR))
+            for path in sorted(FIXTURES_DIR.glob('**/index.html'))
+        ]
+
+    session = create_scrape_session()
+    for page in pages:
+        r = session.get(_url(page), timeout=30)
+        r.raise_for_status()
+        out = FIXTURES_DIR / page / 'index.html'
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(r.text)
+        logging.info(f'Recorded {page} ({len(r.content)} bytes).')
+        time.sleep(1.0)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Benchmark page parsers offline.')
+    parser.add_argument('--parsers', nargs='+', choices=list(PARSERS))
+    parser.add_argument('--min-seconds', type=float, default=DEFAULT_MIN_SECONDS)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--json', type=Path, help='Also write results to this file.')
+    parser.add_argument(
+        '--record',
+        nargs='*',
+        metavar='PAGE',
+        help='Download pages (e.g. release/rl1234567890) into the fixture corpus.',
+    )
+    args = parser.parse_args()
+
+    if args.record is not None:
+        record_fixtures(args.record)
+        sys.exit(0)
+
+    results = run(parsers=args.parsers, min_seconds=args.min_seconds)
+    _print_results(results)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+
+    if args.update_baseline:
+        baseline = (
+            json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        )
+        baseline.update(results)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+        print(f'Updated {BASELINE_PATH}.')
+        sys.exit(0)
+
+    if not BASELINE_PATH.exists():
+        print(f'No baseline at {BASELINE_PATH}; run with --update-baseline.')
+        sys.exit(0)
+
+    regressions = compare_to_baseline(
+        results, json.loads(BASELINE_PATH.read_text()), tolerance=args.tolerance
+    )
+    for message in regressions:
+        print(f'REGRESSION {message}')
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,334 @@
+"""End-to-end replay of run_pipeline with no network.
+
+Serves the synthetic HTML corpus in benchmarks/fixtures/boxofficemojo (see
+benchmarks.parsers) from a local HTTP server (with configurable latency and
+503 rate), points the scrapers at it through BOX_OFFICE_MOJO_BASE, and
+stores everything that would go to S3 under a local directory through
+LOCAL_STORAGE_ROOT. run_pipeline then runs unchanged (extract, SQLMesh
+transform and load) and the harness reports the wall time of each stage
+from the run report.
+
+Pages missing from the corpus are synthesized from a saved page of the same
+kind with the IDs swapped, so every release group linked from a year page
+resolves to its own release group and release pages.
+
+Run:
+    uv run python -m benchmarks.replay --years 2024 --latency-ms 50 --error-rate 0.02
+    # A partial-update day on Modal: some extracts, no DuckDB database yet
+    uv run python -m benchmarks.replay --extracts worldwide_box_office release_id_lookup
+    uv run python -m benchmarks.replay --workdir replay --fresh-database \
+        --extracts worldwide_box_office release_id_lookup
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+# Nothing from src is imported at module level: configure_replay_environment()
+# has to run first.
+FIXTURES_DIR = Path(__file__).parent / 'fixtures' / 'boxofficemojo'
+REPLAY_BUCKET = 'box-office-tracking-replay'
+TEMPLATE_YEAR = 2024
+# Top-level timings in the run report; extract is summed over extracts
+PIPELINE_STAGES = ('extract', 'fingerprint', 'transform', 'load')
+
+PAGE_PATTERN = re.compile(r'^/(year/world|releasegroup|release)/(\w+)/?$')
+
+
+class FixtureServer:
+    """Local HTTP server that answers Box Office Mojo URLs from the corpus.
+
+    Args:
+        latency: Seconds to wait before every response.
+        jitter: Extra uniformly distributed latency, in seconds.
+        error_rate: Fraction of requests answered with a 503.
+        seed: Random seed for jitter and injected 503s.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stats: Counter[str] = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._templates = {
+            kind: sorted(p.name for p in (FIXTURES_DIR / kind).iterdir())
+            for kind in ('releasegroup', 'release')
+        }
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self) -> 'FixtureServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _template(self, kind: str, page_id: str) -> str:
+        """Pick a saved page of the same kind, stable for a given ID."""
+        templates = self._templates[kind]
+        return templates[zlib.crc32(page_id.encode()) % len(templates)]
+
+    def page(self, path: str) -> str | None:
+        """Return the HTML for a URL path, or None if it is not a known page."""
+        match = PAGE_PATTERN.match(urlsplit(path).path)
+        if not match:
+            return None
+        kind, page_id = match.groups()
+
+        saved = FIXTURES_DIR / kind / page_id / 'index.html'
+        if saved.exists():
+            return saved.read_text()
+
+        if kind == 'year/world':
+            return (FIXTURES_DIR / kind / str(TEMPLATE_YEAR) / 'index.html').read_text()
+
+        template_id = self._template(kind, page_id)
+        html = (FIXTURES_DIR / kind / template_id / 'index.html').read_text()
+        html = html.replace(template_id, page_id)
+        if kind == 'releasegroup':
+            # Give each synthesized release group its own release IDs
+            salt = int(page_id.removeprefix('gr'))
+            html = re.sub(
+                r'/release/rl(\d+)/',
+                lambda m: f'/release/rl{int(m.group(1)) ^ salt}/',
+                html,
+            )
+        return html
+
+    def _handle(self, request: BaseHTTPRequestHandler) -> None:
+        with self._lock:
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            unavailable = self._rng.random() < self.error_rate
+        time.sleep(delay)
+
+        html = None if unavailable else self.page(request.path)
+        if unavailable:
+            status, body = 503, b'Service Unavailable'
+        elif html is None:
+            status, body = 404, b'Not Found'
+        else:
+            status, body = 200, html.encode('utf-8')
+
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats[f'status_{status}'] += 1
+            self.stats['bytes'] += len(body)
+
+        request.send_response(status)
+        request.send_header('Content-Type', 'text/html; charset=utf-8')
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+
+def configure_replay_environment(
+    base_url: str,
+    storage_root: Path,
+    request_delay: float = 0.0,
+    initial_backoff: float | None = None,
+) -> None:
+    """Point scraping, S3 and DuckDB at local stand-ins.
+
+    Must run before any src.etl module is imported, since the scrapers and
+    the SQLMesh config read these variables at import time.
+    """
+    os.environ.update(
+        {
+            'BOX_OFFICE_MOJO_BASE': base_url,
+            'SCRAPE_REQUEST_DELAY': str(request_delay),
+            'LOCAL_STORAGE_ROOT': str(storage_root / 'storage'),
+            'S3_BUCKET': REPLAY_BUCKET,
+            'DUCKDB_DATABASE_DIR': str(storage_root),
+        }
+    )
+    if initial_backoff is not None:
+        os.environ['SCRAPE_INITIAL_BACKOFF'] = str(initial_backoff)
+    os.environ.pop('DATA_ROOT', None)
+
+
+def summarize(report: dict, server_stats: Counter, wall_seconds: float) -> dict:
+    """Reduce a run report to per-stage wall times and request counts."""
+    stages = Counter()
+    for timing in report['timings']:
+        if timing['stage'] in PIPELINE_STAGES:
+            stages[timing['stage']] += timing['seconds']
+
+    counters = Counter()
+    for counter in report['counters']:
+        counters[counter['name']] += counter['value']
+
+    return {
+        'wall_seconds': round(wall_seconds, 2),
+        **{f'{stage}_seconds': round(stages[stage], 2) for stage in PIPELINE_STAGES},
+        'rows_loaded': counters['rows_loaded'],
+        'rows_published': counters['rows_published'],
+        'http_requests': server_stats['requests'],
+        'http_503s': server_stats['status_503'],
+        'http_404s': server_stats['status_404'],
+        'http_mib': round(server_stats['bytes'] / 2**20, 1),
+    }
+
+
+def run_replay(
+    years: list[int],
+    extract_names: list[str] | None = None,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    request_delay: float = 0.0,
+    initial_backoff: float | None = None,
+    workdir: Path | None = None,
+    full_rewrite: bool | None = None,
+    fresh_database: bool = False,
+) -> dict:
+    """Run run_pipeline against the fixture server and local storage.
+
+    Args:
+        years: Years to extract.
+        extract_names: Extracts to run (as for app.py --extracts). Defaults to
+            today's schedule; pass ['all'] for every extract.
+        latency: Server latency per request, in seconds.
+        jitter: Extra random server latency per request, in seconds.
+        error_rate: Fraction of requests answered with a 503.
+        request_delay: Delay between scraper requests, in seconds (the
+            production default is 1.0).
+        initial_backoff: First retry wait after a 503, in seconds. Defaults
+            to the production value.
+        workdir: Directory for local storage and the DuckDB database.
+            Defaults to a temporary directory.
+        full_rewrite: Passed through to run_pipeline.
+        fresh_database: Delete the DuckDB database (and with it the SQLMesh
+            state) in workdir first but keep the stored data, as on Modal,
+            where every run starts without a database.
+
+    Returns:
+        Per-stage wall times and request counts.
+    """
+    with (
+        tempfile.TemporaryDirectory() as tmp,
+        FixtureServer(latency=latency, jitter=jitter, error_rate=error_rate) as server,
+    ):
+        configure_replay_environment(
+            server.base_url,
+            Path(workdir or tmp),
+            request_delay=request_delay,
+            initial_backoff=initial_backoff,
+        )
+
+        from app import run_pipeline
+        from src import database_path
+        from src.utils.metrics import metrics
+
+        if fresh_database:
+            database_path.unlink(missing_ok=True)
+
+        start = time.perf_counter()
+        try:
+            run_pipeline.local(
+                extract_names=extract_names, years=years, full_rewrite=full_rewrite
+            )
+        except RuntimeError as e:
+            logging.warning(f'Pipeline finished with errors: {e}')
+        wall_seconds = time.perf_counter() - start
+
+        return summarize(metrics.report(), server.stats, wall_seconds)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+
+    parser = argparse.ArgumentParser(description='Replay run_pipeline offline.')
+    parser.add_argument('--years', type=int, nargs='+', default=[TEMPLATE_YEAR])
+    parser.add_argument(
+        '--extracts',
+        nargs='+',
+        default=['all'],
+        help='Extracts to run, as for app.py. Defaults to all.',
+    )
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument(
+        '--error-rate',
+        type=float,
+        default=0.0,
+        help='Fraction of requests answered with a 503.',
+    )
+    parser.add_argument(
+        '--request-delay',
+        type=float,
+        default=0.0,
+        help='Seconds between scraper requests (production uses 1.0).',
+    )
+    parser.add_argument(
+        '--initial-backoff',
+        type=float,
+        default=None,
+        help='Seconds before the first retry after a 503 (production uses 2.0).',
+    )
+    parser.add_argument(
+        '--workdir',
+        type=Path,
+        default=None,
+        help='Keep local storage and the DuckDB database here.',
+    )
+    parser.add_argument('--full-rewrite', action='store_true', default=None)
+    parser.add_argument(
+        '--fresh-database',
+        action='store_true',
+        help='Delete the DuckDB database in --workdir first, keeping the data.',
+    )
+    parser.add_argument('--json', type=Path, help='Also write results to this file.')
+    args = parser.parse_args()
+
+    result = run_replay(
+        years=args.years,
+        extract_names=args.extracts,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        request_delay=args.request_delay,
+        initial_backoff=args.initial_backoff,
+        workdir=args.workdir,
+        full_rewrite=args.full_rewrite,
+        fresh_database=args.fresh_database,
+    )
+    print(json.dumps(result, indent=2))
+
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2) + '\n')
@@ -0,0 +1,295 @@
+"""Synthetic raw data in the exact layouts the extracts write to S3.
+
+Columns are generated as page text and cast to each extract's schema with
+the same conform() the writers use.
+
+Writes raw/<extract>/.../scraped_date=*/data.parquet files under a local
+directory so the SQLMesh project can run against it with DATA_ROOT set to
+that directory.
+
+Run:
+    uv run python -m benchmarks.synthetic_data /tmp/box_office --years 10
+"""
+
+import argparse
+import datetime
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.etl.extract.schemas import DICTIONARY_COLUMNS, conform
+from src.etl.extract.snapshot_changes import diff_tables
+from src.etl.extract.tables.release_domestic import WATERMARK_LOOKBACK_DAYS
+from src.etl.extract.watermarks import after_watermark
+
+REGIONS = {
+    'Domestic': ['Domestic'],
+    'APAC': ['Australia', 'Japan', 'South Korea', 'India', 'Taiwan', 'Thailand'],
+    'EMEA': [
+        'France', 'Germany', 'Italy', 'Netherlands', 'Poland', 'Spain',
+        'Sweden', 'Turkey', 'United Kingdom', 'South Africa',
+    ],
+    'LATAM': ['Argentina', 'Brazil', 'Chile', 'Colombia', 'Mexico', 'Peru'],
+    'China': ['China'],
+}  # fmt: skip
+DISTRIBUTORS = [
+    'Walt Disney Studios Motion Pictures', 'Warner Bros.', 'Universal Pictures',
+    'Sony Pictures Releasing', 'Paramount Pictures', 'Lionsgate', 'A24', 'Neon',
+]  # fmt: skip
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Drama', 'Horror', 'Sci-Fi']
+BOX_OFFICE_MOJO_BASE = 'https://www.boxofficemojo.com'
+# Share of a year's releases whose grosses still change between daily snapshots
+IN_THEATERS_SHARE = 0.2
+
+
+@dataclass(frozen=True)
+class SyntheticScale:
+    """Shape of a synthetic raw dataset.
+
+    Attributes:
+        years: Number of release years, ending at the end_date year.
+        releases_per_year: Release groups per year.
+        daily_snapshots: scraped_date partitions of the year-level extracts
+            for the two most recent years (older years get one partition,
+            as after a backfill).
+        release_snapshots: scraped_date partitions per release for the
+            release-level extracts.
+        run_days: Days in each release's domestic daily table.
+    """
+
+    years: int
+    releases_per_year: int = 200
+    daily_snapshots: int = 30
+    release_snapshots: int = 2
+    run_days: int = 60
+
+
+def _money(value: int) -> str:
+    return f'${value:,}'
+
+
+def _write_table(root: Path, key: str, table: pa.Table) -> None:
+    """Write a conformed table as the extract's writer would (key: raw/<name>/...)."""
+    path = root / f'{key}/data.parquet'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, path, use_dictionary=DICTIONARY_COLUMNS[key.split('/')[1]])
+
+
+def _write(root: Path, key: str, columns: dict[str, list]) -> None:
+    """Write page-text columns as the extract's writer would (key: raw/<name>/...)."""
+    _write_table(root, key, conform(pa.table(columns), key.split('/')[1]))
+
+
+def generate_raw_data(
+    root: Path | str,
+    scale: SyntheticScale,
+    end_date: datetime.date | None = None,
+    seed: int = 0,
+) -> int:
+    """Write a synthetic raw/ tree under root.
+
+    Args:
+        root: Local directory (used as DATA_ROOT).
+        scale: Dataset shape.
+        end_date: Latest scraped_date. Defaults to today.
+        seed: Random seed; the same seed and scale give identical data.
+
+    Returns:
+        Number of Parquet files written.
+    """
+    root = Path(root)
+    rng = random.Random(seed)
+    end_date = end_date or datetime.date.today()
+    files = 0
+
+    for year in range(end_date.year - scale.years + 1, end_date.year + 1):
+        recent = year >= end_date.year - 1
+        snapshot_dates = [
+            end_date - datetime.timedelta(days=offset)
+            for offset in range(scale.daily_snapshots if recent else 1)
+        ][::-1]
+
+        releases = []
+        for index in range(scale.releases_per_year):
+            release_id = f'rl{year}{index:05d}'
+            release_group_id = f'gr{year}{index:05d}'
+            worldwide = int(2_000_000_000 / (index + 1) ** 0.9 * rng.uniform(0.8, 1.2))
+            domestic_share = rng.uniform(0.2, 0.6) if rng.random() > 0.2 else 0.0
+            releases.append(
+                (
+                    release_id,
+                    release_group_id,
+                    f'Movie {year}-{index}',
+                    worldwide,
+                    domestic_share,
+                )
+            )
+
+        # Releases still in theaters keep earning; the rest are settled
+        in_theaters = [rng.random() < IN_THEATERS_SHARE for _ in releases]
+        previous = None
+        for snapshot_index, scraped in enumerate(snapshot_dates, start=1):
+            progress = snapshot_index / len(snapshot_dates)
+            grosses = [
+                int(r[3] * (0.5 + 0.5 * progress)) if earning else r[3]
+                for r, earning in zip(releases, in_theaters)
+            ]
+            domestic = [int(g * r[4]) for g, r in zip(grosses, releases)]
+            table = conform(
+                pa.table(
+                    {
+                        'Rank': list(range(1, len(releases) + 1)),
+                        'Release Group': [r[2] for r in releases],
+                        'release_group_url': [
+                            f'{BOX_OFFICE_MOJO_BASE}/releasegroup/{r[1]}/'
+                            for r in releases
+                        ],
+                        'Worldwide': [_money(g) for g in grosses],
+                        'Domestic': [_money(d) if d else '-' for d in domestic],
+                        '%': [f'{r[4]:.1%}' for r in releases],
+                        'Foreign': [_money(g - d) for g, d in zip(grosses, domestic)],
+                        '%.1': [f'{1 - r[4]:.1%}' for r in releases],
+                    }
+                ),
+                'worldwide_box_office',
+            )
+            # Only the rows that changed since the previous scrape, as the
+            # extract writes them
+            _write_table(
+                root,
+                f'raw/worldwide_box_office/release_year={year}/scraped_date={scraped}',
+                diff_tables(previous, table, 'release_group_url'),
+            )
+            previous = table
+            _write(
+                root,
+                f'raw/release_id_lookup/release_year={year}/scraped_date={scraped}',
+                {
+                    'movie_title': [r[2] for r in releases],
+                    'release_group_url': [
+                        f'{BOX_OFFICE_MOJO_BASE}/releasegroup/{r[1]}/' for r in releases
+                    ],
+                    'domestic_release_url': [
+                        f'{BOX_OFFICE_MOJO_BASE}/release/{r[0]}/' if r[4] else None
+                        for r in releases
+                    ],
+                },
+            )
+            files += 2
+
+        release_dates = [
+            end_date - datetime.timedelta(weeks=week)
+            for week in range(scale.release_snapshots)
+        ][::-1]
+        for release_id, release_group_id, title, worldwide, domestic_share in releases:
+            opening = int(worldwide * max(domestic_share, 0.1) * 0.3)
+            for scraped in release_dates:
+                scraped_key = f'scraped_date={scraped}'
+                _write(
+                    root,
+                    f'raw/release_metadata/release_id={release_id}/{scraped_key}',
+                    {
+                        'release_id': [release_id],
+                        'movie_title': [title],
+                        'distributor': [rng.choice(DISTRIBUTORS)],
+                        'opening_amount': [str(opening)],
+                        'opening_theaters': [str(rng.randint(2000, 4500))],
+                        'release_date': [f'Jun 14, {year}'],
+                        'rating': [rng.choice(['G', 'PG', 'PG-13', 'R'])],
+                        'runtime': [f'{rng.randint(1, 2)} hr {rng.randint(0, 59)} min'],
+                        'genres': [' '.join(rng.sample(GENRES, 3))],
+                        'widest_release': [str(rng.randint(2000, 4500))],
+                    },
+                )
+
+                markets = [(r, m) for r, ms in REGIONS.items() for m in ms]
+                _write(
+                    root,
+                    f'raw/release_worldwide_snapshot/'
+                    f'release_group_id={release_group_id}/{scraped_key}',
+                    {
+                        'region': [r for r, _ in markets],
+                        'market': [m for _, m in markets],
+                        'release_date': [f'Jun 14, {year}'] * len(markets),
+                        'opening': [
+                            str(int(opening * rng.uniform(0.01, 0.2))) for _ in markets
+                        ],
+                        'total_gross': [
+                            str(int(worldwide * rng.uniform(0.01, 0.1)))
+                            for _ in markets
+                        ],
+                        'movie_title': [title] * len(markets),
+                        'release_group_url': [
+                            f'{BOX_OFFICE_MOJO_BASE}/releasegroup/{release_group_id}/'
+                        ]
+                        * len(markets),
+                    },
+                )
+                files += 2
+
+            # The domestic run grows by the same number of days between
+            # scrapes; later scrapes store only the days after the watermark
+            watermark = None
+            for snapshot_index, scraped in enumerate(release_dates, start=1):
+                days = scale.run_days * snapshot_index // len(release_dates)
+                daily = [int(opening / 3 * 0.93**day) for day in range(days)]
+                to_date = [sum(daily[: day + 1]) for day in range(days)]
+                table = conform(
+                    pa.table(
+                        {
+                            'Date': [f'Day {day + 1}' for day in range(days)],
+                            'DOW': [
+                                ['Friday', 'Saturday', 'Sunday', 'Monday', 'Tuesday',
+                                 'Wednesday', 'Thursday'][day % 7]
+                                for day in range(days)
+                            ],  # fmt: skip
+                            'Rank': [str(min(99, day // 3 + 1)) for day in range(days)],
+                            'Daily': [_money(d) for d in daily],
+                            '%± YD': ['-'] * days,
+                            '%± LW': ['-'] * days,
+                            'Theaters': ['4,000'] * days,
+                            'Avg': [_money(d // 4000) for d in daily],
+                            'To Date': [_money(t) for t in to_date],
+                            'Day': [str(day + 1) for day in range(days)],
+                            'Estimated': ['false'] * days,
+                            'release_id': [release_id] * days,
+                        }
+                    ),
+                    'release_domestic',
+                )
+                _write_table(
+                    root,
+                    f'raw/release_domestic/release_id={release_id}/'
+                    f'scraped_date={scraped}',
+                    after_watermark(table, 'Day', watermark, WATERMARK_LOOKBACK_DAYS),
+                )
+                watermark = days
+                files += 1
+
+    return files
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic raw Parquet data.')
+    parser.add_argument('root', type=Path, help='Output directory (DATA_ROOT).')
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--releases-per-year', type=int, default=200)
+    parser.add_argument('--daily-snapshots', type=int, default=30)
+    parser.add_argument('--release-snapshots', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    written = generate_raw_data(
+        args.root,
+        SyntheticScale(
+            years=args.years,
+            releases_per_year=args.releases_per_year,
+            daily_snapshots=args.daily_snapshots,
+            release_snapshots=args.release_snapshots,
+        ),
+        seed=args.seed,
+    )
+    print(f'Wrote {written} files under {args.root}/raw.')
@@ -0,0 +1,129 @@
+"""Scaling benchmark for the SQLMesh project on synthetic raw data.
+
+For each scale point, writes synthetic raw Parquet with
+benchmarks.synthetic_data, then runs a SQLMesh plan of the whole project
+against it in a fresh process (DuckDB database and data_root both local)
+and records wall time, peak RSS and published row counts.
+
+Run:
+    uv run python -m benchmarks.transform_scaling --years 1 5 10 25 50
+"""
+
+import argparse
+import json
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks.synthetic_data import SyntheticScale, generate_raw_data
+from src import database_name, project_root
+
+PUBLISHED_MODELS = [
+    'published.worldwide_box_office',
+    'published.release_metadata',
+    'published.release_domestic_daily',
+    'published.release_regional_snapshots',
+]
+
+
+def run_transform(data_root: Path, database_path: Path) -> dict[str, float]:
+    """Plan and apply the SQLMesh project against local data.
+
+    Meant to run in its own process so ru_maxrss reflects this run only.
+    """
+    import duckdb
+    from sqlmesh.core.config import DuckDBConnectionConfig, GatewayConfig
+    from sqlmesh.core.context import Context
+
+    from src.sqlmesh_project.config import config
+
+    local_config = config.model_copy(
+        update={
+            'gateways': {
+                'duckdb': GatewayConfig(
+                    connection=DuckDBConnectionConfig(database=str(database_path))
+                )
+            },
+            'variables': {**config.variables, 'data_root': str(data_root)},
+        }
+    )
+
+    start = time.perf_counter()
+    context = Context(
+        paths=project_root / 'src' / 'sqlmesh_project', config=local_config
+    )
+    context.plan(include_unmodified=True, auto_apply=True, no_prompts=True)
+    elapsed = time.perf_counter() - start
+    context.close()
+
+    with duckdb.connect(str(database_path), read_only=True) as con:
+        rows = {
+            model: con.execute(
+                f'select count(*) from {database_name}.{model}'
+            ).fetchone()[0]
+            for model in PUBLISHED_MODELS
+        }
+
+    return {
+        'transform_seconds': round(elapsed, 2),
+        'peak_rss_mib': round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        **rows,
+    }
+
+
+def benchmark_scale(scale: SyntheticScale, workdir: Path) -> dict[str, float]:
+    data_root = workdir / f'years={scale.years}'
+    start = time.perf_counter()
+    files = generate_raw_data(data_root, scale)
+    generate_seconds = time.perf_counter() - start
+    raw_mib = sum(p.stat().st_size for p in data_root.rglob('*.parquet')) / 2**20
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        result = executor.submit(
+            run_transform, data_root, data_root / f'{database_name}.duckdb'
+        ).result()
+
+    return {
+        'years': scale.years,
+        'raw_files': files,
+        'raw_mib': round(raw_mib, 1),
+        'generate_seconds': round(generate_seconds, 2),
+        **result,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark SQLMesh scaling.')
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 5, 10])
+    parser.add_argument('--releases-per-year', type=int, default=200)
+    parser.add_argument('--daily-snapshots', type=int, default=30)
+    parser.add_argument('--release-snapshots', type=int, default=2)
+    parser.add_argument(
+        '--workdir',
+        type=Path,
+        default=None,
+        help='Where to write synthetic data. Defaults to a temporary directory.',
+    )
+    parser.add_argument('--json', type=Path, help='Also write results to this file.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or Path(tmp)
+        results = []
+        for years in args.years:
+            scale = SyntheticScale(
+                years=years,
+                releases_per_year=args.releases_per_year,
+                daily_snapshots=args.daily_snapshots,
+                release_snapshots=args.release_snapshots,
+            )
+            result = benchmark_scale(scale, workdir)
+            print(json.dumps(result))
+            results.append(result)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + '\n')
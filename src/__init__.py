@@ -1,7 +1,11 @@
+import os
 from pathlib import Path
 
 project_root = Path(__file__).parent.parent
 database_name = 'box_office_tracking_sqlmesh_db'
-database_path = Path(
-    project_root / 'src' / 'duckdb_databases' / f'{database_name}.duckdb'
+# DUCKDB_DATABASE_DIR keeps offline runs (e.g. the replay benchmark) away
+# from the local development database.
+database_path = (
+    Path(os.getenv('DUCKDB_DATABASE_DIR') or project_root / 'src' / 'duckdb_databases')
+    / f'{database_name}.duckdb'
 )
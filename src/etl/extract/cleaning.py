@@ -0,0 +1,160 @@
+"""Cleaning of Box Office Mojo page text into typed columns.
+
+Parsers collect the text of a page as is ('$1,234', '4,000 theaters',
+'Jun 14, 2024 - Oct 3, 2024'), and the vectorized functions here clean a
+whole column at once with pyarrow compute when schemas.conform() casts a
+batch to its schema.
+
+The scalar helpers at the bottom clean one value at a time. They are the
+reference the vectorized functions are checked against (see
+benchmarks/cleaning.py), and release_metadata uses them for its one-row
+pages, where a compute pass per column costs more than the row itself.
+"""
+
+import datetime
+import re
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+NULL_TOKENS = ['-', '–', '—', 'N/A']
+
+# First date in page text such as 'Jun 14, 2024 - Oct 3, 2024'
+DATE_PATTERN = r'(?P<date>[A-Z][a-z]{2} \d{1,2}, \d{4})'
+DATE_FORMAT = '%b %d, %Y'
+OPENING_AMOUNT_PATTERN = r'\$(?P<amount>[\d,]+)'
+OPENING_THEATERS_PATTERN = r'(?P<theaters>[\d,]+)\s+theaters?'
+
+_NULL_TEXT = pa.scalar(None, pa.string())
+
+
+def _digits(values: pa.ChunkedArray, to: pa.DataType) -> pa.ChunkedArray:
+    digits = pc.replace_substring_regex(values, r'[^0-9]', '')
+    return pc.cast(pc.if_else(pc.equal(digits, ''), _NULL_TEXT, digits), to)
+
+
+def _extracted(values: pa.ChunkedArray, pattern: str) -> pa.ChunkedArray:
+    """Named group of pattern in each value, null where it does not match."""
+    (group,) = re.compile(pattern).groupindex
+    return pc.struct_field(pc.extract_regex(values, pattern), group)
+
+
+def integers(values: pa.ChunkedArray, to: pa.DataType = pa.int64()) -> pa.ChunkedArray:
+    """'$1,234', '4,000' and '1234' are all 1234; '-' and 'N/A' are null."""
+    return _digits(values, to)
+
+
+def percents(
+    values: pa.ChunkedArray, to: pa.DataType = pa.float64()
+) -> pa.ChunkedArray:
+    """'+27.1%' is 27.1 and '-7.3%' is -7.3; '-' is null."""
+    number = pc.replace_substring_regex(values, r'[%,\s]', '')
+    valid = pc.match_substring_regex(number, r'^[+-]?\d+(\.\d+)?$')
+    number = pc.replace_substring_regex(number, r'^\+', '')
+    return pc.cast(pc.if_else(valid, number, _NULL_TEXT), to)
+
+
+def dates(values: pa.ChunkedArray, to: pa.DataType = pa.date32()) -> pa.ChunkedArray:
+    """First 'Jun 14, 2024' style date in each value."""
+    found = _extracted(values, DATE_PATTERN)
+    parsed = pc.strptime(found, format=DATE_FORMAT, unit='s', error_is_null=True)
+    return pc.cast(parsed, to)
+
+
+def booleans(values: pa.ChunkedArray, to: pa.DataType = pa.bool_()) -> pa.ChunkedArray:
+    return pc.cast(pc.utf8_lower(pc.utf8_trim_whitespace(values)), to)
+
+
+def close_dates(values: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Last day of a run shown as 'Jun 14, 2024 - Oct 3, 2024', as text."""
+    return pc.if_else(
+        pc.match_substring(values, ' - '),
+        pc.replace_substring_regex(values, r'^.* - ', ''),
+        _NULL_TEXT,
+    )
+
+
+def opening_amounts(values: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Amount of opening text like '$100,262,540 4,000 theaters', as text."""
+    return _extracted(values, OPENING_AMOUNT_PATTERN)
+
+
+def opening_theaters(values: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Theater count of opening text like '$100,262,540 4,000 theaters', as text."""
+    return _extracted(values, OPENING_THEATERS_PATTERN)
+
+
+def clean_text(values: pa.ChunkedArray, to: pa.DataType) -> pa.ChunkedArray:
+    """Cast a column of page text to a type; text that does not parse is null."""
+    if pa.types.is_integer(to):
+        return integers(values, to)
+    if pa.types.is_floating(to):
+        return percents(values, to)
+    if pa.types.is_date(to):
+        return dates(values, to)
+    if pa.types.is_boolean(to):
+        return booleans(values, to)
+    return pc.cast(values, to)
+
+
+# Scalar implementations
+
+
+def clean_currency(val: str) -> str | None:
+    if not val or val in NULL_TOKENS:
+        return None
+    val = re.sub(r'[^\d,]', '', val)
+    val = val.replace(',', '')
+    return val if val else None
+
+
+def clean_number(val: str) -> str | None:
+    return clean_currency(val)
+
+
+def clean_date(val: str) -> str | None:
+    if not val or val in NULL_TOKENS:
+        return None
+    val = val.strip()
+    return val if val else None
+
+
+def parse_opening(opening_text: str) -> tuple[str | None, str | None]:
+    """Parse opening text like '$100,262,540 4,000 theaters' into amount and theater count."""
+    if not opening_text:
+        return None, None
+
+    # Clean up whitespace
+    opening_text = ' '.join(opening_text.split())
+    parts = opening_text.split()
+    amount = None
+    theaters = None
+
+    for i, part in enumerate(parts):
+        if part.startswith('$'):
+            amount = clean_currency(part)
+        if 'theater' in part.lower() and i > 0:
+            theaters = clean_number(parts[i - 1])
+
+    return amount, theaters
+
+
+def parse_integer(val: str | None) -> int | None:
+    """Scalar integers(): '$1,234' is 1234; '-' and 'N/A' are None."""
+    digits = clean_currency(val)
+    return int(digits) if digits else None
+
+
+def parse_date(val: str | None) -> datetime.date | None:
+    """Scalar dates(): first 'Jun 14, 2024' style date in the text."""
+    match = re.search(DATE_PATTERN, clean_date(val) or '')
+    if not match:
+        return None
+    return datetime.datetime.strptime(match.group('date'), DATE_FORMAT).date()
+
+
+def parse_close_date(val: str | None) -> datetime.date | None:
+    """Scalar close_dates(), parsed: 'Jun 14, 2024 - Oct 3, 2024' is Oct 3, 2024."""
+    if not val or ' - ' not in val:
+        return None
+    return parse_date(val.rsplit(' - ', 1)[1])
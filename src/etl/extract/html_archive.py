@@ -0,0 +1,189 @@
+"""Archive of the HTML pages behind the release-level raw partitions.
+
+With ARCHIVE_HTML=1 set, release_metadata and release_worldwide_snapshot
+keep every page they parse. After a parser fix, reparse replays the archive
+through the current parsers and rewrites the raw partitions without a
+request to Box Office Mojo.
+
+Pages are written in zstd-compressed Parquet batches of up to
+BATCH_PAGES pages, with item_id, url, content_hash (SHA-256 of the HTML)
+and html:
+
+    raw_html/<extract>/release_year=<year>/scraped_date=<date>/batch-<time>.parquet
+
+The archive sits next to raw/ rather than inside it: the raw models read
+every raw/<extract>/.../data.parquet, and a release-level raw partition
+holds a single page.
+
+An unchanged page is stored once. html is null when the item's previous
+archived page had the same content_hash; read_pages() fills it in from
+that page. The last content_hash of every item is kept in
+extract_state/html_archive/<extract>/release_year=<year>.parquet.
+"""
+
+import datetime
+import hashlib
+import logging
+import os
+import threading
+from collections.abc import Iterator
+
+import pyarrow as pa
+
+from src.utils.s3_utils import (
+    list_partitions,
+    load_arrow_table_to_s3_parquet,
+    read_arrow_table_from_s3_parquet,
+)
+
+ARCHIVE_PREFIX = 'raw_html'
+STATE_PREFIX = 'extract_state/html_archive'
+ARCHIVE_HTML = os.getenv('ARCHIVE_HTML', '').lower() in {'1', 'true', 'yes'}
+BATCH_PAGES = 200
+ZSTD_LEVEL = 9
+S3_DATE_FORMAT = '%Y-%m-%d'
+
+SCHEMA = pa.schema(
+    [
+        ('item_id', pa.string()),
+        ('url', pa.string()),
+        ('content_hash', pa.string()),
+        # Null when the item's previous archived page had the same content
+        ('html', pa.large_string()),
+    ]
+)
+
+
+def _state_key(name: str, year: int) -> str:
+    return f'{STATE_PREFIX}/{name}/release_year={year}'
+
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode()).hexdigest()
+
+
+class HtmlArchive:
+    """Pages fetched by an extract for one release year.
+
+    add() may be called from several threads. Pages are written every
+    BATCH_PAGES pages and by flush(), which the extract calls when it is
+    done with the year.
+    """
+
+    def __init__(self, name: str, year: int):
+        self.name = name
+        self.year = year
+        self._pages: list[tuple[str, str, str]] = []
+        self._last_hashes: dict[str, str] | None = None
+        self._lock = threading.Lock()
+
+    def add(self, item_id: str, url: str, html: str) -> None:
+        with self._lock:
+            self._pages.append((item_id, url, html))
+            if len(self._pages) >= BATCH_PAGES:
+                self._write()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._write()
+
+    def _read_last_hashes(self) -> dict[str, str]:
+        try:
+            state = read_arrow_table_from_s3_parquet(
+                f'{_state_key(self.name, self.year)}.parquet'
+            )
+        except Exception as e:
+            logging.warning(f'Could not read the {self.name} archive state: {e}')
+            state = None
+        if state is None:
+            return {}
+        return dict(
+            zip(state['item_id'].to_pylist(), state['content_hash'].to_pylist())
+        )
+
+    def _write(self) -> None:
+        if not self._pages:
+            return
+        if self._last_hashes is None:
+            self._last_hashes = self._read_last_hashes()
+
+        rows = []
+        for item_id, url, html in self._pages:
+            page_hash = content_hash(html)
+            unchanged = self._last_hashes.get(item_id) == page_hash
+            self._last_hashes[item_id] = page_hash
+            rows.append(
+                {
+                    'item_id': item_id,
+                    'url': url,
+                    'content_hash': page_hash,
+                    'html': None if unchanged else html,
+                }
+            )
+        self._pages = []
+
+        now = datetime.datetime.now()
+        batch = pa.Table.from_pylist(rows, schema=SCHEMA)
+        load_arrow_table_to_s3_parquet(
+            table=batch,
+            s3_key=(
+                f'{ARCHIVE_PREFIX}/{self.name}/release_year={self.year}/'
+                f'scraped_date={now.strftime(S3_DATE_FORMAT)}/'
+                f'batch-{now.strftime("%H%M%S%f")}'
+            ),
+            dictionary_columns=[],
+            compression='zstd',
+            compression_level=ZSTD_LEVEL,
+        )
+        load_arrow_table_to_s3_parquet(
+            table=pa.table(
+                {
+                    'item_id': list(self._last_hashes),
+                    'content_hash': list(self._last_hashes.values()),
+                }
+            ),
+            s3_key=_state_key(self.name, self.year),
+        )
+        logging.info(
+            f'Archived {batch.num_rows} {self.name} pages for {self.year} '
+            f'({batch.num_rows - batch["html"].null_count} changed).'
+        )
+
+
+def archived_years(name: str) -> list[int]:
+    """Release years with archived pages for an extract."""
+    return sorted(
+        int(path.split('release_year=')[-1])
+        for path in list_partitions(f'{ARCHIVE_PREFIX}/{name}')
+        if 'release_year=' in path
+    )
+
+
+def read_pages(name: str, year: int) -> Iterator[tuple[datetime.date, str, str, str]]:
+    """Archived pages of a year, oldest first.
+
+    Yields:
+        (scraped_date, item_id, url, html) for every archived fetch, with
+        the html of unchanged pages filled in.
+    """
+    last_html = {}
+    for partition in list_partitions(f'{ARCHIVE_PREFIX}/{name}/release_year={year}'):
+        scraped_date = datetime.datetime.strptime(
+            partition.split('scraped_date=')[-1], S3_DATE_FORMAT
+        ).date()
+        for batch_key in list_partitions(partition):
+            batch = read_arrow_table_from_s3_parquet(batch_key)
+            if batch is None:
+                continue
+            for item_id, url, html in zip(
+                batch['item_id'].to_pylist(),
+                batch['url'].to_pylist(),
+                batch['html'].to_pylist(),
+            ):
+                if html is None:
+                    html = last_html.get(item_id)
+                    if html is None:
+                        logging.warning(f'No earlier archived page for {item_id}')
+                        continue
+                last_html[item_id] = html
+                yield scraped_date, item_id, url, html
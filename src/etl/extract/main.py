@@ -1,48 +1,79 @@
-import datetime
+import importlib
 import logging
+from dataclasses import dataclass, field
+from types import ModuleType
 
-from src.etl.extract.tables import (
-    release_domestic,
-    release_id_lookup,
-    release_metadata,
-    release_worldwide_snapshot,
-    worldwide_box_office,
-)
-from src.utils.logging_config import setup_logging
-
-setup_logging()
+from src.etl.extract.runner import RELEASE_TIME_BUDGET_SECONDS, Deadline
+from src.utils.metrics import metrics
+from src.utils.profiling import profile_stage
 
+# Extract name -> table module. Modules are imported on first use so a run
+# only pays for the extracts (and their pandas/bs4/s3fs imports) it needs.
 EXTRACT_MODULES = {
-    'worldwide_box_office': worldwide_box_office,
-    'release_id_lookup': release_id_lookup,
-    'release_metadata': release_metadata,
-    'release_domestic': release_domestic,
-    'release_worldwide_snapshot': release_worldwide_snapshot,
+    'worldwide_box_office': 'src.etl.extract.tables.worldwide_box_office',
+    'release_id_lookup': 'src.etl.extract.tables.release_id_lookup',
+    'release_metadata': 'src.etl.extract.tables.release_metadata',
+    'release_domestic': 'src.etl.extract.tables.release_domestic',
+    'release_worldwide_snapshot': 'src.etl.extract.tables.release_worldwide_snapshot',
 }
 
 DAILY_EXTRACTS = ['worldwide_box_office', 'release_id_lookup']
-WEEKLY_SCHEDULE = {
-    1: 'release_domestic',  # Tuesday
-    2: 'release_metadata',  # Wednesday
-    3: 'release_worldwide_snapshot',  # Thursday
-}
-ALL_EXTRACTS = DAILY_EXTRACTS + list(WEEKLY_SCHEDULE.values())
+# Run every day too, but each only scrapes the releases that are due under its
+# refresh policy (see refresh_policy.REFRESH_POLICIES)
+RELEASE_EXTRACTS = [
+    'release_domestic',
+    'release_metadata',
+    'release_worldwide_snapshot',
+]
+ALL_EXTRACTS = DAILY_EXTRACTS + RELEASE_EXTRACTS
+
+
+def get_extract_module(name: str) -> ModuleType:
+    """Import and return the table module for an extract."""
+    return importlib.import_module(EXTRACT_MODULES[name])
+
+
+@dataclass
+class ExtractResult:
+    """Outcome of an extraction run.
+
+    Attributes:
+        errors: (extract_name, exception) tuples for any failures.
+        updated: Names of extracts that wrote at least one row, including
+            extracts that failed part-way through.
+    """
+
+    errors: list[tuple[str, Exception]] = field(default_factory=list)
+    updated: set[str] = field(default_factory=set)
 
 
 def main(
     extract_names: list[str] | None = None,
     years: list[int] | None = None,
-) -> list[tuple[str, Exception]]:
+    deadline: Deadline | None = None,
+    release_ids: dict[str, set[str]] | None = None,
+    force: bool = False,
+    time_budget: float | None = RELEASE_TIME_BUDGET_SECONDS,
+) -> ExtractResult:
     """Run extraction pipeline.
 
     Args:
         extract_names: Specific extracts to run. Use ['all'] to run everything.
-            If None, runs based on schedule (daily + one weekly per day).
+            If None, runs every extract; release-level extracts only scrape
+            the releases that are due for refresh.
         years: Explicit list of years to process. If None, each module
             uses its default (current year and previous year).
+        deadline: Time by which extraction must stop taking new work. Work
+            left at that point is deferred to the next run.
+        release_ids: Release-level extract -> the only IDs it scrapes, due
+            or not (used by backfill to fill gaps).
+        force: Release-level extracts scrape every release, ignoring the
+            refresh TTLs and weekday shards.
+        time_budget: Seconds a release-level extract spends on one year
+            before deferring the rest (None: only the deadline defers).
 
     Returns:
-        List of (extract_name, exception) tuples for any failures.
+        ExtractResult with failures and the extracts that wrote new data.
     """
     logging.info('Starting extraction pipeline.')
 
@@ -58,22 +89,36 @@ def main(
                 )
             extracts_to_run = extract_names
     else:
-        weekday = datetime.date.today().weekday()
-        weekly_extract = WEEKLY_SCHEDULE.get(weekday)
-        extracts_to_run = DAILY_EXTRACTS + ([weekly_extract] if weekly_extract else [])
+        extracts_to_run = ALL_EXTRACTS
 
-    errors = []
+    result = ExtractResult()
     for name in extracts_to_run:
+        kwargs = {}
+        if release_ids and name in release_ids:
+            kwargs['release_ids'] = release_ids[name]
+        if name in RELEASE_EXTRACTS:
+            kwargs['force'] = force
+            kwargs['time_budget'] = time_budget
         try:
-            EXTRACT_MODULES[name].main(years=years)
+            with (
+                metrics.timer('extract', extract=name),
+                profile_stage('extract', extract=name),
+            ):
+                rows = get_extract_module(name).main(
+                    years=years, deadline=deadline, **kwargs
+                )
         except Exception as e:
             logging.error(f'{name} failed: {e}')
-            errors.append((name, e))
+            result.errors.append((name, e))
+            rows = getattr(e, 'rows_loaded', 0)
+
+        if rows:
+            result.updated.add(name)
 
     logging.info('Extraction pipeline complete.')
 
-    if errors:
-        failed = ', '.join(name for name, _ in errors)
+    if result.errors:
+        failed = ', '.join(name for name, _ in result.errors)
         logging.warning(f'Extraction had failures: {failed}')
 
-    return errors
+    return result
@@ -0,0 +1,55 @@
+"""Columnar record builders for the extracts.
+
+Parsers append records to a RecordBuilder, which keeps one list per column of
+the extract's schema and turns them into a pyarrow Table in a single step.
+The table is written to Parquet as is, so the small per-release payloads
+never go through a pandas DataFrame.
+"""
+
+from collections.abc import Iterable, Mapping
+
+import pyarrow as pa
+
+
+class RecordBuilder:
+    """Append-only columnar buffer for records of one schema.
+
+    Args:
+        schema: Columns and types of the records. Columns a record does not
+            set are null.
+    """
+
+    def __init__(self, schema: pa.Schema):
+        self.schema = schema
+        self._columns: dict[str, list] = {name: [] for name in schema.names}
+        self._num_rows = 0
+
+    def __len__(self) -> int:
+        return self._num_rows
+
+    def append(self, record: Mapping[str, object]) -> None:
+        """Add one record.
+
+        Raises:
+            KeyError: If the record has a column that is not in the schema.
+        """
+        unknown = record.keys() - self._columns.keys()
+        if unknown:
+            raise KeyError(f'Columns not in schema: {sorted(unknown)}')
+        for name, values in self._columns.items():
+            values.append(record.get(name))
+        self._num_rows += 1
+
+    def extend(self, records: Iterable[Mapping[str, object]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def to_table(self) -> pa.Table:
+        """Build a Table with the schema from the buffered records."""
+        return pa.Table.from_arrays(
+            [
+                pa.array(self._columns[field.name], type=field.type)
+                for field in self.schema
+            ],
+            schema=self.schema,
+        )
@@ -0,0 +1,284 @@
+"""Per-release refresh policy for the release-level extracts.
+
+Instead of re-scraping every release of an extract on a fixed weekday, each
+release is refreshed when it is due. The last scrape date of every
+(extract, release) pair is kept in a small Parquet state table in S3. A
+release is due when it has never been scraped, or when its last scrape is
+older than a TTL that grows with the release's age. A release that has
+stopped earning (closed) is never scraped again once it has been scraped
+after closing.
+
+Releases deferred by a run (time budget or run deadline) are listed in a
+JSON file next to it. The next run treats them as due, whatever their TTL,
+and processes them first.
+
+Refreshes that are weekly or slower are spread over the week: every release
+has a stable shard (a hash of its ID modulo 7) and is only refreshed on its
+shard's weekday, so each day carries about a seventh of them instead of the
+whole catalog coming due on the same day.
+
+Show shard assignments and the expected requests for the coming days:
+    uv run python -m src.etl.extract.refresh_policy --years 2024 2025
+"""
+
+import argparse
+import calendar
+import datetime
+import logging
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import pandas as pd
+
+from src.utils.s3_utils import (
+    get_df_from_s3_parquet,
+    load_df_to_s3_parquet,
+    read_json_from_s3,
+    s3_object_exists,
+    write_json_to_s3,
+)
+
+if TYPE_CHECKING:
+    from src.etl.extract.releases import ReleaseWork
+
+REFRESH_STATE_KEY = 'extract_state/release_refresh'
+DEFERRED_KEY = 'extract_state/deferred_releases.json'
+
+# A release with no worldwide gross change this long after its release date
+# is treated as closed.
+CLOSED_AFTER_DAYS = 60
+
+# Refreshes with a TTL of at least this many days happen on the release's
+# shard day; one shard per weekday
+SHARD_DAYS = 7
+
+
+@dataclass(frozen=True)
+class RefreshPolicy:
+    """TTL of an extract's data by release age.
+
+    Attributes:
+        tiers: (max_age_days, ttl_days) pairs, youngest first. A release is
+            refreshed every ttl_days while its age is below max_age_days.
+        default_ttl_days: TTL once a release is older than every tier.
+    """
+
+    tiers: tuple[tuple[int, int], ...]
+    default_ttl_days: int
+
+    def ttl_days(self, age_days: int | None) -> int:
+        """TTL for a release of the given age (None: unknown, treated as new)."""
+        for max_age_days, ttl_days in self.tiers:
+            if age_days is None or age_days < max_age_days:
+                return ttl_days
+        return self.default_ttl_days
+
+
+REFRESH_POLICIES = {
+    # Daily grosses change every day while a release is in theaters
+    'release_domestic': RefreshPolicy(tiers=((21, 1), (90, 7)), default_ttl_days=30),
+    # Rating, runtime and genres are fixed at release; widest release grows
+    # during the first weeks
+    'release_metadata': RefreshPolicy(tiers=((28, 7),), default_ttl_days=90),
+    # International markets open over the first months
+    'release_worldwide_snapshot': RefreshPolicy(
+        tiers=((60, 3), (180, 7)), default_ttl_days=30
+    ),
+}
+
+
+def release_shard(item_id: str) -> int:
+    """Stable shard of a release, 0 (Monday) to 6 (Sunday).
+
+    Uses crc32 rather than hash(), which is salted per process.
+    """
+    return zlib.crc32(item_id.encode()) % SHARD_DAYS
+
+
+def read_refresh_state() -> pd.DataFrame:
+    """Read the state table (extract, item_id, last_scraped_date)."""
+    if not s3_object_exists(f'{REFRESH_STATE_KEY}.parquet'):
+        return pd.DataFrame(columns=['extract', 'item_id', 'last_scraped_date'])
+    state = get_df_from_s3_parquet(f'{REFRESH_STATE_KEY}.parquet')
+    state['last_scraped_date'] = pd.to_datetime(state['last_scraped_date']).dt.date
+    return state
+
+
+def read_deferred(name: str) -> set[str]:
+    """IDs of an extract that earlier runs deferred."""
+    return set((read_json_from_s3(DEFERRED_KEY) or {}).get(name, []))
+
+
+def record_deferred(name: str, item_ids: list[str], deferred_ids: list[str]) -> None:
+    """Replace the deferred IDs of an extract among item_ids with deferred_ids.
+
+    Deferred IDs outside item_ids (for example from another year) are kept.
+    """
+    data = read_json_from_s3(DEFERRED_KEY) or {}
+    previous = set(data.get(name, []))
+    deferred = (previous - set(item_ids)) | set(deferred_ids)
+    if deferred == previous:
+        return
+    if deferred:
+        data[name] = sorted(deferred)
+    else:
+        data.pop(name, None)
+    write_json_to_s3(data, DEFERRED_KEY)
+
+
+def is_due(
+    policy: RefreshPolicy,
+    item: 'ReleaseWork',
+    last_scraped: datetime.date | None,
+    today: datetime.date,
+) -> bool:
+    """Whether a release should be scraped today under a policy."""
+    if last_scraped is None:
+        return True
+
+    age_days = (today - item.release_date).days if item.release_date else None
+    closed = (
+        age_days is not None
+        and age_days >= CLOSED_AFTER_DAYS
+        and item.revenue_change == 0
+    )
+    if closed:
+        return False
+
+    ttl_days = policy.ttl_days(age_days)
+    days_since = (today - last_scraped).days
+    if ttl_days < SHARD_DAYS:
+        return days_since >= ttl_days
+
+    # Missed its shard day (deferred, failed or no run that day)
+    if days_since >= ttl_days + SHARD_DAYS:
+        return True
+    # The shard day falls within SHARD_DAYS of the TTL expiring
+    on_shard_day = release_shard(item.item_id) == today.weekday()
+    return on_shard_day and days_since > ttl_days - SHARD_DAYS
+
+
+def select_due(
+    name: str,
+    work: list['ReleaseWork'],
+    today: datetime.date | None = None,
+) -> list['ReleaseWork']:
+    """Keep the work items that are due for refresh.
+
+    Items deferred by an earlier run come first, then the rest in their
+    original order. Extracts without a policy refresh every item.
+    """
+    policy = REFRESH_POLICIES.get(name)
+    if policy is None or not work:
+        return work
+
+    today = today or datetime.date.today()
+    try:
+        state = read_refresh_state()
+        deferred = read_deferred(name)
+    except Exception as e:
+        logging.warning(f'Could not read refresh state, refreshing all: {e}')
+        return work
+
+    state = state[state['extract'] == name]
+    last_scraped = dict(zip(state['item_id'], state['last_scraped_date']))
+    due = [
+        item
+        for item in work
+        if item.item_id in deferred
+        or is_due(policy, item, last_scraped.get(item.item_id), today)
+    ]
+    due.sort(key=lambda item: item.item_id not in deferred)
+    logging.info(f'{name}: {len(due)} of {len(work)} items are due for refresh.')
+    return due
+
+
+def record_refreshes(
+    name: str,
+    item_ids: list[str],
+    today: datetime.date | None = None,
+) -> None:
+    """Set last_scraped_date to today for the given items of an extract."""
+    if not item_ids:
+        return
+
+    today = today or datetime.date.today()
+    state = read_refresh_state()
+    state = state[~((state['extract'] == name) & state['item_id'].isin(item_ids))]
+    scraped = pd.DataFrame(
+        {'extract': name, 'item_id': item_ids, 'last_scraped_date': today}
+    )
+    state = pd.concat([state, scraped], ignore_index=True)
+    load_df_to_s3_parquet(state.sort_values(['extract', 'item_id']), REFRESH_STATE_KEY)
+
+
+def forecast_requests(
+    name: str,
+    work: list['ReleaseWork'],
+    last_scraped: dict[str, datetime.date],
+    start: datetime.date,
+    days: int = SHARD_DAYS,
+) -> list[int]:
+    """Expected release pages scraped per day, assuming every due item is.
+
+    Activity (revenue_change) is held at its current value, so releases are
+    not predicted to close during the forecast.
+    """
+    policy = REFRESH_POLICIES[name]
+    last_scraped = dict(last_scraped)
+    counts = []
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        due = [
+            item.item_id
+            for item in work
+            if is_due(policy, item, last_scraped.get(item.item_id), day)
+        ]
+        last_scraped.update(dict.fromkeys(due, day))
+        counts.append(len(due))
+    return counts
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+
+    from src.etl.extract.releases import RELEASE_URL_COLUMNS, get_release_work
+
+    load_dotenv()
+    logging.basicConfig(level=logging.WARNING)
+
+    today = datetime.date.today()
+    parser = argparse.ArgumentParser(
+        description='Show release shards and expected requests per day.'
+    )
+    parser.add_argument(
+        '--years', type=int, nargs='+', default=[today.year, today.year - 1]
+    )
+    parser.add_argument('--days', type=int, default=SHARD_DAYS)
+    args = parser.parse_args()
+
+    state = read_refresh_state()
+    dates = [today + datetime.timedelta(days=offset) for offset in range(args.days)]
+    print(f'{"":<28}' + ''.join(f'{d:%a %d}'.rjust(8) for d in dates))
+
+    for name in REFRESH_POLICIES:
+        work = [
+            item
+            for year in args.years
+            for item in get_release_work(year, RELEASE_URL_COLUMNS[name])
+        ]
+        extract_state = state[state['extract'] == name]
+        last_scraped = dict(
+            zip(extract_state['item_id'], extract_state['last_scraped_date'])
+        )
+        counts = forecast_requests(name, work, last_scraped, today, days=args.days)
+        print(f'{name:<28}' + ''.join(f'{count:>8}' for count in counts))
+
+        shards = [0] * SHARD_DAYS
+        for item in work:
+            shards[release_shard(item.item_id)] += 1
+        assignments = ', '.join(
+            f'{calendar.day_abbr[shard]} {count}' for shard, count in enumerate(shards)
+        )
+        print(f'{"  releases per shard":<28}{assignments}')
@@ -0,0 +1,399 @@
+"""Prioritized work lists for the release-level extracts.
+
+release_domestic, release_metadata and release_worldwide_snapshot each scrape
+one page per release listed in the latest release_id_lookup partition of a
+year. This module builds that list and ranks it by box office activity. It
+keeps only the releases that are due under the extract's refresh policy
+(see refresh_policy), then works through them under a time budget. The
+releases that are still earning money are always fetched first, and the
+quiet tail is what gets deferred.
+"""
+
+import datetime
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+from src.etl.extract.refresh_policy import record_deferred, record_refreshes, select_due
+from src.etl.extract.runner import RELEASE_TIME_BUDGET_SECONDS, Deadline
+from src.etl.extract.snapshot_changes import read_state
+from src.etl.extract.stages import PageExtract, run_pages
+from src.utils.metrics import metrics
+from src.utils.s3_utils import (
+    find_latest_partition,
+    get_df_from_s3_parquet,
+    list_partition_values,
+    list_partitions,
+    s3_object_exists,
+)
+
+# release_id_lookup column -> pattern of the ID in its URLs
+RELEASE_ID_PATTERNS = {
+    'domestic_release_url': re.compile(r'/release/(rl\d+)/'),
+    'release_group_url': re.compile(r'/releasegroup/(gr\d+)/'),
+}
+
+# Release-level extract -> release_id_lookup column of the page it scrapes
+RELEASE_URL_COLUMNS = {
+    'release_domestic': 'domestic_release_url',
+    'release_metadata': 'domestic_release_url',
+    'release_worldwide_snapshot': 'release_group_url',
+}
+
+# Release-level extract -> partition key of its raw files
+RELEASE_PARTITION_KEYS = {
+    'release_domestic': 'release_id',
+    'release_metadata': 'release_id',
+    'release_worldwide_snapshot': 'release_group_id',
+}
+
+
+@dataclass(frozen=True)
+class ReleaseWork:
+    """One release page to scrape and the activity it was ranked by.
+
+    Attributes:
+        item_id: Release (rl...) or release group (gr...) ID.
+        title: Release group title on the year/world page.
+        revenue: Worldwide gross in the latest snapshot.
+        revenue_change: Worldwide gross gained since the previous snapshot.
+            A release missing from the previous snapshot counts its whole
+            gross, so new releases rank with the most active ones.
+        release_date: Domestic release date from published release_metadata,
+            if the release has been scraped before.
+    """
+
+    item_id: str
+    title: str
+    revenue: int = 0
+    revenue_change: int = 0
+    release_date: datetime.date | None = None
+
+
+def _parse_money(values: pd.Series) -> pd.Series:
+    """'$1,234' -> 1234, anything unparseable -> 0 (as in cleaned models)."""
+    if pd.api.types.is_numeric_dtype(values):
+        # Typed files; integers with nulls are read as floats
+        return values.fillna(0).astype('int64')
+    digits = values.astype(str).str.replace(r'[^0-9]', '', regex=True)
+    return pd.to_numeric(digits, errors='coerce').fillna(0).astype('int64')
+
+
+def _extract_id(url: str, pattern: re.Pattern) -> str:
+    match = pattern.search(url)
+    if match:
+        return match.group(1)
+    return url.split('/')[-2] if url.endswith('/') else url.split('/')[-1]
+
+
+def _activity_snapshots(year: int) -> list[pd.DataFrame]:
+    """The two latest worldwide_box_office tables of a year, oldest first.
+
+    They come from the change data capture state (see snapshot_changes).
+    Years scraped before it existed have whole tables in every raw partition
+    instead.
+    """
+    state = read_state('worldwide_box_office', year)
+    if state is not None:
+        df = state.select(
+            ['Release Group', 'release_group_url', 'Worldwide', 'scraped_date']
+        ).to_pandas()
+        return [group for _, group in df.groupby('scraped_date', sort=True)]
+
+    partitions = list_partitions(f'raw/worldwide_box_office/release_year={year}')
+    return [
+        get_df_from_s3_parquet(f'{partition}/*.parquet')
+        for partition in partitions[-2:]
+    ]
+
+
+def get_box_office_activity(year: int) -> pd.DataFrame:
+    """Worldwide gross and its change between the two latest snapshots.
+
+    Reads the worldwide_box_office extract state rather than
+    cleaned.worldwide_box_office: extraction runs before the transform, and
+    the DuckDB database does not outlive a Modal container.
+
+    Returns:
+        DataFrame with release_group_id, revenue and revenue_change. Tables
+        scraped before the release group URLs were captured give title
+        instead of release_group_id. Empty if the year has no
+        worldwide_box_office data.
+    """
+    snapshots = [_activity_snapshot(df) for df in _activity_snapshots(year)]
+
+    if not snapshots:
+        return pd.DataFrame(columns=['release_group_id', 'revenue', 'revenue_change'])
+
+    latest = snapshots[-1]
+    if len(snapshots) == 1:
+        return latest.assign(revenue_change=latest['revenue'])
+
+    key = latest.columns[0]
+    previous = snapshots[0].rename(columns={'revenue': 'previous_revenue'})
+    if previous.columns[0] == key:
+        activity = latest.merge(previous, on=key, how='left')
+    else:
+        activity = latest.assign(previous_revenue=None)
+    activity['revenue_change'] = activity['revenue'] - activity[
+        'previous_revenue'
+    ].fillna(0).astype('int64')
+    return activity[[key, 'revenue', 'revenue_change']]
+
+
+def _activity_snapshot(df: pd.DataFrame) -> pd.DataFrame:
+    """Revenue per release group ID (or per title) of a worldwide_box_office table."""
+    if 'release_group_url' in df.columns and df['release_group_url'].notna().all():
+        pattern = RELEASE_ID_PATTERNS['release_group_url']
+        key = 'release_group_id'
+        values = [_extract_id(url, pattern) for url in df['release_group_url']]
+    else:
+        key = 'title'
+        values = df['Release Group']
+    return pd.DataFrame(
+        {key: values, 'revenue': _parse_money(df['Worldwide']).to_numpy()}
+    ).drop_duplicates(key)
+
+
+def get_release_dates() -> dict[str, datetime.date]:
+    """Release date of every release in the published release_metadata table."""
+    from src.etl.load.main import PUBLISHED_TABLES
+
+    table = next(t for t in PUBLISHED_TABLES if t.name == 'release_metadata')
+    if not s3_object_exists(f'{table.prefix}/data.parquet'):
+        return {}
+    df = get_df_from_s3_parquet(f'{table.prefix}/data.parquet')
+    dates = pd.to_datetime(df['release_date'], errors='coerce')
+    return {
+        release_id: date.date()
+        for release_id, date in zip(df['release_id'], dates)
+        if not pd.isna(date)
+    }
+
+
+def _read_lookup(year: int) -> pd.DataFrame:
+    """A year's latest release_id_lookup partition.
+
+    Empty if the year has no lookup data or it cannot be read.
+    """
+    try:
+        partition = find_latest_partition(f'raw/release_id_lookup/release_year={year}')
+        if not partition:
+            logging.warning(f'No release_id_lookup partitions for {year}')
+            return pd.DataFrame()
+        return get_df_from_s3_parquet(f'{partition}/*.parquet')
+    except Exception as e:
+        logging.warning(f'Could not read release_id_lookup for {year}: {e}')
+        return pd.DataFrame()
+
+
+def _with_url(lookup: pd.DataFrame, url_column: str) -> pd.DataFrame:
+    """Lookup rows with a url_column URL, one per URL."""
+    if lookup.empty:
+        return lookup
+    lookup = lookup[lookup[url_column].fillna('').str.strip() != '']
+    return lookup.drop_duplicates(url_column)
+
+
+def lookup_release_ids(year: int) -> dict[str, set[str]]:
+    """IDs in a year's latest release_id_lookup partition, per URL column.
+
+    Returns:
+        release_id_lookup URL column -> IDs of its pages (the items
+        get_release_work() would list).
+    """
+    lookup = _read_lookup(year)
+    ids = {}
+    for url_column, pattern in RELEASE_ID_PATTERNS.items():
+        rows = _with_url(lookup, url_column)
+        ids[url_column] = (
+            {_extract_id(url, pattern) for url in rows[url_column]}
+            if not rows.empty
+            else set()
+        )
+    return ids
+
+
+def stored_release_ids(name: str) -> set[str]:
+    """IDs with at least one raw partition of a release-level extract."""
+    return list_partition_values(f'raw/{name}', RELEASE_PARTITION_KEYS[name])
+
+
+def get_release_work(year: int, url_column: str) -> list[ReleaseWork]:
+    """Release IDs of a year from release_id_lookup, most active first.
+
+    Args:
+        year: Release year.
+        url_column: release_id_lookup column holding the page URL
+            ('domestic_release_url' or 'release_group_url').
+
+    Returns:
+        Work items ordered by revenue change, then revenue, then release
+        date, all descending. Releases without a known release date (new
+        releases not yet in release_metadata) count as the most recent.
+        Releases without activity data follow, newest first.
+    """
+    lookup = _with_url(_read_lookup(year), url_column)
+    if lookup.empty:
+        return []
+
+    pattern = RELEASE_ID_PATTERNS[url_column]
+    domestic_pattern = RELEASE_ID_PATTERNS['domestic_release_url']
+    work = pd.DataFrame(
+        {
+            'item_id': [_extract_id(url, pattern) for url in lookup[url_column]],
+            'title': lookup['movie_title'].fillna('').tolist(),
+            'release_group_id': [
+                _extract_id(url, RELEASE_ID_PATTERNS['release_group_url'])
+                for url in lookup['release_group_url'].fillna('')
+            ],
+            # Release groups take the date of their domestic release
+            'domestic_release_id': [
+                _extract_id(url, domestic_pattern) if url else None
+                for url in lookup['domestic_release_url'].fillna('')
+            ],
+        }
+    )
+
+    try:
+        release_dates = get_release_dates()
+    except Exception as e:
+        logging.warning(f'Could not read release dates: {e}')
+        release_dates = {}
+
+    try:
+        activity = get_box_office_activity(year)
+    except Exception as e:
+        logging.warning(f'Could not read box office activity for {year}: {e}')
+        activity = pd.DataFrame(
+            columns=['release_group_id', 'revenue', 'revenue_change']
+        )
+
+    # On the release group ID where the activity has it: titles repeat
+    work = work.merge(activity, on=activity.columns[0], how='left')
+    work[['revenue', 'revenue_change']] = (
+        work[['revenue', 'revenue_change']].fillna(0).astype('int64')
+    )
+    work['release_date'] = pd.to_datetime(
+        work['domestic_release_id'].map(release_dates)
+    )
+    work = work.sort_values(
+        ['revenue_change', 'revenue', 'release_date'],
+        ascending=False,
+        kind='stable',
+        na_position='first',
+    )
+    return [
+        ReleaseWork(
+            item_id=row.item_id,
+            title=row.title,
+            revenue=int(row.revenue),
+            revenue_change=int(row.revenue_change),
+            release_date=release_dates.get(row.domestic_release_id),
+        )
+        for row in work.itertuples(index=False)
+    ]
+
+
+def process_release_work(
+    name: str,
+    all_work: list[ReleaseWork],
+    page: PageExtract,
+    time_budget: float | None = RELEASE_TIME_BUDGET_SECONDS,
+    deadline: Deadline | None = None,
+    item_ids: set[str] | None = None,
+    force: bool = False,
+) -> tuple[int, list[str]]:
+    """Scrape and load the due work items in priority order.
+
+    Items that are not due under the extract's refresh policy are skipped,
+    unless item_ids picks the items to scrape or force is set. Items are
+    fetched, parsed and written in separate stages (see stages). Only items
+    that are fetched, parsed and written without an error are recorded in
+    the refresh state; failed items stay due and are retried on the next
+    run. The remaining items are deferred to the next run once the time
+    budget runs out, or once the slowest item so far would no longer finish
+    before the run deadline.
+
+    Args:
+        name: Extract name (used in log messages, metrics and refresh state).
+        all_work: Items in priority order, from get_release_work().
+        page: How the extract fetches, parses and writes one item.
+        time_budget: Seconds after which remaining items are deferred to a
+            later run (None: no budget, only the deadline).
+        deadline: Run deadline (None: no deadline).
+        item_ids: Scrape only these items, due or not (backfill gap repair).
+        force: Scrape every item, ignoring refresh TTLs and weekday shards.
+
+    Returns:
+        tuple: (total_rows_loaded, list_of_failed_ids)
+    """
+    if item_ids is not None:
+        work = [item for item in all_work if item.item_id in item_ids]
+    elif force:
+        work = all_work
+    else:
+        work = select_due(name, all_work)
+        metrics.increment(
+            'items_skipped_fresh', len(all_work) - len(work), extract=name
+        )
+
+    total_rows = 0
+    failed = []
+    refreshed = []
+    deferred = []
+    slowest_item = 0.0
+    started = time.monotonic()
+    position = 0
+    lock = threading.Lock()
+
+    def next_item() -> str | None:
+        """Next item to fetch, or None once the work is done or deferred."""
+        nonlocal position, deferred
+        with lock:
+            if position >= len(work) or deferred:
+                return None
+            if time_budget is not None and time.monotonic() - started > time_budget:
+                reason = f'time budget of {time_budget:.0f}s used up'
+            elif deadline and not deadline.allows(slowest_item):
+                reason = (
+                    f'{max(deadline.remaining(), 0):.0f}s left before the run deadline'
+                )
+            else:
+                reason = None
+            if reason:
+                deferred = [left.item_id for left in work[position:]]
+                logging.warning(
+                    f'{name}: {reason}, deferring {len(deferred)} '
+                    'lowest-priority items to a later run.'
+                )
+                metrics.increment('items_deferred', len(deferred), extract=name)
+                return None
+
+            item = work[position]
+            position += 1
+            logging.info(f'Processing {position}/{len(work)}: {item.item_id}')
+            return item.item_id
+
+    for result in run_pages(page, next_item):
+        if result.error is None:
+            refreshed.append(result.item_id)
+            total_rows += result.rows
+            if result.rows > 0:
+                logging.debug(f'Loaded {result.rows} rows for {result.item_id}')
+        else:
+            logging.error(f'Failed to process {result.item_id}: {result.error}')
+            failed.append(result.item_id)
+        slowest_item = max(slowest_item, result.seconds)
+
+    try:
+        record_refreshes(name, refreshed)
+        record_deferred(name, [item.item_id for item in all_work], deferred)
+    except Exception as e:
+        logging.warning(f'{name}: could not record refresh state: {e}')
+
+    return total_rows, failed
@@ -0,0 +1,150 @@
+"""Re-parse archived HTML pages with the current parsers.
+
+Replays the pages in the HTML archive (see html_archive) through the
+extract's parse_page() on a process pool and rewrites the raw partition of
+every archived fetch, for the scraped_date it was fetched on. When an item
+was fetched more than once on a day, its latest page wins, as it did when
+the partition was first written; a page that now parses to no rows deletes
+the partition. Correcting history after a parser fix is then CPU-bound
+work instead of days of re-scraping. The next pipeline run sees the
+rewritten raw files and rebuilds the published tables.
+
+Run:
+    uv run python -m src.etl.extract.reparse release_metadata
+    uv run python -m src.etl.extract.reparse release_worldwide_snapshot \\
+        --years 2023 2024 --workers 8
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pyarrow as pa
+
+from src.etl.extract.html_archive import S3_DATE_FORMAT, archived_years, read_pages
+from src.etl.extract.main import get_extract_module
+from src.etl.extract.releases import RELEASE_PARTITION_KEYS
+from src.utils.s3_utils import delete_s3_prefix
+
+# Extracts whose table module has parse_page(html, item_id, url) and
+# load(table, item_id, scraped_date)
+REPARSE_EXTRACTS = ['release_metadata', 'release_worldwide_snapshot']
+# Pages handed to a worker process at a time
+CHUNK_PAGES = 16
+MAX_WRITE_WORKERS = 8
+
+
+def _parse_page(job: tuple[str, str, str, str]) -> pa.Table | None:
+    name, item_id, url, html = job
+    try:
+        return get_extract_module(name).parse_page(html, item_id, url)
+    except Exception as e:
+        logging.warning(f'Failed to parse the archived {name} page of {item_id}: {e}')
+        return None
+
+
+def _partition_prefix(name: str, item_id: str, scraped_date: datetime.date) -> str:
+    return (
+        f'raw/{name}/{RELEASE_PARTITION_KEYS[name]}={item_id}/'
+        f'scraped_date={scraped_date.strftime(S3_DATE_FORMAT)}'
+    )
+
+
+def _write(
+    name: str, table: pa.Table, item_id: str, scraped_date: datetime.date
+) -> int:
+    """Rewrite one raw partition, or delete it when the page has no rows."""
+    if table.num_rows == 0:
+        delete_s3_prefix(_partition_prefix(name, item_id, scraped_date))
+        return 0
+    return get_extract_module(name).load(table, item_id, scraped_date)
+
+
+def reparse_year(name: str, year: int, workers: int | None = None) -> tuple[int, int]:
+    """Re-parse the archived pages of a year and rewrite their raw partitions.
+
+    Args:
+        name: Extract name (one of REPARSE_EXTRACTS).
+        year: Release year.
+        workers: Parser processes (defaults to the CPU count).
+
+    Returns:
+        tuple: (pages re-parsed, rows written)
+    """
+    # read_pages yields in fetch order, so the last page of an item and day
+    # is the one its partition was written from; one write per partition
+    # also keeps the concurrent writes from racing each other
+    latest = {
+        (scraped_date, item_id): (scraped_date, item_id, url, html)
+        for scraped_date, item_id, url, html in read_pages(name, year)
+    }
+    pages = list(latest.values())
+    if not pages:
+        logging.warning(f'No archived {name} pages for {year}.')
+        return 0, 0
+
+    jobs = [(name, item_id, url, html) for _, item_id, url, html in pages]
+    with (
+        ProcessPoolExecutor(max_workers=workers) as parsers,
+        ThreadPoolExecutor(max_workers=MAX_WRITE_WORKERS) as writers,
+    ):
+        writes = [
+            writers.submit(_write, name, table, item_id, scraped_date)
+            for (scraped_date, item_id, _, _), table in zip(
+                pages, parsers.map(_parse_page, jobs, chunksize=CHUNK_PAGES)
+            )
+            if table is not None
+        ]
+        rows = sum(write.result() for write in writes)
+
+    logging.info(f'Re-parsed {len(pages)} {name} pages for {year}: {rows} rows.')
+    return len(pages), rows
+
+
+def main(
+    extract_names: list[str],
+    years: list[int] | None = None,
+    workers: int | None = None,
+) -> int:
+    """Re-parse the archived pages of extracts (all archived years by default).
+
+    Returns:
+        Total rows written.
+    """
+    total_rows = 0
+    for name in extract_names:
+        started = time.perf_counter()
+        pages = 0
+        for year in years or archived_years(name):
+            year_pages, year_rows = reparse_year(name, year, workers)
+            pages += year_pages
+            total_rows += year_rows
+        logging.info(
+            f'{name}: re-parsed {pages} pages in '
+            f'{time.perf_counter() - started:.1f}s.'
+        )
+    return total_rows
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(
+        description='Re-parse archived HTML into the raw partitions.'
+    )
+    parser.add_argument('extracts', nargs='+', choices=REPARSE_EXTRACTS)
+    parser.add_argument(
+        '--years', type=int, nargs='*', help='Release years (default all archived).'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=os.cpu_count(), help='Parser processes.'
+    )
+    args = parser.parse_args()
+
+    main(args.extracts, years=args.years, workers=args.workers)
@@ -1,17 +1,67 @@
 import datetime
 import logging
+import time
 from collections.abc import Callable
+from dataclasses import dataclass
+
+from src.utils.metrics import metrics
+
+# Default time a release-level extract spends on one year before deferring
+# the rest
+RELEASE_TIME_BUDGET_SECONDS = 5 * 60
+
+
+class ExtractError(RuntimeError):
+    """Raised when some items of an extract failed.
+
+    Carries the number of rows that were still written so callers can tell
+    a partial run apart from one that wrote nothing, and the IDs of the
+    failed items.
+    """
+
+    def __init__(
+        self, message: str, rows_loaded: int = 0, failed_ids: list[str] | None = None
+    ):
+        super().__init__(message)
+        self.rows_loaded = rows_loaded
+        self.failed_ids = failed_ids or []
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """Time (time.monotonic()) by which extraction must stop taking new work.
+
+    Set by the entry point to its Modal timeout minus the time reserved for
+    transform and load, so a long extraction defers work instead of getting
+    the container killed before anything is published.
+    """
+
+    at: float
+
+    @classmethod
+    def after(cls, seconds: float) -> 'Deadline':
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        """Seconds left, negative once the deadline has passed."""
+        return self.at - time.monotonic()
+
+    def allows(self, seconds: float) -> bool:
+        """Whether work expected to take this long would finish in time."""
+        return self.remaining() > seconds
 
 
 def run_extract(
     name: str,
     process_year: Callable[[int], tuple[int, list[str]]],
     years: list[int] | None = None,
-) -> None:
+    deadline: Deadline | None = None,
+) -> int:
     """Shared runner for extract modules.
 
     Iterates over the given years (or current and previous year by default),
-    collects failures, and raises if any occurred.
+    collects failures, and raises if any occurred. Years left when the
+    deadline passes are skipped.
 
     Args:
         name: Extract name (used in log/error messages).
@@ -19,6 +69,14 @@ def run_extract(
             (rows_loaded, list_of_failed_ids).
         years: Explicit list of years to process. If None, defaults to
             [current_year, current_year - 1].
+        deadline: Run deadline. Release-level extracts also pass it to
+            their process_year so they stop part-way through a year.
+
+    Returns:
+        Total number of rows loaded.
+
+    Raises:
+        ExtractError: If any items failed.
     """
     logging.info(f'Extracting {name} data.')
     if years is None:
@@ -28,8 +86,17 @@ def run_extract(
     total_rows = 0
     all_failed = []
 
-    for year in years:
-        rows, failed = process_year(year)
+    for index, year in enumerate(years):
+        if deadline and not deadline.allows(0):
+            skipped = years[index:]
+            logging.warning(f'{name}: run deadline reached, skipping years {skipped}.')
+            metrics.increment('years_deferred', len(skipped), extract=name)
+            break
+
+        with metrics.timer('extract_year', extract=name, year=year):
+            rows, failed = process_year(year)
+        metrics.increment('rows_loaded', rows, extract=name)
+        metrics.increment('items_failed', len(failed), extract=name)
         total_rows += rows
         all_failed.extend(failed)
 
@@ -37,6 +104,10 @@ def run_extract(
 
     if all_failed:
         logging.error(f'{name}: {len(all_failed)} items failed.')
-        raise RuntimeError(
-            f'{name} extract failed for {len(all_failed)} items: {all_failed[:10]}'
+        raise ExtractError(
+            f'{name} extract failed for {len(all_failed)} items: {all_failed[:10]}',
+            rows_loaded=total_rows,
+            failed_ids=all_failed,
         )
+
+    return total_rows
@@ -0,0 +1,269 @@
+"""Fixed Arrow schemas of the raw extract files.
+
+Every raw Parquet file of an extract is written with the same schema, so the
+raw SQLMesh models read them without union_by_name and the cleaned layer
+does no string-to-number work. Money is whole US dollars as int64, dates are
+date32 and percentages are float64 percentage points. A column a page does
+not have is null, never absent.
+
+Writers pass what they scraped through conform(), which accepts page text
+("$1,234", "4,000 theaters", "Jun 14, 2024") as well as typed values and
+cleans each text column in one vectorized pass (see cleaning). release_metadata
+pages are a single row, so its parser cleans the cells with the scalar
+helpers instead.
+
+Rewrite existing raw files that do not match their schema:
+    uv run python -m src.etl.extract.schemas --migrate
+    uv run python -m src.etl.extract.schemas --migrate release_metadata
+"""
+
+import argparse
+import logging
+import os
+from typing import TYPE_CHECKING
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.etl.extract import cleaning
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+MONEY = pa.int64()
+COUNT = pa.int64()
+PERCENT = pa.float64()
+
+SCHEMAS = {
+    'worldwide_box_office': pa.schema(
+        [
+            ('Rank', COUNT),
+            ('Release Group', pa.string()),
+            ('Worldwide', MONEY),
+            ('Domestic', MONEY),
+            ('%', PERCENT),
+            ('Foreign', MONEY),
+            ('%.1', PERCENT),
+            # Linked from the 'Release Group' cell; its ID is the row's key
+            ('release_group_url', pa.string()),
+            # snapshot, insert, update or delete (see snapshot_changes)
+            ('change_type', pa.string()),
+        ]
+    ),
+    'release_id_lookup': pa.schema(
+        [
+            ('movie_title', pa.string()),
+            ('release_group_url', pa.string()),
+            ('domestic_release_url', pa.string()),
+        ]
+    ),
+    'release_metadata': pa.schema(
+        [
+            ('release_id', pa.string()),
+            ('movie_title', pa.string()),
+            ('distributor', pa.string()),
+            ('opening_amount', MONEY),
+            ('opening_theaters', COUNT),
+            ('release_date', pa.date32()),
+            # Last day in theaters, once the release has closed
+            ('close_date', pa.date32()),
+            ('rating', pa.string()),
+            ('runtime', pa.string()),
+            ('genres', pa.string()),
+            ('widest_release', COUNT),
+        ]
+    ),
+    'release_domestic': pa.schema(
+        [
+            # Month and day only ('Jun 14'), so kept as text
+            ('Date', pa.string()),
+            ('DOW', pa.string()),
+            ('Rank', COUNT),
+            ('Daily', MONEY),
+            ('%± YD', PERCENT),
+            ('%± LW', PERCENT),
+            ('Theaters', COUNT),
+            ('Avg', MONEY),
+            ('To Date', MONEY),
+            ('Day', COUNT),
+            ('Estimated', pa.bool_()),
+            ('release_id', pa.string()),
+        ]
+    ),
+    'release_worldwide_snapshot': pa.schema(
+        [
+            ('region', pa.string()),
+            ('market', pa.string()),
+            ('release_date', pa.date32()),
+            ('opening', MONEY),
+            ('total_gross', MONEY),
+            ('movie_title', pa.string()),
+            ('release_group_url', pa.string()),
+        ]
+    ),
+}
+
+# Low-cardinality text columns that repeat within a raw file, written
+# dictionary-encoded. Every other column is written plain: its values are
+# mostly distinct within a file (one row per release or per day), where a
+# dictionary page only adds bytes.
+DICTIONARY_COLUMNS = {
+    'worldwide_box_office': ['change_type'],
+    'release_id_lookup': [],
+    # One row per file
+    'release_metadata': [],
+    'release_domestic': ['DOW', 'Estimated', 'release_id'],
+    'release_worldwide_snapshot': [
+        'region',
+        'market',
+        'movie_title',
+        'release_group_url',
+    ],
+}
+
+# Columns computed from the page text of another column, for files whose
+# parser collected only that text: extract -> column -> (source column,
+# cleaning function returning the column's text)
+DERIVED_COLUMNS = {
+    'release_metadata': {
+        # 'Opening' reads '$100,262,540 4,000 theaters'
+        'opening_amount': ('opening', cleaning.opening_amounts),
+        'opening_theaters': ('opening', cleaning.opening_theaters),
+        # A closed release's page shows its run as 'Jun 14, 2024 - Oct 3, 2024'
+        'close_date': ('release_date', cleaning.close_dates),
+    },
+}
+
+
+def text_schema(name: str) -> pa.Schema:
+    """Every column of an extract as text, for parsers that collect page text.
+
+    Derived columns are replaced by the page text they are computed from.
+    """
+    derived = DERIVED_COLUMNS.get(name, {})
+    names = [field.name for field in SCHEMAS[name] if field.name not in derived]
+    for source, _ in derived.values():
+        if source not in names:
+            names.append(source)
+    return pa.schema([(column, pa.string()) for column in names])
+
+
+def _cast(values: pa.ChunkedArray, to: pa.DataType) -> pa.ChunkedArray:
+    if values.type == to:
+        return values
+    if pa.types.is_null(values.type):
+        return pa.nulls(len(values), to)
+    if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+        return cleaning.clean_text(pc.cast(values, pa.string()), to)
+    if pa.types.is_string(to):
+        return pc.cast(values, to)
+    # Numbers pandas inferred from a page, e.g. float Theaters with gaps
+    return pc.cast(values, to, safe=False)
+
+
+def _with_derived_columns(data: pa.Table, name: str) -> pa.Table:
+    """Compute the derived columns that data lacks or has only nulls in.
+
+    Parsers leave them to this batch step, and files written before a
+    derived column existed lack it.
+    """
+    for column, (source, clean) in DERIVED_COLUMNS.get(name, {}).items():
+        names = data.column_names
+        if source not in names or not pa.types.is_string(data[source].type):
+            continue
+        if column in names and data[column].null_count < data.num_rows:
+            continue
+        values = clean(data[source])
+        if column in names:
+            data = data.set_column(names.index(column), column, values)
+        else:
+            data = data.append_column(column, values)
+    return data
+
+
+def conform(data: 'pa.Table | DataFrame', name: str) -> pa.Table:
+    """Cast scraped data to an extract's schema.
+
+    Columns are cast by name and put in schema order. Columns the schema
+    lacks are dropped, and columns the data lacks are null.
+
+    Args:
+        data: Scraped rows as a pyarrow Table or a pandas DataFrame.
+        name: Extract name (key of SCHEMAS).
+
+    Returns:
+        Table with exactly SCHEMAS[name].
+    """
+    schema = SCHEMAS[name]
+    if not isinstance(data, pa.Table):
+        data = pa.Table.from_pandas(data, preserve_index=False)
+    data = _with_derived_columns(data, name)
+
+    extra = set(data.column_names) - set(schema.names)
+    if extra:
+        logging.debug(f'{name}: dropping columns not in schema: {sorted(extra)}')
+
+    return pa.Table.from_arrays(
+        [
+            (
+                _cast(data[field.name], field.type)
+                if field.name in data.column_names
+                else pa.nulls(data.num_rows, field.type)
+            )
+            for field in schema
+        ],
+        schema=schema,
+    )
+
+
+def migrate_raw_files(name: str, bucket_name: str | None = None) -> int:
+    """Rewrite the raw files of an extract that do not match its schema.
+
+    Returns:
+        Number of files rewritten.
+    """
+    import pyarrow.parquet as pq
+
+    from src.utils.s3_utils import get_bucket_root, get_s3_filesystem
+
+    fs = get_s3_filesystem()
+    bucket_root = get_bucket_root(bucket_name or os.getenv('S3_BUCKET'))
+    paths = sorted(fs.glob(f'{bucket_root}/raw/{name}/*/*/data.parquet'))
+
+    rewritten = 0
+    for count, path in enumerate(paths, start=1):
+        with fs.open(path, 'rb') as f:
+            table = pq.read_table(f)
+        if not table.schema.equals(SCHEMAS[name]):
+            table = conform(table, name)
+            with fs.open(path, 'wb') as f:
+                pq.write_table(table, f, use_dictionary=DICTIONARY_COLUMNS[name])
+            rewritten += 1
+        if count % 500 == 0:
+            logging.info(f'{name}: checked {count}/{len(paths)} files')
+
+    logging.info(f'{name}: rewrote {rewritten} of {len(paths)} raw files.')
+    return rewritten
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Raw extract file schemas.')
+    parser.add_argument(
+        '--migrate',
+        nargs='*',
+        choices=list(SCHEMAS),
+        help='Rewrite raw files of these extracts (default all) to their schema.',
+    )
+    args = parser.parse_args()
+
+    if args.migrate is None:
+        for name, schema in SCHEMAS.items():
+            print(f'{name}\n  ' + '\n  '.join(str(schema).splitlines()) + '\n')
+    else:
+        for name in args.migrate or SCHEMAS:
+            migrate_raw_files(name)
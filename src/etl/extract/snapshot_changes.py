@@ -0,0 +1,178 @@
+"""Change data capture for extracts that scrape a whole table on every run.
+
+worldwide_box_office scrapes the full year/world table of a year every day,
+and most of its rows are the same as the day before. Instead of storing
+every row of every scrape, a scrape is compared with the table as of the
+previous scraped_date, and only its changes are written to the raw
+partition, marked in change_type. Changes are made per key (the release
+group URL). A key need not be unique, so when any row of a key changes,
+every current row of that key is written.
+
+- insert: the rows of a key that was not in the previous table
+- update: the rows of a key whose rows differ from the previous table
+- delete: a key that is no longer listed (every other column is null)
+
+A partition of 'snapshot' rows holds a whole table. One is written when
+there is no previous table to compare with (the first scrape of a year, or
+lost state). Raw files written before change data capture have a null
+change_type and are whole tables too. A scrape without changes still writes
+its (empty) partition, so the transform knows the table was scraped that
+day. cleaned.worldwide_box_office turns the changes into versions with
+valid_from and valid_to dates, and the published model rebuilds the whole
+table of every scraped_date from them.
+
+The comparison does not read the raw history. The last two scraped tables
+of every year are kept in extract_state/<extract>/release_year=<year>.parquet,
+so a rerun on the same day diffs against the same previous table as the
+first run did. A state written before a column was added to the extract's
+schema is ignored, so the next scrape writes a whole table.
+"""
+
+import datetime
+import logging
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.etl.extract.schemas import SCHEMAS
+from src.utils.s3_utils import (
+    load_arrow_table_to_s3_parquet,
+    read_arrow_table_from_s3_parquet,
+)
+
+STATE_PREFIX = 'extract_state'
+CHANGE_TYPE_COLUMN = 'change_type'
+
+
+def state_key(name: str, year: int) -> str:
+    """S3 key of the state of an extract's year (without .parquet extension)."""
+    return f'{STATE_PREFIX}/{name}/release_year={year}'
+
+
+def _state_schema(name: str) -> pa.Schema:
+    return (
+        SCHEMAS[name]
+        .remove(SCHEMAS[name].get_field_index(CHANGE_TYPE_COLUMN))
+        .append(pa.field('scraped_date', pa.date32()))
+    )
+
+
+def read_state(name: str, year: int) -> pa.Table | None:
+    """The last scraped tables of a year, with their scraped_date."""
+    state = read_arrow_table_from_s3_parquet(f'{state_key(name, year)}.parquet')
+    if state is None:
+        return None
+    missing = set(_state_schema(name).names) - set(state.column_names)
+    if missing:
+        logging.info(f'Ignoring the {year} {name} state without {sorted(missing)}')
+        return None
+    return state.select(_state_schema(name).names).cast(_state_schema(name))
+
+
+def write_state(name: str, year: int, state: pa.Table) -> None:
+    load_arrow_table_to_s3_parquet(state, state_key(name, year))
+
+
+def _rows_by_key(table: pa.Table, columns: list[str], key: str) -> dict:
+    """key value -> sorted rows (as tuples of columns) with that key."""
+    groups = {}
+    for row in zip(*(table[name].to_pylist() for name in columns)):
+        groups.setdefault(row[columns.index(key)], []).append(row)
+    return {value: sorted(rows, key=str) for value, rows in groups.items()}
+
+
+def diff_tables(previous: pa.Table | None, current: pa.Table, key: str) -> pa.Table:
+    """Changes that turn previous into current, with change_type set.
+
+    Both tables have the extract's schema. change_type is ignored in the
+    comparison. The rows of a key are compared as a whole, in any order.
+    Every row of current is a 'snapshot' row when there is no previous
+    table.
+
+    Args:
+        previous: Table as of the previous scraped_date, or None.
+        current: Table just scraped.
+        key: Column that groups rows (e.g. 'release_group_url').
+
+    Returns:
+        Table with the schema of current.
+    """
+    schema = current.schema
+    columns = [name for name in schema.names if name != CHANGE_TYPE_COLUMN]
+    change_type_index = schema.get_field_index(CHANGE_TYPE_COLUMN)
+
+    if previous is None:
+        change_types = pa.array(['snapshot'] * current.num_rows, pa.string())
+        return current.set_column(change_type_index, CHANGE_TYPE_COLUMN, change_types)
+
+    previous_groups = _rows_by_key(previous, columns, key)
+    current_groups = _rows_by_key(current, columns, key)
+    changed_keys = [
+        value
+        for value, rows in current_groups.items()
+        if previous_groups.get(value) != rows
+    ]
+
+    changes = current.filter(
+        pc.is_in(current[key], value_set=pa.array(changed_keys, current[key].type))
+    )
+    change_types = pc.if_else(
+        pc.is_in(
+            changes[key], value_set=pa.array(list(previous_groups), changes[key].type)
+        ),
+        'update',
+        'insert',
+    )
+    changes = changes.set_column(change_type_index, CHANGE_TYPE_COLUMN, change_types)
+
+    deleted = sorted(previous_groups.keys() - current_groups.keys(), key=str)
+    deletes = pa.Table.from_pylist(
+        [{key: value, CHANGE_TYPE_COLUMN: 'delete'} for value in deleted],
+        schema=schema,
+    )
+    return pa.concat_tables([changes, deletes])
+
+
+def capture_changes(
+    state: pa.Table | None,
+    table: pa.Table,
+    key: str,
+    scraped_date: datetime.date,
+) -> tuple[pa.Table, pa.Table]:
+    """Diff a scraped table against the state's table of the previous scraped_date.
+
+    Write the changes before writing the returned state, so a failed write
+    is retried against the same previous table.
+
+    Args:
+        state: The year's state from read_state(), or None.
+        table: Table just scraped, with the extract's schema.
+        key: Column that groups rows.
+        scraped_date: Date of the scrape.
+
+    Returns:
+        tuple: (changes to write to the raw partition, new state)
+    """
+    previous = None
+    if state is not None:
+        earlier = [
+            date
+            for date in pc.unique(state['scraped_date']).to_pylist()
+            if date and date < scraped_date
+        ]
+        if earlier:
+            previous = state.filter(pc.equal(state['scraped_date'], max(earlier)))
+
+    changes = diff_tables(
+        previous.drop_columns(['scraped_date']) if previous is not None else None,
+        table,
+        key,
+    )
+
+    scraped = table.drop_columns([CHANGE_TYPE_COLUMN]).append_column(
+        'scraped_date', pa.array([scraped_date] * table.num_rows, pa.date32())
+    )
+    new_state = pa.concat_tables(
+        [previous, scraped] if previous is not None else [scraped]
+    )
+    return changes, new_state
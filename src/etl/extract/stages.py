@@ -0,0 +1,200 @@
+"""Fetch, parse and write stages of the release-level extracts.
+
+Fetching a page waits on the network, while parsing it (BeautifulSoup,
+lxml, read_html) is CPU-bound and holds the GIL. Parsing in the fetch
+threads would starve them. Each page instead goes through three stages:
+
+- FETCH_WORKERS threads download page HTML in priority order, each waiting
+  DEFAULT_REQUEST_DELAY between its requests.
+- A process pool of PARSE_WORKERS parses pages into conformed Arrow tables.
+  The pool is shared by every extract in the run. The Modal image sets
+  PARSE_WORKERS to the cores its functions reserve (see modal_image);
+  elsewhere it defaults to the CPU count, capped at 4.
+- The calling thread writes the tables to S3.
+
+Stages hand pages over through bounded queues (QUEUE_PAGES pages each, and
+at most two pages in flight per parse worker). A slow stage therefore holds
+back the stages before it instead of buffering pages in memory.
+"""
+
+import functools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+import pyarrow as pa
+
+from src.etl.extract.html_archive import HtmlArchive
+from src.utils.scraping import DEFAULT_REQUEST_DELAY, get_html, get_scrape_session
+
+# Concurrent page downloads; each worker keeps the politeness delay, so this
+# is also the request rate against Box Office Mojo in pages per delay
+FETCH_WORKERS = int(os.getenv('SCRAPE_FETCH_WORKERS', '1'))
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', str(min(4, os.cpu_count() or 1))))
+QUEUE_PAGES = 8
+
+_DONE = object()
+
+
+@dataclass(frozen=True)
+class PageExtract:
+    """How a release-level extract fetches, parses and writes one page.
+
+    Attributes:
+        url: Page URL of an item ID.
+        parse: (html, item_id, url) -> conformed table. Runs in a worker
+            process, so it must be a module-level function.
+        write: (table, item_id) -> rows written. Runs in the calling thread.
+        archive: Archive that keeps the fetched HTML (see html_archive).
+    """
+
+    url: Callable[[str], str]
+    parse: Callable[[str, str, str], pa.Table]
+    write: Callable[[pa.Table, str], int]
+    archive: HtmlArchive | None = None
+
+
+@dataclass(frozen=True)
+class PageResult:
+    """Outcome of one item.
+
+    Attributes:
+        item_id: Release or release group ID.
+        rows: Rows written (0 when the item failed).
+        seconds: From the start of the fetch until the write finished.
+        error: Fetch, parse or write exception. Set when the item failed and
+            should be retried.
+    """
+
+    item_id: str
+    rows: int
+    seconds: float
+    error: Exception | None = None
+
+
+@functools.cache
+def _parse_pool() -> ProcessPoolExecutor:
+    # spawn: forking a process that runs fetch and S3 threads can deadlock
+    return ProcessPoolExecutor(
+        max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context('spawn')
+    )
+
+
+def _fetch(
+    page: PageExtract,
+    next_item: Callable[[], str | None],
+    fetched: queue.Queue,
+) -> None:
+    session = get_scrape_session()
+    while (item_id := next_item()) is not None:
+        started = time.monotonic()
+        url = page.url(item_id)
+        try:
+            html = get_html(session, url)
+            if page.archive is not None:
+                page.archive.add(item_id, url, html)
+            fetched.put((item_id, url, html, started, None))
+        except Exception as e:
+            logging.warning(f'Failed to scrape {item_id}: {e}')
+            fetched.put((item_id, url, None, started, e))
+        time.sleep(DEFAULT_REQUEST_DELAY)
+    fetched.put(_DONE)
+
+
+def _collect(
+    item_id: str, started: float, future: Future | None, error: Exception | None
+) -> tuple:
+    """(item_id, started, table or None, error) of a submitted parse.
+
+    future is None when the page could not be fetched; error is then the
+    fetch exception.
+    """
+    if future is None:
+        return item_id, started, None, error
+    try:
+        return item_id, started, future.result(), None
+    except BrokenProcessPool as e:
+        _parse_pool.cache_clear()
+        return item_id, started, None, e
+    except Exception as e:
+        logging.warning(f'Failed to parse {item_id}: {e}')
+        return item_id, started, None, e
+
+
+def _dispatch(
+    page: PageExtract,
+    fetch_workers: int,
+    fetched: queue.Queue,
+    parsed: queue.Queue,
+) -> None:
+    """Move fetched pages through the parse pool, keeping priority order."""
+    in_flight = deque()
+    done = 0
+    while done < fetch_workers:
+        entry = fetched.get()
+        if entry is _DONE:
+            done += 1
+            continue
+        item_id, url, html, started, error = entry
+        future = None
+        if error is None:
+            try:
+                future = _parse_pool().submit(page.parse, html, item_id, url)
+            except BrokenProcessPool:
+                _parse_pool.cache_clear()
+                future = _parse_pool().submit(page.parse, html, item_id, url)
+        in_flight.append((item_id, started, future, error))
+        if len(in_flight) >= 2 * PARSE_WORKERS:
+            parsed.put(_collect(*in_flight.popleft()))
+    while in_flight:
+        parsed.put(_collect(*in_flight.popleft()))
+    parsed.put(_DONE)
+
+
+def run_pages(
+    page: PageExtract,
+    next_item: Callable[[], str | None],
+    fetch_workers: int = FETCH_WORKERS,
+) -> Iterator[PageResult]:
+    """Fetch, parse and write items until next_item() returns None.
+
+    next_item is called from the fetch threads. Results are yielded from
+    the calling thread as each item is written, in the order the items
+    were fetched.
+    """
+    fetched = queue.Queue(maxsize=QUEUE_PAGES)
+    parsed = queue.Queue(maxsize=QUEUE_PAGES)
+    threads = [
+        threading.Thread(target=_fetch, args=(page, next_item, fetched), daemon=True)
+        for _ in range(fetch_workers)
+    ]
+    threads.append(
+        threading.Thread(
+            target=_dispatch,
+            args=(page, fetch_workers, fetched, parsed),
+            daemon=True,
+        )
+    )
+    for thread in threads:
+        thread.start()
+
+    while (entry := parsed.get()) is not _DONE:
+        item_id, started, table, error = entry
+        rows = 0
+        if table is not None:
+            try:
+                rows = page.write(table, item_id)
+            except Exception as e:
+                error = e
+        yield PageResult(item_id, rows, time.monotonic() - started, error)
+
+    for thread in threads:
+        thread.join()
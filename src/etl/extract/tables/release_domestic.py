@@ -1,129 +1,175 @@
 import datetime
 import logging
-import re
-import ssl
-import time
+from io import StringIO
 
 import pandas as pd
+import pyarrow as pa
 from dotenv import load_dotenv
 
-from src.etl.extract.runner import run_extract
-from src.utils.s3_utils import (
-    find_latest_partition,
-    get_df_from_s3_parquet,
-    load_df_to_s3_parquet,
+from src.etl.extract.releases import get_release_work, process_release_work
+from src.etl.extract.runner import RELEASE_TIME_BUDGET_SECONDS, Deadline, run_extract
+from src.etl.extract.schemas import DICTIONARY_COLUMNS, SCHEMAS, conform
+from src.etl.extract.stages import PageExtract
+from src.etl.extract.watermarks import (
+    after_watermark,
+    read_watermarks,
+    record_watermarks,
+    watermark,
 )
-from src.utils.scraping import BOX_OFFICE_MOJO_UA, DEFAULT_REQUEST_DELAY
-
-ssl._create_default_https_context = ssl._create_unverified_context
+from src.utils.s3_utils import load_arrow_table_to_s3_parquet
+from src.utils.scraping import BOX_OFFICE_MOJO_BASE
 
 S3_DATE_FORMAT = '%Y-%m-%d'
+# Days up to the watermark stored again, for late revisions (weekend
+# estimates are replaced by actuals early in the week)
+WATERMARK_LOOKBACK_DAYS = 7
 
 
-def _scrape_release(release_id: str) -> pd.DataFrame:
-    """Scrape daily box office data from a Box Office Mojo release page."""
-    release_url = f'https://www.boxofficemojo.com/release/{release_id}/'
-    try:
-        # Use pandas read_html to parse all tables on the page
-        tables = pd.read_html(
-            release_url,
-            storage_options={'User-Agent': BOX_OFFICE_MOJO_UA},
-        )
+def parse_release_domestic(source, release_id: str) -> pd.DataFrame:
+    """Parse the daily table of a release page from an HTML buffer."""
+    # Use pandas read_html to parse all tables on the page
+    tables = pd.read_html(source)
 
-        if not tables:
-            logging.warning(f'No tables found for {release_id}')
-            return pd.DataFrame()
+    if not tables:
+        logging.warning(f'No tables found for {release_id}')
+        return pd.DataFrame()
 
-        # Get the last table (the "bottom one" as specified in the ticket)
-        df = tables[-1]
+    # Get the last table (the "bottom one" as specified in the ticket)
+    df = tables[-1]
 
-        # Add release_id column
-        df['release_id'] = release_id
+    # Add release_id column
+    df['release_id'] = release_id
 
-        return df
-    except Exception as e:
-        logging.warning(f'Failed to scrape {release_id}: {e}')
-        return pd.DataFrame()
+    return df
 
 
-def _get_release_ids_from_s3(year: int) -> list[str]:
-    """Get release IDs for a given year from S3."""
-    try:
-        partition = find_latest_partition(f'raw/release_id_lookup/release_year={year}')
-        if not partition:
-            logging.warning(f'No release_id_lookup partitions for {year}')
-            return []
-        df = get_df_from_s3_parquet(f'{partition}/*.parquet')
-        # Filter out empty/null URLs
-        urls = df['domestic_release_url'].dropna().drop_duplicates().tolist()
-        urls = [url for url in urls if url and url.strip()]
-        return [_extract_release_id(url) for url in urls]
-    except Exception as e:
-        logging.warning(f'Could not read release_id_lookup for {year}: {e}')
-        return []
+def parse_page(html: str, release_id: str, url: str) -> pa.Table:
+    """Parse a release page into a conformed release_domestic table (url unused)."""
+    df = parse_release_domestic(StringIO(html), release_id)
+    if df.empty:
+        return SCHEMAS['release_domestic'].empty_table()
+    return conform(df, 'release_domestic')
 
 
-def _extract_release_id(url: str) -> str:
-    """Extract release ID from URL."""
-    match = re.search(r'/release/(rl\d+)/', url)
-    if match:
-        return match.group(1)
-    return url.split('/')[-2] if url.endswith('/') else url.split('/')[-1]
+def release_url(release_id: str) -> str:
+    return f'{BOX_OFFICE_MOJO_BASE}/release/{release_id}/'
 
 
-def load(df: pd.DataFrame, release_id: str) -> int:
-    """Load a DataFrame to S3 partitioned by release_id and scraped_date."""
-    if df.empty:
+def load(
+    table: pa.Table,
+    release_id: str,
+    watermark: int | None = None,
+    lookback_days: int = WATERMARK_LOOKBACK_DAYS,
+) -> int:
+    """Load the days after a release's watermark to S3.
+
+    Partitioned by release_id and scraped_date. The last lookback_days days
+    up to the watermark are stored again to pick up late revisions.
+
+    Args:
+        table: Conformed daily table, from parse_page().
+        release_id: Release ID.
+        watermark: Highest day number already stored (None: store all days).
+        lookback_days: Days before the watermark to store again.
+
+    Returns:
+        Number of rows loaded.
+    """
+    if table.num_rows == 0:
         logging.debug(f'No data to load for {release_id}')
         return 0
 
+    table = after_watermark(table, 'Day', watermark, lookback_days)
     formatted_date = datetime.date.today().strftime(S3_DATE_FORMAT)
     s3_key = (
         f'raw/release_domestic/release_id={release_id}/'
         f'scraped_date={formatted_date}/data'
     )
-    return load_df_to_s3_parquet(df=df, s3_key=s3_key)
+    return load_arrow_table_to_s3_parquet(
+        table=table,
+        s3_key=s3_key,
+        dictionary_columns=DICTIONARY_COLUMNS['release_domestic'],
+    )
 
 
-def process_year(year: int) -> tuple[int, list[str]]:
+def process_year(
+    year: int,
+    deadline: Deadline | None = None,
+    release_ids: set[str] | None = None,
+    force: bool = False,
+    time_budget: float | None = RELEASE_TIME_BUDGET_SECONDS,
+) -> tuple[int, list[str]]:
     """
-    Process all releases for a given year.
+    Process the releases of a given year, most active first.
+
+    Args:
+        year: Release year.
+        deadline: Run deadline; releases left when it nears are deferred.
+        release_ids: Scrape only these IDs, whether due or not.
+        force: Scrape every release, whether due or not.
+        time_budget: Seconds before the remaining releases are deferred
+            (None: only the deadline defers them).
 
     Returns:
         tuple: (total_rows_loaded, list_of_failed_ids)
     """
     logging.info(f'Processing release domestic data for {year}.')
-    release_ids = _get_release_ids_from_s3(year)
+    work = get_release_work(year, 'domestic_release_url')
 
-    if not release_ids:
+    if not work:
         logging.warning(f'No releases found for {year}.')
         return 0, []
 
-    logging.info(f'Found {len(release_ids)} releases for {year}.')
-
-    total_rows = 0
-    failed_releases = []
+    logging.info(f'Found {len(work)} releases for {year}.')
 
-    for count, release_id in enumerate(release_ids, start=1):
-        logging.info(f'Processing {count}/{len(release_ids)}: {release_id}')
-        try:
-            df = _scrape_release(release_id)
-            rows = load(df, release_id)
-            total_rows += rows
-            if rows > 0:
-                logging.debug(f'Loaded {rows} rows for {release_id}')
-        except Exception as e:
-            logging.error(f'Failed to process {release_id}: {e}')
-            failed_releases.append(release_id)
+    try:
+        watermarks = read_watermarks('release_domestic')
+    except Exception as e:
+        logging.warning(f'Could not read watermarks, storing whole tables: {e}')
+        watermarks = {}
+    stored = {}
+
+    def write(table: pa.Table, release_id: str) -> int:
+        rows = load(table, release_id, watermarks.get(release_id))
+        if rows:
+            stored[release_id] = watermark(table, 'Day')
+        return rows
+
+    total_rows, failed = process_release_work(
+        'release_domestic',
+        work,
+        PageExtract(url=release_url, parse=parse_page, write=write),
+        deadline=deadline,
+        item_ids=release_ids,
+        force=force,
+        time_budget=time_budget,
+    )
 
-        time.sleep(DEFAULT_REQUEST_DELAY)
+    try:
+        record_watermarks(
+            'release_domestic',
+            {release_id: day for release_id, day in stored.items() if day is not None},
+        )
+    except Exception as e:
+        logging.warning(f'Could not record watermarks: {e}')
 
     logging.info(f'Loaded {total_rows} rows for {year}.')
-    return total_rows, failed_releases
-
-
-def main(years: list[int] | None = None) -> None:
-    run_extract('release_domestic', process_year, years=years)
+    return total_rows, failed
+
+
+def main(
+    years: list[int] | None = None,
+    deadline: Deadline | None = None,
+    release_ids: set[str] | None = None,
+    force: bool = False,
+    time_budget: float | None = RELEASE_TIME_BUDGET_SECONDS,
+) -> int:
+    return run_extract(
+        'release_domestic',
+        lambda year: process_year(year, deadline, release_ids, force, time_budget),
+        years=years,
+        deadline=deadline,
+    )
 
 
 if __name__ == '__main__':
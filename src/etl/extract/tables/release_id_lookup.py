@@ -1,37 +1,36 @@
 import datetime
 import logging
-import ssl
 import time
-from urllib.parse import urljoin, urlsplit, urlunsplit
-
-import pandas as pd
-
-from src.etl.extract.runner import run_extract
-from src.utils.s3_utils import load_df_to_s3_parquet
-from src.utils.scraping import DEFAULT_REQUEST_DELAY, create_scrape_session, get_soup
-
-ssl._create_default_https_context = ssl._create_unverified_context
+from urllib.parse import urljoin
+
+import pyarrow as pa
+from bs4 import BeautifulSoup
+
+from src.etl.extract.records import RecordBuilder
+from src.etl.extract.runner import Deadline, run_extract
+from src.etl.extract.schemas import DICTIONARY_COLUMNS, SCHEMAS
+from src.utils.metrics import metrics
+from src.utils.s3_utils import (
+    find_latest_partition,
+    get_df_from_s3_parquet,
+    load_arrow_table_to_s3_parquet,
+)
+from src.utils.scraping import (
+    BOX_OFFICE_MOJO_BASE,
+    DEFAULT_REQUEST_DELAY,
+    canonicalize,
+    get_scrape_session,
+    get_soup,
+    get_year_world_html,
+    make_soup,
+)
 
 S3_DATE_FORMAT = '%Y-%m-%d'
-EXPECTED_COLUMNS = {'movie_title', 'release_group_url', 'domestic_release_url'}
-
-BOX_OFFICE_MOJO_BASE = 'https://www.boxofficemojo.com'
-
-_scrape_session = create_scrape_session()
-
-
-def canonicalize(url: str) -> str:
-    if not url:
-        return None
+SCHEMA = SCHEMAS['release_id_lookup']
 
-    p = urlsplit(url)
-    return urlunsplit((p.scheme, p.netloc, p.path, '', ''))
 
-
-def _year_world_releasegroup_records(
-    year_world_url: str,
-) -> list[dict[str, str | None]]:
-    soup = get_soup(_scrape_session, year_world_url)
+def parse_releasegroup_records(soup: BeautifulSoup) -> list[dict[str, str | None]]:
+    """Parse release group links and titles from a year/world page."""
     seen = set()
     records = []
     for a in soup.select('a[href^="/releasegroup/"]'):
@@ -51,9 +50,15 @@ def _year_world_releasegroup_records(
     return records
 
 
-def _releasegroup_to_domestic_release_url(releasegroup_url: str) -> str | None:
-    soup = get_soup(_scrape_session, releasegroup_url)
+def _year_world_releasegroup_records(year: int) -> list[dict[str, str | None]]:
+    # Usually already downloaded by worldwide_box_office earlier in the run
+    return parse_releasegroup_records(make_soup(get_year_world_html(year)))
+
 
+def parse_domestic_release_url(
+    soup: BeautifulSoup, releasegroup_url: str
+) -> str | None:
+    """Parse the Domestic release link from a releasegroup page."""
     for a in soup.select('a[href^="/release/"]'):
         if a.get_text(strip=True) == 'Domestic':
             return urljoin(BOX_OFFICE_MOJO_BASE, a['href'])
@@ -66,17 +71,68 @@ def _releasegroup_to_domestic_release_url(releasegroup_url: str) -> str | None:
     return None
 
 
-def extract(year: int) -> pd.DataFrame:
+def _releasegroup_to_domestic_release_url(releasegroup_url: str) -> str | None:
+    return parse_domestic_release_url(
+        get_soup(get_scrape_session(), releasegroup_url), releasegroup_url
+    )
+
+
+def _stored_domestic_release_urls(year: int) -> dict[str, str | None]:
+    """release_group_url -> domestic_release_url from the latest stored lookup."""
+    try:
+        partition = find_latest_partition(f'raw/release_id_lookup/release_year={year}')
+        if not partition:
+            return {}
+        df = get_df_from_s3_parquet(f'{partition}/*.parquet')
+    except Exception as e:
+        logging.warning(f'Could not read release_id_lookup for {year}: {e}')
+        return {}
+    domestic_urls = df['domestic_release_url']
+    domestic_urls = domestic_urls.astype(object).where(domestic_urls.notna(), None)
+    return dict(zip(df['release_group_url'], domestic_urls))
+
+
+def extract(year: int, deadline: Deadline | None = None) -> pa.Table:
+    """Release group and domestic release URLs of a year's releases.
+
+    Once the slowest release group page so far would no longer be fetched
+    before the deadline, the remaining release groups are not fetched: they
+    keep the domestic release URL of the latest stored lookup (None if they
+    have none), so the lookup stays complete for the release-level extracts.
+    """
     try:
         logging.info(f'Extracting release ID lookup data for {year}.')
-        year_url = f'{BOX_OFFICE_MOJO_BASE}/year/world/{year}/'
-        releasegroup_records = _year_world_releasegroup_records(year_url)
+        releasegroup_records = _year_world_releasegroup_records(year)
 
         num_rows = len(releasegroup_records)
         logging.info(f'Found {num_rows} release groups for {year}.')
 
-        records = []
+        records = RecordBuilder(SCHEMA)
+        slowest = 0.0
         for count, rg in enumerate(releasegroup_records, start=1):
+            if deadline and not deadline.allows(slowest):
+                skipped = releasegroup_records[count - 1 :]
+                logging.warning(
+                    f'{max(deadline.remaining(), 0):.0f}s left before the run '
+                    f'deadline, keeping the stored domestic URLs of '
+                    f'{len(skipped)} release groups for {year}.'
+                )
+                metrics.increment(
+                    'items_deferred', len(skipped), extract='release_id_lookup'
+                )
+                stored = _stored_domestic_release_urls(year)
+                for left in skipped:
+                    rg_url = canonicalize(left['release_group_url'])
+                    records.append(
+                        {
+                            'movie_title': left['movie_title'],
+                            'release_group_url': rg_url,
+                            'domestic_release_url': stored.get(rg_url),
+                        }
+                    )
+                break
+
+            started = time.monotonic()
             rg_url = rg['release_group_url']
             try:
                 domestic_url = _releasegroup_to_domestic_release_url(rg_url)
@@ -96,36 +152,34 @@ def extract(year: int) -> pd.DataFrame:
                 logging.info(f'Parsed {count}/{num_rows} rows')
 
             time.sleep(DEFAULT_REQUEST_DELAY)
+            slowest = max(slowest, time.monotonic() - started)
 
-        return pd.DataFrame(records)
+        return records.to_table()
     except Exception as e:
         logging.error(f'Failed for {year}: {e}')
-        return pd.DataFrame()
+        return SCHEMA.empty_table()
 
 
-def load(df: pd.DataFrame, year: int) -> int:
-    if df.empty:
+def load(table: pa.Table, year: int) -> int:
+    if table.num_rows == 0:
         logging.warning(f'No release ID lookup data found for {year}.')
         return 0
-    missing = EXPECTED_COLUMNS - set(df.columns)
-    if missing:
-        logging.warning(
-            f'Release ID lookup data for {year} is missing columns: {missing}. '
-            f'Got columns: {list(df.columns)}'
-        )
-        return 0
     formatted_date = datetime.date.today().strftime(S3_DATE_FORMAT)
     s3_key = (
         f'raw/release_id_lookup/release_year={year}/scraped_date={formatted_date}/data'
     )
-    return load_df_to_s3_parquet(df=df, s3_key=s3_key)
+    return load_arrow_table_to_s3_parquet(
+        table=table,
+        s3_key=s3_key,
+        dictionary_columns=DICTIONARY_COLUMNS['release_id_lookup'],
+    )
 
 
-def process_year(year: int) -> tuple[int, list[str]]:
+def process_year(year: int, deadline: Deadline | None = None) -> tuple[int, list[str]]:
     """Extract and load release ID lookup data for a given year."""
     try:
-        df = extract(year)
-        rows = load(df, year)
+        table = extract(year, deadline)
+        rows = load(table, year)
         if rows == 0:
             return 0, [str(year)]
         return rows, []
@@ -134,11 +188,16 @@ def process_year(year: int) -> tuple[int, list[str]]:
         return 0, [str(year)]
 
 
-def main(years: list[int] | None = None) -> None:
-    run_extract('release_id_lookup', process_year, years=years)
+def main(years: list[int] | None = None, deadline: Deadline | None = None) -> int:
+    return run_extract(
+        'release_id_lookup',
+        lambda year: process_year(year, deadline),
+        years=years,
+        deadline=deadline,
+    )
 
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
-    df = extract(datetime.date.today().year)
-    print(df)
+    table = extract(datetime.date.today().year)
+    print(table)
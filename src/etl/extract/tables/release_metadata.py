@@ -1,218 +1,186 @@
 import datetime
 import logging
-import re
-import ssl
-import time
 
-import pandas as pd
+import pyarrow as pa
+from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
-from src.etl.extract.runner import run_extract
-from src.utils.s3_utils import (
-    find_latest_partition,
-    get_df_from_s3_parquet,
-    load_df_to_s3_parquet,
-)
-from src.utils.scraping import DEFAULT_REQUEST_DELAY, create_scrape_session, get_soup
-
-ssl._create_default_https_context = ssl._create_unverified_context
+from src.etl.extract import cleaning
+from src.etl.extract.html_archive import ARCHIVE_HTML, HtmlArchive
+from src.etl.extract.records import RecordBuilder
+from src.etl.extract.releases import get_release_work, process_release_work
+from src.etl.extract.runner import RELEASE_TIME_BUDGET_SECONDS, Deadline, run_extract
+from src.etl.extract.schemas import DICTIONARY_COLUMNS, SCHEMAS
+from src.etl.extract.stages import PageExtract
+from src.utils.s3_utils import load_arrow_table_to_s3_parquet
+from src.utils.scraping import BOX_OFFICE_MOJO_BASE, make_soup
 
 S3_DATE_FORMAT = '%Y-%m-%d'
-REQUIRED_COLUMNS = {'release_id'}
-OPTIONAL_COLUMNS = {
-    'movie_title',
-    'distributor',
-    'opening_amount',
-    'opening_theaters',
-    'release_date',
-    'rating',
-    'runtime',
-    'genres',
-    'widest_release',
-}
-
-_scrape_session = create_scrape_session()
-
-
-def _clean_currency(val: str) -> str | None:
-    if not val or val in ['-', '–', '—', 'N/A']:
-        return None
-    val = re.sub(r'[^\d,]', '', val)
-    val = val.replace(',', '')
-    return val if val else None
-
-
-def _clean_number(val: str) -> str | None:
-    if not val or val in ['-', '–', '—', 'N/A']:
-        return None
-    val = re.sub(r'[^\d,]', '', val)
-    val = val.replace(',', '')
-    return val if val else None
-
-
-def _parse_opening(opening_text: str) -> tuple[str | None, str | None]:
-    """Parse opening text like '$100,262,540 4,000 theaters' into amount and theater count."""
-    if not opening_text:
-        return None, None
-
-    # Clean up whitespace
-    opening_text = ' '.join(opening_text.split())
-    parts = opening_text.split()
-    amount = None
-    theaters = None
-
-    for i, part in enumerate(parts):
-        if part.startswith('$'):
-            amount = _clean_currency(part)
-        if 'theater' in part.lower() and i > 0:
-            theaters = _clean_number(parts[i - 1])
-
-    return amount, theaters
-
-
-def _scrape_release(release_id: str) -> pd.DataFrame:
-    """Scrape metadata from a Box Office Mojo release page."""
-    release_url = f'https://www.boxofficemojo.com/release/{release_id}/'
-    try:
-        soup = get_soup(_scrape_session, release_url)
-
-        metadata = {'release_id': release_id}
-
-        # Extract movie title
-        title_elem = soup.find('h1', class_='a-size-extra-large')
-        if title_elem:
-            metadata['movie_title'] = title_elem.get_text(strip=True)
-
-        # Find the summary table
-        summary_divs = soup.find_all('div', class_='a-section a-spacing-none')
-
-        for div in summary_divs:
-            spans = div.find_all('span')
-            if len(spans) >= 2:
-                label = spans[0].get_text(strip=True).lower().replace(':', '')
-                value = spans[1].get_text(' ', strip=True)
-
-                if 'distributor' in label:
-                    # Remove "See full company information" suffix
-                    value = value.replace('See full company information', '').strip()
-                    metadata['distributor'] = value
-                elif 'opening' in label:
-                    amount, theaters = _parse_opening(value)
-                    metadata['opening_amount'] = amount
-                    metadata['opening_theaters'] = theaters
-                elif 'release date' in label:
-                    metadata['release_date'] = value
-                elif 'mpaa' in label:
-                    metadata['rating'] = value
-                elif 'running time' in label:
-                    metadata['runtime'] = value
-                elif 'genres' in label:
-                    # Clean up whitespace in genres
-                    metadata['genres'] = ' '.join(value.split())
-                elif 'widest release' in label:
-                    # Extract just the number
-                    metadata['widest_release'] = _clean_number(value.split()[0])
-
-        return pd.DataFrame([metadata])
-    except Exception as e:
-        logging.warning(f'Failed to scrape {release_id}: {e}')
-        return pd.DataFrame()
-
-
-def _get_release_ids_from_s3(year: int) -> list[str]:
-    """Get release IDs for a given year from S3."""
-    try:
-        partition = find_latest_partition(f'raw/release_id_lookup/release_year={year}')
-        if not partition:
-            logging.warning(f'No release_id_lookup partitions for {year}')
-            return []
-        df = get_df_from_s3_parquet(f'{partition}/*.parquet')
-        # Filter out empty/null URLs
-        urls = df['domestic_release_url'].dropna().drop_duplicates().tolist()
-        urls = [url for url in urls if url and url.strip()]
-        return [_extract_release_id(url) for url in urls]
-    except Exception as e:
-        logging.warning(f'Could not read release_id_lookup for {year}: {e}')
-        return []
-
-
-def _extract_release_id(url: str) -> str:
-    """Extract release ID from URL."""
-    match = re.search(r'/release/(rl\d+)/', url)
-    if match:
-        return match.group(1)
-    return url.split('/')[-2] if url.endswith('/') else url.split('/')[-1]
-
-
-def load(df: pd.DataFrame, release_id: str) -> int:
-    """Load a DataFrame to S3 partitioned by release_id and scraped_date."""
-    if df.empty:
-        logging.debug(f'No data to load for {release_id}')
-        return 0
+SCHEMA = SCHEMAS['release_metadata']
+
+
+def parse_release_metadata(soup: BeautifulSoup, release_id: str) -> dict[str, str]:
+    """Parse the summary metadata from a Box Office Mojo release page as page text."""
+    metadata = {'release_id': release_id}
+
+    # Extract movie title
+    title_elem = soup.find('h1', class_='a-size-extra-large')
+    if title_elem:
+        metadata['movie_title'] = title_elem.get_text(strip=True)
+
+    # Find the summary table
+    summary_divs = soup.find_all('div', class_='a-section a-spacing-none')
+
+    for div in summary_divs:
+        spans = div.find_all('span')
+        if len(spans) >= 2:
+            label = spans[0].get_text(strip=True).lower().replace(':', '')
+            value = spans[1].get_text(' ', strip=True)
+
+            if 'distributor' in label:
+                # Remove "See full company information" suffix
+                value = value.replace('See full company information', '').strip()
+                metadata['distributor'] = value
+            elif 'opening' in label:
+                # Amount and theaters are split out by parse_page()
+                metadata['opening'] = value
+            elif 'release date' in label:
+                metadata['release_date'] = value
+            elif 'mpaa' in label:
+                metadata['rating'] = value
+            elif 'running time' in label:
+                metadata['runtime'] = value
+            elif 'genres' in label:
+                # Clean up whitespace in genres
+                metadata['genres'] = ' '.join(value.split())
+            elif 'widest release' in label:
+                metadata['widest_release'] = value.split()[0]
+
+    return metadata
+
+
+def clean_release_metadata(metadata: dict[str, str]) -> dict[str, object]:
+    """Type the page text of parse_release_metadata() as schemas.conform() would.
+
+    A page is one row, so its cells are cleaned with the scalar helpers: a
+    conform() pass runs pyarrow compute kernels per column, which costs
+    about a millisecond a page against microseconds per cell.
+    """
+    opening_amount, opening_theaters = cleaning.parse_opening(metadata.get('opening'))
+    release_date = metadata.get('release_date')
+    return {
+        'release_id': metadata['release_id'],
+        'movie_title': metadata.get('movie_title'),
+        'distributor': metadata.get('distributor'),
+        'opening_amount': cleaning.parse_integer(opening_amount),
+        'opening_theaters': cleaning.parse_integer(opening_theaters),
+        'release_date': cleaning.parse_date(release_date),
+        'close_date': cleaning.parse_close_date(release_date),
+        'rating': metadata.get('rating'),
+        'runtime': metadata.get('runtime'),
+        'genres': metadata.get('genres'),
+        'widest_release': cleaning.parse_integer(metadata.get('widest_release')),
+    }
+
+
+def parse_page(html: str, release_id: str, url: str) -> pa.Table:
+    """Parse a release page into a release_metadata table (url unused)."""
+    records = RecordBuilder(SCHEMA)
+    records.append(
+        clean_release_metadata(parse_release_metadata(make_soup(html), release_id))
+    )
+    return records.to_table()
 
-    # Check required columns only
-    missing_required = REQUIRED_COLUMNS - set(df.columns)
-    if missing_required:
-        logging.warning(
-            f'Data for {release_id} is missing required columns: {missing_required}. '
-            f'Got columns: {list(df.columns)}'
-        )
-        return 0
 
-    # Log if optional columns are missing (for debugging)
-    missing_optional = OPTIONAL_COLUMNS - set(df.columns)
-    if missing_optional:
-        logging.debug(
-            f'Data for {release_id} is missing optional columns: {missing_optional}'
-        )
+def release_url(release_id: str) -> str:
+    return f'{BOX_OFFICE_MOJO_BASE}/release/{release_id}/'
 
-    formatted_date = datetime.date.today().strftime(S3_DATE_FORMAT)
+
+def load(
+    table: pa.Table, release_id: str, scraped_date: datetime.date | None = None
+) -> int:
+    """Load a table to S3 partitioned by release_id and scraped_date.
+
+    scraped_date defaults to today.
+    """
+    if table.num_rows == 0:
+        logging.debug(f'No data to load for {release_id}')
+        return 0
+
+    formatted_date = (scraped_date or datetime.date.today()).strftime(S3_DATE_FORMAT)
     s3_key = (
         f'raw/release_metadata/release_id={release_id}/'
         f'scraped_date={formatted_date}/data'
     )
-    return load_df_to_s3_parquet(df=df, s3_key=s3_key)
+    return load_arrow_table_to_s3_parquet(
+        table=table,
+        s3_key=s3_key,
+        dictionary_columns=DICTIONARY_COLUMNS['release_metadata'],
+    )
 
 
-def process_year(year: int) -> tuple[int, list[str]]:
+def process_year(
+    year: int,
+    deadline: Deadline | None = None,
+    release_ids: set[str] | None = None,
+    force: bool = False,
+    time_budget: float | None = RELEASE_TIME_BUDGET_SECONDS,
+) -> tuple[int, list[str]]:
     """
-    Process all releases for a given year.
+    Process the releases of a given year, most active first.
+
+    Args:
+        year: Release year.
+        deadline: Run deadline; releases left when it nears are deferred.
+        release_ids: Scrape only these IDs, whether due or not.
+        force: Scrape every release, whether due or not.
+        time_budget: Seconds before the remaining releases are deferred
+            (None: only the deadline defers them).
 
     Returns:
         tuple: (total_rows_loaded, list_of_failed_ids)
     """
     logging.info(f'Processing release metadata for {year}.')
-    release_ids = _get_release_ids_from_s3(year)
+    work = get_release_work(year, 'domestic_release_url')
 
-    if not release_ids:
+    if not work:
         logging.warning(f'No releases found for {year}.')
         return 0, []
 
-    logging.info(f'Found {len(release_ids)} releases for {year}.')
-
-    total_rows = 0
-    failed_releases = []
+    logging.info(f'Found {len(work)} releases for {year}.')
 
-    for count, release_id in enumerate(release_ids, start=1):
-        logging.info(f'Processing {count}/{len(release_ids)}: {release_id}')
-        try:
-            df = _scrape_release(release_id)
-            rows = load(df, release_id)
-            total_rows += rows
-            if rows > 0:
-                logging.debug(f'Loaded {rows} rows for {release_id}')
-        except Exception as e:
-            logging.error(f'Failed to process {release_id}: {e}')
-            failed_releases.append(release_id)
-
-        time.sleep(DEFAULT_REQUEST_DELAY)
+    archive = HtmlArchive('release_metadata', year) if ARCHIVE_HTML else None
+    try:
+        total_rows, failed = process_release_work(
+            'release_metadata',
+            work,
+            PageExtract(url=release_url, parse=parse_page, write=load, archive=archive),
+            deadline=deadline,
+            item_ids=release_ids,
+            force=force,
+            time_budget=time_budget,
+        )
+    finally:
+        if archive is not None:
+            archive.flush()
 
     logging.info(f'Loaded {total_rows} rows for {year}.')
-    return total_rows, failed_releases
-
-
-def main(years: list[int] | None = None) -> None:
-    run_extract('release_metadata', process_year, years=years)
+    return total_rows, failed
+
+
+def main(
+    years: list[int] | None = None,
+    deadline: Deadline | None = None,
+    release_ids: set[str] | None = None,
+    force: bool = False,
+    time_budget: float | None = RELEASE_TIME_BUDGET_SECONDS,
+) -> int:
+    return run_extract(
+        'release_metadata',
+        lambda year: process_year(year, deadline, release_ids, force, time_budget),
+        years=years,
+        deadline=deadline,
+    )
 
 
 if __name__ == '__main__':
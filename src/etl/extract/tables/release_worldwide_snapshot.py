@@ -1,56 +1,34 @@
 import datetime
 import logging
-import re
-import ssl
-import time
 
-import pandas as pd
+import pyarrow as pa
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
-from src.etl.extract.runner import run_extract
-from src.utils.s3_utils import (
-    find_latest_partition,
-    get_df_from_s3_parquet,
-    load_df_to_s3_parquet,
-)
-from src.utils.scraping import DEFAULT_REQUEST_DELAY, create_scrape_session, get_soup
-
-ssl._create_default_https_context = ssl._create_unverified_context
+from src.etl.extract.html_archive import ARCHIVE_HTML, HtmlArchive
+from src.etl.extract.records import RecordBuilder
+from src.etl.extract.releases import get_release_work, process_release_work
+from src.etl.extract.runner import RELEASE_TIME_BUDGET_SECONDS, Deadline, run_extract
+from src.etl.extract.schemas import DICTIONARY_COLUMNS, conform, text_schema
+from src.etl.extract.stages import PageExtract
+from src.utils.s3_utils import load_arrow_table_to_s3_parquet
+from src.utils.scraping import BOX_OFFICE_MOJO_BASE, make_soup
 
 S3_DATE_FORMAT = '%Y-%m-%d'
-EXPECTED_COLUMNS = {
-    'movie_title',
-    'region',
-    'market',
-    'release_date',
-    'opening',
-    'total_gross',
-    'release_group_url',
-}
-
-_scrape_session = create_scrape_session()
-
-
-def _clean_currency(val: str) -> str | None:
-    if not val or val in ['-', '–', '—', 'N/A']:
-        return None
-    val = re.sub(r'[^\d,]', '', val)
-    val = val.replace(',', '')
-    return val if val else None
-
-
-def _clean_date(val: str) -> str | None:
-    if not val or val in ['-', '–', '—', 'N/A']:
-        return None
-    val = val.strip()
-    return val if val else None
+TEXT_SCHEMA = text_schema('release_worldwide_snapshot')
 
 
 def _parse_regional_table(
-    region_name: str, table: BeautifulSoup
-) -> list[dict[str, str | None]]:
-    records = []
+    region_name: str,
+    table: BeautifulSoup,
+    records: RecordBuilder,
+    **columns: str | None,
+) -> None:
+    """Append the market rows of one regional table to records as page text.
+
+    Dates and amounts are cleaned when the batch is conformed. Extra keyword
+    arguments are set on every row.
+    """
     rows = table.select('tr')
 
     for row in rows[1:]:
@@ -67,11 +45,11 @@ def _parse_regional_table(
         total_gross = None
 
         if len(cells) >= 3:
-            release_date = _clean_date(cells[1].get_text(strip=True))
-            opening = _clean_currency(cells[2].get_text(strip=True))
+            release_date = cells[1].get_text(strip=True)
+            opening = cells[2].get_text(strip=True)
 
         if len(cells) >= 4:
-            total_gross = _clean_currency(cells[3].get_text(strip=True))
+            total_gross = cells[3].get_text(strip=True)
         elif len(cells) == 3:
             total_gross = opening
             opening = None
@@ -83,131 +61,140 @@ def _parse_regional_table(
                 'release_date': release_date,
                 'opening': opening,
                 'total_gross': total_gross,
+                **columns,
             }
         )
 
+
+def parse_releasegroup(soup: BeautifulSoup, release_group_url: str) -> RecordBuilder:
+    """Parse the regional tables of a Box Office Mojo releasegroup page."""
+    records = RecordBuilder(TEXT_SCHEMA)
+
+    movie_title = None
+    title_elem = soup.find('h1', class_='a-size-extra-large')
+    if title_elem:
+        movie_title = title_elem.get_text(strip=True)
+
+    tables = soup.find_all('table', class_='releases-by-region')
+    for table in tables:
+        region_header = table.find('th', attrs={'colspan': '4'})
+        if not region_header:
+            continue
+
+        region_text = region_header.get_text(strip=True)
+        if not region_text or region_text.lower() == 'worldwide':
+            continue
+
+        _parse_regional_table(
+            region_text,
+            table,
+            records,
+            movie_title=movie_title,
+            release_group_url=release_group_url,
+        )
+
     return records
 
 
-def _scrape_releasegroup(release_group_id: str) -> pd.DataFrame:
-    """Scrape regional box office data for a release group."""
-    release_group_url = (
-        f'https://www.boxofficemojo.com/releasegroup/{release_group_id}/'
-    )
-    try:
-        soup = get_soup(_scrape_session, release_group_url)
-        all_records = []
-
-        movie_title = None
-        title_elem = soup.find('h1', class_='a-size-extra-large')
-        if title_elem:
-            movie_title = title_elem.get_text(strip=True)
-
-        tables = soup.find_all('table', class_='releases-by-region')
-        for table in tables:
-            region_header = table.find('th', attrs={'colspan': '4'})
-            if not region_header:
-                continue
-
-            region_text = region_header.get_text(strip=True)
-            if not region_text or region_text.lower() == 'worldwide':
-                continue
-
-            records = _parse_regional_table(region_text, table)
-            for rec in records:
-                rec['movie_title'] = movie_title
-                rec['release_group_url'] = release_group_url
-            all_records.extend(records)
-
-        return pd.DataFrame(all_records)
-    except Exception as e:
-        logging.warning(f'Failed to scrape {release_group_id}: {e}')
-        return pd.DataFrame()
-
-
-def _get_release_ids_from_s3(year: int) -> list[str]:
-    """Get release group IDs for a given year from S3."""
-    try:
-        partition = find_latest_partition(f'raw/release_id_lookup/release_year={year}')
-        if not partition:
-            logging.warning(f'No release_id_lookup partitions for {year}')
-            return []
-        df = get_df_from_s3_parquet(f'{partition}/*.parquet')
-        urls = df['release_group_url'].drop_duplicates().tolist()
-        return [_extract_release_group_id(url) for url in urls]
-    except Exception as e:
-        logging.warning(f'Could not read release_id_lookup for {year}: {e}')
-        return []
-
-
-def _extract_release_group_id(url: str) -> str:
-    """Extract release group ID from URL"""
-    match = re.search(r'/releasegroup/(gr\d+)/', url)
-    if match:
-        return match.group(1)
-    return url.split('/')[-2] if url.endswith('/') else url.split('/')[-1]
-
-
-def load(df: pd.DataFrame, release_group_id: str) -> int:
-    """Load a DataFrame to S3 partitioned by release_group_id and scraped_date."""
-    if df.empty:
+def parse_page(html: str, release_group_id: str, url: str) -> pa.Table:
+    """Parse a releasegroup page into a conformed release_worldwide_snapshot table."""
+    records = parse_releasegroup(make_soup(html), url)
+    return conform(records.to_table(), 'release_worldwide_snapshot')
+
+
+def release_group_url(release_group_id: str) -> str:
+    return f'{BOX_OFFICE_MOJO_BASE}/releasegroup/{release_group_id}/'
+
+
+def load(
+    table: pa.Table,
+    release_group_id: str,
+    scraped_date: datetime.date | None = None,
+) -> int:
+    """Load a table to S3 partitioned by release_group_id and scraped_date.
+
+    scraped_date defaults to today.
+    """
+    if table.num_rows == 0:
         logging.debug(f'No data to load for {release_group_id}')
         return 0
-    missing = EXPECTED_COLUMNS - set(df.columns)
-    if missing:
-        logging.warning(
-            f'Data for {release_group_id} is missing columns: {missing}. '
-            f'Got columns: {list(df.columns)}'
-        )
-        return 0
 
-    formatted_date = datetime.date.today().strftime(S3_DATE_FORMAT)
+    formatted_date = (scraped_date or datetime.date.today()).strftime(S3_DATE_FORMAT)
     s3_key = (
         f'raw/release_worldwide_snapshot/release_group_id={release_group_id}/'
         f'scraped_date={formatted_date}/data'
     )
-    return load_df_to_s3_parquet(df=df, s3_key=s3_key)
+    return load_arrow_table_to_s3_parquet(
+        table=table,
+        s3_key=s3_key,
+        dictionary_columns=DICTIONARY_COLUMNS['release_worldwide_snapshot'],
+    )
 
 
-def process_year(year: int) -> tuple[int, list[str]]:
+def process_year(
+    year: int,
+    deadline: Deadline | None = None,
+    release_ids: set[str] | None = None,
+    force: bool = False,
+    time_budget: float | None = RELEASE_TIME_BUDGET_SECONDS,
+) -> tuple[int, list[str]]:
     """
-    Process all release groups for a given year.
+    Process the release groups of a given year, most active first.
+
+    Args:
+        year: Release year.
+        deadline: Run deadline; release groups left when it nears are deferred.
+        release_ids: Scrape only these IDs, whether due or not.
+        force: Scrape every release, whether due or not.
+        time_budget: Seconds before the remaining releases are deferred
+            (None: only the deadline defers them).
 
     Returns:
         tuple: (total_rows_loaded, list_of_failed_ids)
     """
     logging.info(f'Processing release worldwide snapshot data for {year}.')
-    release_group_ids = _get_release_ids_from_s3(year)
+    work = get_release_work(year, 'release_group_url')
 
-    if not release_group_ids:
+    if not work:
         logging.warning(f'No release groups found for {year}.')
         return 0, []
 
-    logging.info(f'Found {len(release_group_ids)} release groups for {year}.')
-
-    total_rows = 0
-    failed_release_groups = []
+    logging.info(f'Found {len(work)} release groups for {year}.')
 
-    for count, release_group_id in enumerate(release_group_ids, start=1):
-        logging.info(f'Processing {count}/{len(release_group_ids)}: {release_group_id}')
-        try:
-            df = _scrape_releasegroup(release_group_id)
-            rows = load(df, release_group_id)
-            total_rows += rows
-            if rows > 0:
-                logging.debug(f'Loaded {rows} rows for {release_group_id}')
-        except Exception as e:
-            logging.error(f'Failed to process {release_group_id}: {e}')
-            failed_release_groups.append(release_group_id)
-
-        time.sleep(DEFAULT_REQUEST_DELAY)
+    archive = HtmlArchive('release_worldwide_snapshot', year) if ARCHIVE_HTML else None
+    try:
+        total_rows, failed = process_release_work(
+            'release_worldwide_snapshot',
+            work,
+            PageExtract(
+                url=release_group_url, parse=parse_page, write=load, archive=archive
+            ),
+            deadline=deadline,
+            item_ids=release_ids,
+            force=force,
+            time_budget=time_budget,
+        )
+    finally:
+        if archive is not None:
+            archive.flush()
 
     logging.info(f'Loaded {total_rows} rows for {year}.')
-    return total_rows, failed_release_groups
-
-
-def main(years: list[int] | None = None) -> None:
-    run_extract('release_worldwide_snapshot', process_year, years=years)
+    return total_rows, failed
+
+
+def main(
+    years: list[int] | None = None,
+    deadline: Deadline | None = None,
+    release_ids: set[str] | None = None,
+    force: bool = False,
+    time_budget: float | None = RELEASE_TIME_BUDGET_SECONDS,
+) -> int:
+    return run_extract(
+        'release_worldwide_snapshot',
+        lambda year: process_year(year, deadline, release_ids, force, time_budget),
+        years=years,
+        deadline=deadline,
+    )
 
 
 if __name__ == '__main__':
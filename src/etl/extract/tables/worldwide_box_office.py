@@ -1,14 +1,65 @@
 import datetime
 import logging
+from urllib.parse import urljoin
 
+import lxml.html
 import pandas as pd
-from pandas import read_html
 
-from src.etl.extract.runner import run_extract
-from src.utils.s3_utils import load_df_to_s3_parquet
+from src.etl.extract.runner import Deadline, run_extract
+from src.etl.extract.schemas import DICTIONARY_COLUMNS, conform
+from src.etl.extract.snapshot_changes import capture_changes, read_state, write_state
+from src.utils.s3_utils import load_arrow_table_to_s3_parquet
+from src.utils.scraping import BOX_OFFICE_MOJO_BASE, canonicalize, get_year_world_html
 
 S3_DATE_FORMAT = '%Y-%m-%d'
-EXPECTED_COLUMNS = {'Release Group', 'Worldwide', 'Domestic', 'Foreign'}
+EXPECTED_COLUMNS = {
+    'Release Group',
+    'release_group_url',
+    'Worldwide',
+    'Domestic',
+    'Foreign',
+}
+# Identifies a row when comparing scrapes
+KEY_COLUMN = 'release_group_url'
+
+
+def parse_year_world(html: str) -> pd.DataFrame:
+    """Parse the year/world table from its page HTML.
+
+    Cells are page text, as pandas.read_html gives them (a repeated header
+    gets a '.1' suffix), plus the release_group_url linked from each
+    'Release Group' cell.
+    """
+    tables = lxml.html.fromstring(html).xpath('//table')
+    if not tables:
+        return pd.DataFrame()
+    rows = tables[0].xpath('.//tr')
+
+    columns = []
+    seen = {}
+    for th in rows[0].xpath('./th'):
+        name = th.text_content().strip()
+        columns.append(f'{name}.{seen[name]}' if name in seen else name)
+        seen[name] = seen.get(name, 0) + 1
+    group_index = columns.index('Release Group') if 'Release Group' in columns else None
+
+    records = []
+    links = []
+    for tr in rows[1:]:
+        cells = tr.xpath('./td')
+        if len(cells) != len(columns):
+            continue
+        records.append([td.text_content().strip() for td in cells])
+        hrefs = (
+            cells[group_index].xpath('.//a/@href') if group_index is not None else []
+        )
+        links.append(
+            canonicalize(urljoin(BOX_OFFICE_MOJO_BASE, hrefs[0])) if hrefs else None
+        )
+
+    df = pd.DataFrame(records, columns=columns)
+    df['release_group_url'] = links
+    return df
 
 
 def extract(start_year: int | None = None, end_year: int | None = None) -> pd.DataFrame:
@@ -24,44 +75,74 @@ def extract(start_year: int | None = None, end_year: int | None = None) -> pd.Da
     for year in years:
         try:
             logging.info(f'Extracting worldwide box office data for {year}.')
-            url = f'https://www.boxofficemojo.com/year/world/{year}'
-            dfs.append(read_html(url)[0])
+            dfs.append(parse_year_world(get_year_world_html(year)))
         except Exception as e:
             logging.error(f'Failed for {year}: {e}')
     return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
 
 
-def load(df: pd.DataFrame, year: int) -> int:
+def _is_complete(df: pd.DataFrame, year: int) -> bool:
     if df.empty:
         logging.warning(f'No worldwide box office data found for {year}.')
-        return 0
+        return False
     missing = EXPECTED_COLUMNS - set(df.columns)
     if missing:
         logging.warning(
             f'Worldwide box office data for {year} is missing columns: {missing}. '
             f'Got columns: {list(df.columns)}'
         )
-        return 0
-    formatted_date = datetime.date.today().strftime(S3_DATE_FORMAT)
+        return False
+    return True
+
+
+def load(df: pd.DataFrame, year: int) -> int:
+    """Write the rows that changed since the year's previous scrape.
+
+    See snapshot_changes. A partition is written even when nothing changed.
+
+    Returns:
+        Number of changed rows written.
+    """
+    scraped_date = datetime.date.today()
+    table = conform(df, 'worldwide_box_office')
+    try:
+        state = read_state('worldwide_box_office', year)
+    except Exception as e:
+        logging.warning(f'Could not read the {year} state, writing a full table: {e}')
+        state = None
+    changes, new_state = capture_changes(state, table, KEY_COLUMN, scraped_date)
+    logging.info(
+        f'{changes.num_rows} of {table.num_rows} worldwide box office rows '
+        f'for {year} changed.'
+    )
+
+    formatted_date = scraped_date.strftime(S3_DATE_FORMAT)
     s3_key = f'raw/worldwide_box_office/release_year={year}/scraped_date={formatted_date}/data'
-    return load_df_to_s3_parquet(df=df, s3_key=s3_key)
+    rows = load_arrow_table_to_s3_parquet(
+        table=changes,
+        s3_key=s3_key,
+        dictionary_columns=DICTIONARY_COLUMNS['worldwide_box_office'],
+    )
+    write_state('worldwide_box_office', year, new_state)
+    return rows
 
 
 def process_year(year: int) -> tuple[int, list[str]]:
     """Extract and load worldwide box office data for a given year."""
     try:
         df = extract(start_year=year, end_year=year)
-        rows = load(df, year)
-        if rows == 0:
+        if not _is_complete(df, year):
             return 0, [str(year)]
-        return rows, []
+        return load(df, year), []
     except Exception as e:
         logging.error(f'Failed for {year}: {e}')
         return 0, [str(year)]
 
 
-def main(years: list[int] | None = None) -> None:
-    run_extract('worldwide_box_office', process_year, years=years)
+def main(years: list[int] | None = None, deadline: Deadline | None = None) -> int:
+    return run_extract(
+        'worldwide_box_office', process_year, years=years, deadline=deadline
+    )
 
 
 if __name__ == '__main__':
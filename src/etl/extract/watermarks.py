@@ -0,0 +1,78 @@
+"""Per-release watermarks of extracts that store only new rows.
+
+A release's daily table on Box Office Mojo grows by a row a day and
+otherwise rarely changes. release_domestic keeps the highest day number it
+has stored for every release (its watermark) in a small Parquet state table
+in S3, and each scrape stores only the days after the watermark, plus a
+short lookback for late revisions such as weekend estimates replaced by
+actuals. cleaned.release_domestic merges the partitions back into one
+daily series, taking every day from the latest scrape that has it.
+
+A release without a watermark (new, or lost state) has its whole table
+stored, as before.
+"""
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.utils.s3_utils import (
+    get_df_from_s3_parquet,
+    load_df_to_s3_parquet,
+    s3_object_exists,
+)
+
+WATERMARKS_KEY = 'extract_state/watermarks'
+
+
+def read_watermarks(name: str) -> dict[str, int]:
+    """item_id -> watermark of an extract."""
+    if not s3_object_exists(f'{WATERMARKS_KEY}.parquet'):
+        return {}
+    state = get_df_from_s3_parquet(f'{WATERMARKS_KEY}.parquet')
+    state = state[state['extract'] == name]
+    return dict(zip(state['item_id'], state['watermark'].astype('int64')))
+
+
+def record_watermarks(name: str, watermarks: dict[str, int]) -> None:
+    """Set the watermarks of the given items of an extract."""
+    if not watermarks:
+        return
+
+    if s3_object_exists(f'{WATERMARKS_KEY}.parquet'):
+        state = get_df_from_s3_parquet(f'{WATERMARKS_KEY}.parquet')
+        state = state[
+            ~((state['extract'] == name) & state['item_id'].isin(list(watermarks)))
+        ]
+    else:
+        state = pd.DataFrame(columns=['extract', 'item_id', 'watermark'])
+    updated = pd.DataFrame(
+        {
+            'extract': name,
+            'item_id': list(watermarks),
+            'watermark': list(watermarks.values()),
+        }
+    )
+    state = pd.concat([state, updated], ignore_index=True)
+    load_df_to_s3_parquet(state.sort_values(['extract', 'item_id']), WATERMARKS_KEY)
+
+
+def after_watermark(
+    table: pa.Table,
+    column: str,
+    watermark: int | None,
+    lookback: int,
+) -> pa.Table:
+    """Rows of table with column above watermark - lookback.
+
+    Rows with a null column are kept. No watermark keeps every row.
+    """
+    if watermark is None:
+        return table
+    keep = pc.fill_null(pc.greater(table[column], watermark - lookback), True)
+    return table.filter(keep)
+
+
+def watermark(table: pa.Table, column: str) -> int | None:
+    """Highest value of column in table (None if the table has none)."""
+    return pc.max(table[column]).as_py()
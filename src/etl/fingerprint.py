@@ -0,0 +1,90 @@
+import hashlib
+import logging
+from collections.abc import Collection
+
+from src import project_root
+from src.etl.extract.main import ALL_EXTRACTS
+from src.utils.s3_utils import list_s3_object_etags, read_json_from_s3, write_json_to_s3
+
+FINGERPRINT_KEY = 'published_tables/input_fingerprint.json'
+PROJECT_KEY = 'sqlmesh_project'
+
+
+def _hash_items(items: list[tuple[str, str]]) -> str:
+    digest = hashlib.sha256()
+    for key, value in sorted(items):
+        digest.update(f'{key}\0{value}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _project_hash() -> str:
+    """Hash the SQLMesh project so model changes force a rebuild."""
+    project_path = project_root / 'src' / 'sqlmesh_project'
+    files = [project_path / 'config.py', *project_path.glob('models/**/*.sql')]
+    return _hash_items(
+        [
+            (str(path.relative_to(project_path)), path.read_text())
+            for path in files
+            if path.is_file()
+        ]
+    )
+
+
+def compute_input_fingerprint() -> dict[str, str]:
+    """Fingerprint the raw inputs of the transform and load stages.
+
+    Returns:
+        Dict of extract name to a hash of the ETags under raw/<extract>/,
+        plus a hash of the SQLMesh project under PROJECT_KEY.
+    """
+    fingerprint = {PROJECT_KEY: _project_hash()}
+    for name in ALL_EXTRACTS:
+        fingerprint[name] = _hash_items(
+            list(list_s3_object_etags(f'raw/{name}').items())
+        )
+    return fingerprint
+
+
+def read_published_fingerprint() -> dict[str, str]:
+    """Return the fingerprint recorded by the last successful publish."""
+    return read_json_from_s3(FINGERPRINT_KEY) or {}
+
+
+def write_published_fingerprint(fingerprint: dict[str, str]) -> None:
+    write_json_to_s3(fingerprint, FINGERPRINT_KEY)
+
+
+def resolve_updated_extracts(
+    updated_extracts: Collection[str] | None,
+    fingerprint: dict[str, str],
+) -> set[str] | None:
+    """Combine this run's updated extracts with inputs changed since the last publish.
+
+    Inputs written by an earlier run whose transform or load failed are picked
+    up because their fingerprint still differs from the published one.
+
+    Args:
+        updated_extracts: Extracts that wrote data in this run.
+        fingerprint: Fingerprint from compute_input_fingerprint().
+
+    Returns:
+        Extracts whose downstream tables need rebuilding, or None if the
+        SQLMesh project changed and everything must be rebuilt.
+    """
+    published = read_published_fingerprint()
+    if published.get(PROJECT_KEY) != fingerprint[PROJECT_KEY]:
+        logging.info('SQLMesh project changed since last publish.')
+        return None
+
+    changed = {
+        name
+        for name, value in fingerprint.items()
+        if name != PROJECT_KEY and published.get(name) != value
+    }
+    changed |= set(updated_extracts or ())
+
+    if changed:
+        logging.info(f'Inputs changed since last publish: {sorted(changed)}')
+    else:
+        logging.info('Inputs unchanged since last publish.')
+    return changed
@@ -1,20 +1,297 @@
+import datetime
 import logging
+import time
+from collections.abc import Collection
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 
-from src import database_path
-from src.utils.logging_config import setup_logging
-from src.utils.s3_utils import load_duckdb_table_to_s3_parquet
+import duckdb
 
-setup_logging()
+from src import database_name, database_path
+from src.etl.fingerprint import write_published_fingerprint
+from src.utils.metrics import metrics
+from src.utils.profiling import profile_stage
+from src.utils.s3_utils import (
+    delete_s3_prefix,
+    list_partition_values,
+    load_duckdb_table_to_s3_parquet,
+    read_json_from_s3,
+    write_json_to_s3,
+)
 
+FULL_REWRITE_WEEKDAY = 6  # Sunday
+MAX_PUBLISH_WORKERS = 4
+# Set to now() by every published model, so it is left out of the checksums
+PUBLISHED_AT_COLUMN = 'published_timestamp_utc'
+
+
+@dataclass(frozen=True)
+class PublishedTable:
+    """A SQLMesh model published to S3 under published_tables/."""
+
+    name: str
+    model: str
+    sources: tuple[str, ...]
+    version: str = 'v1'
+    schema_name: str = 'published'
+    partition_column: str | None = None
+
+    @property
+    def prefix(self) -> str:
+        return f'published_tables/{self.name}/{self.version}'
+
+    @property
+    def manifest_key(self) -> str:
+        return f'{self.prefix}/manifest.json'
+
+
+PUBLISHED_TABLES = [
+    PublishedTable(
+        name='daily_ranks',
+        model='worldwide_box_office',
+        sources=('worldwide_box_office',),
+        version='v2',
+        partition_column='loaded_date',
+    ),
+    PublishedTable(
+        name='release_metadata',
+        model='release_metadata',
+        sources=('release_metadata',),
+        version='v2',
+    ),
+    PublishedTable(
+        name='release_domestic_daily',
+        model='release_domestic_daily',
+        sources=('release_domestic',),
+    ),
+    PublishedTable(
+        name='release_regional_snapshots',
+        model='release_regional_snapshots',
+        sources=('release_worldwide_snapshot',),
+        version='v2',
+    ),
+]
+
+
+def _get_partition_checksums(table: PublishedTable) -> dict[str, dict]:
+    """Return {partition_value: {'rows': ..., 'checksum': ...}} of a table.
+
+    The checksum is the sum of the row hashes, so it changes when any value
+    in the partition changes, not only when its row count does. The publish
+    timestamp is left out: it differs on every run even for the same data.
+    """
+    with duckdb.connect(database=str(database_path)) as con:
+        rows = con.execute(
+            f'select cast({table.partition_column} as varchar), count(*), '
+            f'cast(sum(hash(t)) as varchar) '
+            f'from (select * exclude ({PUBLISHED_AT_COLUMN}) '
+            f'from {database_name}.{table.schema_name}.{table.model}) as t '
+            f'group by 1'
+        ).fetchall()
+    return {
+        partition: {'rows': count, 'checksum': checksum}
+        for partition, count, checksum in rows
+        if partition is not None
+    }
+
+
+def _partition_s3_key(table: PublishedTable, partition: str) -> str:
+    return f'{table.prefix}/{table.partition_column}={partition}/data'
+
+
+def _partitions_to_publish(
+    checksums: dict[str, dict], manifest: dict | None
+) -> list[str]:
+    """Pick partitions that are new or whose contents changed."""
+    published = (manifest or {}).get('partitions', {})
+    return sorted(
+        partition
+        for partition, stats in checksums.items()
+        if partition not in published
+        or published[partition].get('checksum') != stats['checksum']
+    )
+
+
+def _delete_dropped_partitions(table: PublishedTable, partitions: set[str]) -> None:
+    """Delete the partition files of values that are no longer in the table."""
+    listed = list_partition_values(table.prefix, table.partition_column)
+    for partition in sorted(listed - partitions):
+        delete_s3_prefix(f'{table.prefix}/{table.partition_column}={partition}')
+        logging.info(f'Deleted dropped {table.name} partition {partition}.')
+
+
+def publish_partitioned_table(table: PublishedTable, full_rewrite: bool = False) -> int:
+    """Publish a table as one Parquet file per partition_column value.
+
+    In delta mode only partitions that are new or whose checksum changed are
+    uploaded and the manifest is updated in place. A full rewrite republishes
+    every partition, rebuilds the manifest from scratch and rebuilds the
+    combined data.parquet, which is therefore current as of the last full
+    rewrite. Either way the files of partitions no longer in the table are
+    deleted.
+
+    Args:
+        table: Published table with a partition_column.
+        full_rewrite: Republish every partition and the combined file.
+
+    Returns:
+        Number of rows published in partition files.
+    """
+    manifest = None if full_rewrite else read_json_from_s3(table.manifest_key)
+    if manifest is None and not full_rewrite:
+        logging.info(f'No {table.name} manifest found, falling back to a full rewrite.')
+        full_rewrite = True
+
+    checksums = _get_partition_checksums(table)
+    if full_rewrite:
+        partitions = sorted(checksums)
+        manifest_partitions = {}
+    else:
+        partitions = _partitions_to_publish(checksums, manifest)
+        manifest_partitions = {
+            partition: entry
+            for partition, entry in manifest.get('partitions', {}).items()
+            if partition in checksums
+        }
 
-def main() -> None:
     logging.info(
-        'Reading published.worldwide_box_office from DuckDB database for publishing.'
+        f'Publishing {len(partitions)} of {len(checksums)} {table.name} partitions '
+        f'({"full rewrite" if full_rewrite else "delta"}).'
+    )
+
+    published_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    rows_published = 0
+    for partition in partitions:
+        s3_key = _partition_s3_key(table, partition)
+        rows = load_duckdb_table_to_s3_parquet(
+            database_path=database_path,
+            table_name=table.model,
+            s3_key=s3_key,
+            schema_name=table.schema_name,
+            where=f"cast({table.partition_column} as varchar) = '{partition}'",
+        )
+        manifest_partitions[partition] = {
+            'key': f'{s3_key}.parquet',
+            'rows': rows,
+            'checksum': checksums[partition]['checksum'],
+            'published_timestamp_utc': published_at,
+        }
+        rows_published += rows
+
+    # Rewriting the combined file daily would upload the whole history every
+    # run; between full rewrites the partitions in the manifest are current
+    if full_rewrite:
+        load_duckdb_table_to_s3_parquet(
+            database_path=database_path,
+            table_name=table.model,
+            s3_key=f'{table.prefix}/data',
+            schema_name=table.schema_name,
+        )
+
+    write_json_to_s3(
+        {
+            'table': table.name,
+            'version': table.version,
+            'partition_column': table.partition_column,
+            'updated_timestamp_utc': published_at,
+            'last_full_rewrite_timestamp_utc': (
+                published_at
+                if full_rewrite
+                else manifest.get('last_full_rewrite_timestamp_utc')
+            ),
+            'partitions': manifest_partitions,
+        },
+        table.manifest_key,
     )
+    _delete_dropped_partitions(table, set(checksums))
+
+    return rows_published
+
+
+def publish_table(table: PublishedTable, full_rewrite: bool = False) -> int:
+    """Publish one table to S3, partitioned or as a single data.parquet."""
+    if table.partition_column:
+        return publish_partitioned_table(table, full_rewrite=full_rewrite)
 
-    load_duckdb_table_to_s3_parquet(
+    return load_duckdb_table_to_s3_parquet(
         database_path=database_path,
-        table_name='worldwide_box_office',
-        s3_key='published_tables/daily_ranks/v1/data',
-        schema_name='published',
+        table_name=table.model,
+        s3_key=f'{table.prefix}/data',
+        schema_name=table.schema_name,
     )
+
+
+def _timed_publish(table: PublishedTable, full_rewrite: bool) -> tuple[int, float]:
+    start = time.perf_counter()
+    rows = publish_table(table, full_rewrite=full_rewrite)
+    elapsed = time.perf_counter() - start
+    metrics.record_timing('publish_table', elapsed, table=table.name)
+    metrics.increment('rows_published', rows, table=table.name)
+    return rows, elapsed
+
+
+def main(
+    full_rewrite: bool | None = None,
+    tables: list[PublishedTable] | None = None,
+    updated_extracts: Collection[str] | None = None,
+    input_fingerprint: dict[str, str] | None = None,
+) -> None:
+    """Publish tables to S3 concurrently.
+
+    Args:
+        full_rewrite: Force (True) or suppress (False) a full rewrite of
+            partitioned tables. If None, a full rewrite runs on
+            FULL_REWRITE_WEEKDAY.
+        tables: Tables to publish. Defaults to PUBLISHED_TABLES.
+        updated_extracts: Extracts whose downstream models were rebuilt. Only
+            tables with a source in this set are published. If None, every
+            table is published; if empty, publishing is skipped.
+        input_fingerprint: Fingerprint of the raw inputs, recorded once every
+            table has been published (or when no table needs publishing).
+    """
+    if full_rewrite is None:
+        full_rewrite = datetime.date.today().weekday() == FULL_REWRITE_WEEKDAY
+    if tables is None:
+        tables = PUBLISHED_TABLES
+    if updated_extracts is not None:
+        tables = [
+            table for table in tables if set(table.sources) & set(updated_extracts)
+        ]
+        if not tables:
+            logging.info('No published tables have new inputs, skipping publish.')
+            # Nothing downstream of the changed inputs, so they count as
+            # published; otherwise every later run would rebuild for them
+            if input_fingerprint is not None:
+                write_published_fingerprint(input_fingerprint)
+            return
+
+    logging.info(f'Publishing {len(tables)} tables from DuckDB database.')
+
+    errors = []
+    with (
+        metrics.timer('load'),
+        profile_stage('load'),
+        ThreadPoolExecutor(max_workers=MAX_PUBLISH_WORKERS) as executor,
+    ):
+        futures = {
+            executor.submit(_timed_publish, table, full_rewrite): table
+            for table in tables
+        }
+        for future in as_completed(futures):
+            table = futures[future]
+            try:
+                rows, elapsed = future.result()
+                logging.info(
+                    f'Published {table.schema_name}.{table.model} to {table.prefix}: '
+                    f'{rows} rows in {elapsed:.1f}s.'
+                )
+            except Exception as e:
+                logging.error(f'Publishing {table.name} failed: {e}')
+                errors.append((table.name, e))
+
+    if errors:
+        failed = ', '.join(name for name, _ in errors)
+        raise RuntimeError(f'Publishing failed for: {failed}')
+
+    if input_fingerprint is not None:
+        write_published_fingerprint(input_fingerprint)
@@ -1,15 +1,86 @@
 import logging
+from collections.abc import Collection, Iterator
+from contextlib import contextmanager
 
+from sqlmesh.core import constants as c
 from sqlmesh.core.context import Context
 
 from src import project_root
-from src.utils.logging_config import setup_logging
+from src.utils.metrics import metrics
+from src.utils.profiling import profile_stage
 
-setup_logging()
 
+@contextmanager
+def _record_model_timings(sqlmesh_context: Context) -> Iterator[None]:
+    """Record per-model evaluation time from SQLMesh console progress updates.
+
+    The console is SQLMesh's process-wide singleton, so the original method
+    is put back on exit; otherwise every later run would stack a wrapper.
+    """
+    console = sqlmesh_context.console
+    update_progress = console.update_snapshot_evaluation_progress
+
+    def _update_progress(snapshot, interval, batch_idx, duration_ms, *args, **kwargs):
+        if duration_ms is not None:
+            metrics.record_timing(
+                'sqlmesh_model', duration_ms / 1000, model=snapshot.name
+            )
+        return update_progress(
+            snapshot, interval, batch_idx, duration_ms, *args, **kwargs
+        )
+
+    console.update_snapshot_evaluation_progress = _update_progress
+    try:
+        yield
+    finally:
+        console.update_snapshot_evaluation_progress = update_progress
+
+
+def _prod_has_current_snapshots(sqlmesh_context: Context) -> bool:
+    """Whether prod already holds the current snapshot of every model.
+
+    Only then can the plan be restricted to some models: any other model
+    must already have a table to promote. A fresh DuckDB (every Modal run)
+    or a changed model fails this check.
+    """
+    environment = sqlmesh_context.state_reader.get_environment(c.PROD)
+    if environment is None:
+        return False
+    promoted = {snapshot.snapshot_id for snapshot in environment.snapshots}
+    return all(
+        snapshot.snapshot_id in promoted
+        for snapshot in sqlmesh_context.snapshots.values()
+    )
+
+
+def main(updated_extracts: Collection[str] | None = None) -> None:
+    """Run SQLMesh plan and apply.
+
+    Args:
+        updated_extracts: Extracts that wrote new data this run. Only models
+            downstream of their raw.<extract> models are backfilled, as long
+            as SQLMesh state already has every other model. If None, every
+            model is planned; if empty, the transform is skipped.
+    """
+    if updated_extracts is not None and not updated_extracts:
+        logging.info('No extracts wrote new data, skipping SQLMesh plan.')
+        return
 
-def main() -> None:
     logging.info('Running SQLMesh plan and apply.')
-    sqlmesh_context = Context(paths=project_root / 'src' / 'sqlmesh_project')
+    with metrics.timer('transform'), profile_stage('transform'):
+        sqlmesh_context = Context(paths=project_root / 'src' / 'sqlmesh_project')
+
+        backfill_models = None
+        if updated_extracts is not None:
+            if _prod_has_current_snapshots(sqlmesh_context):
+                backfill_models = [f'raw.{name}+' for name in sorted(updated_extracts)]
+                logging.info(f'Restricting SQLMesh backfill to: {backfill_models}')
+            else:
+                logging.info('SQLMesh state lacks some models, planning every model.')
 
-    sqlmesh_context.plan(include_unmodified=True, auto_apply=True)
+        with _record_model_timings(sqlmesh_context):
+            sqlmesh_context.plan(
+                include_unmodified=True,
+                auto_apply=True,
+                backfill_models=backfill_models,
+            )
@@ -10,6 +10,32 @@ from sqlmesh.core.config import (
 )
 
 from src import database_path
+from src.utils.s3_utils import (
+    get_httpfs_extension,
+    get_local_storage_root,
+    get_storage_uri,
+)
+
+# With LOCAL_STORAGE_ROOT set the raw data is on disk, so neither httpfs nor
+# S3 credentials are needed.
+s3_connection_options = (
+    {}
+    if get_local_storage_root()
+    else {
+        'extensions': [
+            {'name': get_httpfs_extension()},
+        ],
+        'secrets': {
+            'write_secret': {
+                'type': 'S3',
+                'region': os.getenv('S3_REGION'),
+                'endpoint': os.getenv('S3_ENDPOINT'),
+                'key_id': os.getenv('S3_ACCESS_KEY_ID'),
+                'secret': os.getenv('S3_SECRET_ACCESS_KEY'),
+            }
+        },
+    }
+)
 
 config = Config(
     model_defaults=ModelDefaultsConfig(dialect='duckdb'),
@@ -17,23 +43,15 @@ config = Config(
         'duckdb': GatewayConfig(
             connection=DuckDBConnectionConfig(
                 database=str(database_path),
-                extensions=[
-                    {'name': 'httpfs'},
-                ],
-                secrets={
-                    'write_secret': {
-                        'type': 'S3',
-                        'region': os.getenv('S3_REGION'),
-                        'endpoint': os.getenv('S3_ENDPOINT'),
-                        'key_id': os.getenv('S3_ACCESS_KEY_ID'),
-                        'secret': os.getenv('S3_SECRET_ACCESS_KEY'),
-                    }
-                },
+                **s3_connection_options,
             )
         )
     },
     variables={
         'bucket': os.getenv('S3_BUCKET'),
+        # Root of the raw/ data. Set DATA_ROOT to a local directory to run the
+        # models against files on disk instead of the S3 bucket.
+        'data_root': os.getenv('DATA_ROOT') or get_storage_uri(),
         'year': datetime.datetime.now(timezone.utc).year,
     },
 )
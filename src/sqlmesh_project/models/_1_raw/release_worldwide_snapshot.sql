@@ -5,4 +5,4 @@ MODEL (
 
 select
     *
-from read_parquet('s3://' || @bucket || '/raw/release_worldwide_snapshot/release_group_id=*/scraped_date=*/data.parquet', filename=true, union_by_name=true)
+from read_parquet(@data_root || '/raw/release_worldwide_snapshot/release_group_id=*/scraped_date=*/data.parquet', filename=true)
@@ -0,0 +1,11 @@
+MODEL (
+  name raw.worldwide_box_office_scrapes,
+  kind FULL
+);
+
+-- Every scrape of worldwide_box_office, including the ones that found no
+-- changes and wrote an empty file
+select
+    split_part(split_part(file, 'release_year=', 2), '/', 1) as release_year
+    , strptime(split_part(split_part(file, 'scraped_date=', 2), '/', 1), '%Y-%m-%d') as scraped_date_from_s3
+from glob(@data_root || '/raw/worldwide_box_office/release_year=*/scraped_date=*/data.parquet')
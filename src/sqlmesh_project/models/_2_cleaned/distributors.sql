@@ -0,0 +1,13 @@
+MODEL (
+  name cleaned.distributors,
+  kind FULL
+);
+
+select
+    row_number() over (order by distributor)::int as distributor_key
+    , distributor
+from (
+    select distinct distributor
+    from raw.release_metadata
+    where distributor is not null
+)
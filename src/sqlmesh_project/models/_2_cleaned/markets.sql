@@ -0,0 +1,16 @@
+MODEL (
+  name cleaned.markets,
+  kind FULL
+);
+
+select
+    row_number() over (order by regions.region, snapshot.market)::smallint as market_key
+    , regions.region_key
+    , snapshot.market
+from (
+    select distinct region, market
+    from raw.release_worldwide_snapshot
+    where market is not null
+) as snapshot
+inner join cleaned.regions as regions
+    on snapshot.region = regions.region
@@ -0,0 +1,13 @@
+MODEL (
+  name cleaned.regions,
+  kind FULL
+);
+
+select
+    row_number() over (order by region)::smallint as region_key
+    , region
+from (
+    select distinct region
+    from raw.release_worldwide_snapshot
+    where region is not null
+)
@@ -0,0 +1,21 @@
+MODEL (
+  name cleaned.release_domestic,
+  kind FULL
+);
+
+select
+    release_id
+    , "Date" as date_label
+    , "DOW" as day_of_week
+    , "Rank" as rank
+    , "Daily" as daily_gross
+    , "Theaters" as theaters
+    , "To Date" as to_date_gross
+    , "Day" as day_number
+    , scraped_date
+from raw.release_domestic
+-- Scrapes store only the days after the release's watermark (plus a lookback),
+-- so every day comes from the latest scrape that has it
+qualify row_number() over (
+    partition by release_id, "Day", "Date" order by scraped_date desc
+) = 1
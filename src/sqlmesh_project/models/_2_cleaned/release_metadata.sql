@@ -4,15 +4,18 @@ MODEL (
 );
 
 select
-    release_id
-    , movie_title
-    , distributor
-    , try_cast(opening_amount as int) as opening_amount
-    , try_cast(opening_theaters as int) as opening_theaters
-    , release_date
-    , rating
-    , runtime
-    , genres
-    , try_cast(widest_release as int) as widest_release
-    , scraped_date
-from raw.release_metadata
+    metadata.release_id
+    , metadata.movie_title
+    , distributors.distributor_key
+    , metadata.opening_amount
+    , metadata.opening_theaters
+    , metadata.release_date
+    , metadata.close_date
+    , metadata.rating
+    , metadata.runtime
+    , metadata.genres
+    , metadata.widest_release
+    , metadata.scraped_date
+from raw.release_metadata as metadata
+left join cleaned.distributors as distributors
+    on metadata.distributor = distributors.distributor
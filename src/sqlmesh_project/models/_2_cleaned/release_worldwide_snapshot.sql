@@ -4,13 +4,16 @@ MODEL (
 );
 
 select
-    movie_title
-    , release_group_id
-    , region
-    , market
-    , release_date
-    , try_cast(opening as int) as opening
-    , try_cast(total_gross as int) as total_gross
-    , release_group_url
-    , scraped_date
-from raw.release_worldwide_snapshot
+    snapshot.movie_title
+    , snapshot.release_group_id
+    , markets.market_key
+    , snapshot.release_date
+    , snapshot.opening
+    , snapshot.total_gross
+    , snapshot.scraped_date
+from raw.release_worldwide_snapshot as snapshot
+left join cleaned.regions as regions
+    on snapshot.region = regions.region
+left join cleaned.markets as markets
+    on regions.region_key = markets.region_key
+    and snapshot.market = markets.market
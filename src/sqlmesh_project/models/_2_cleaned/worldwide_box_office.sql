@@ -3,11 +3,101 @@ MODEL (
   kind FULL
 );
 
+-- Versions of the release groups' grosses. A version is valid from valid_from
+-- until the day before valid_to: the next scrape that changed rows of its
+-- release group, or the next whole-table scrape of the year. valid_to is null
+-- for current versions. Raw partitions hold only the release groups whose rows
+-- changed since the previous scrape (see src/etl/extract/snapshot_changes.py).
+-- Release groups are keyed by ID; rows scraped before the IDs were captured
+-- fall back to the title, which is not unique.
+with changes as (
+    select
+        "Release Group" as title
+        , nullif(regexp_extract(release_group_url, '/releasegroup/(gr\d+)/', 1), '') as release_group_id
+        , coalesce(release_group_id, title) as release_key
+        , coalesce("Worldwide", 0) as revenue
+        , coalesce("Domestic", 0) as domestic_rev
+        , coalesce("Foreign", 0) as foreign_rev
+        , cast(scraped_date_from_s3 as date) as valid_from
+        , cast(release_year as int) as release_year
+        -- Files written before change data capture hold whole tables
+        , coalesce(change_type, 'snapshot') as change_type
+    from raw.worldwide_box_office
+)
+
+, key_changes as (
+    select
+        release_year
+        , release_key
+        , valid_from
+        , lead(valid_from) over (
+            partition by release_year, release_key
+            order by valid_from
+        ) as next_change
+    from (select distinct release_year, release_key, valid_from from changes)
+)
+
+, snapshot_dates as (
+    select distinct
+        release_year
+        , valid_from as snapshot_date
+    from changes
+    where change_type = 'snapshot'
+)
+
+, bounded as (
+    select
+        changes.*
+        , least(key_changes.next_change, snapshot_dates.snapshot_date) as valid_to
+    from changes
+    inner join key_changes
+        on changes.release_year = key_changes.release_year
+        and changes.release_key = key_changes.release_key
+        and changes.valid_from = key_changes.valid_from
+    asof left join snapshot_dates
+        on changes.release_year = snapshot_dates.release_year
+        and snapshot_dates.snapshot_date > changes.valid_from
+    where changes.change_type != 'delete'
+)
+
+-- A row continuing one with the same release group, title and grosses that
+-- ended the day it starts (e.g. in daily whole tables) belongs to the same
+-- version
+, numbered as (
+    select
+        *
+        , sum(starts_version::int) over (
+            partition by release_year, release_key, title, revenue, domestic_rev, foreign_rev
+            order by valid_from
+            rows unbounded preceding
+        ) as version_number
+    from (
+        select
+            *
+            , lag(valid_to) over (
+                partition by release_year, release_key, title, revenue, domestic_rev, foreign_rev
+                order by valid_from
+            ) is distinct from valid_from as starts_version
+        from bounded
+    )
+)
+
 select
-    "Release Group" as title
-    , coalesce(try_cast(replace(substring("Worldwide", 2), ',', '') as integer), 0) as revenue
-    , coalesce(try_cast(replace(substring("Domestic", 2), ',', '') as integer), 0) as domestic_rev
-    , coalesce(try_cast(replace(substring("Foreign", 2), ',', '') as integer), 0) as foreign_rev
-    , cast(scraped_date_from_s3 as date) as loaded_date
-    , cast(release_year as int) as release_year
-from raw.worldwide_box_office
+    title
+    , release_group_id
+    , revenue
+    , domestic_rev
+    , foreign_rev
+    , release_year
+    , min(valid_from) as valid_from
+    , arg_max_null(valid_to, valid_from) as valid_to
+from numbered
+group by
+    release_year
+    , release_key
+    , title
+    , release_group_id
+    , revenue
+    , domestic_rev
+    , foreign_rev
+    , version_number
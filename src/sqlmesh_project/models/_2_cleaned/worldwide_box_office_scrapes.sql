@@ -0,0 +1,9 @@
+MODEL (
+  name cleaned.worldwide_box_office_scrapes,
+  kind FULL
+);
+
+select distinct
+    cast(release_year as int) as release_year
+    , cast(scraped_date_from_s3 as date) as loaded_date
+from raw.worldwide_box_office_scrapes
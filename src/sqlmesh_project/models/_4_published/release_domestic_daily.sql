@@ -0,0 +1,17 @@
+MODEL (
+  name published.release_domestic_daily,
+  kind FULL
+);
+
+select
+    release_id
+    , date_label
+    , day_of_week
+    , rank
+    , daily_gross
+    , theaters
+    , to_date_gross
+    , day_number
+    , scraped_date as loaded_date
+    , timezone('UTC', now())::timestamp as published_timestamp_utc
+from cleaned.release_domestic
@@ -0,0 +1,28 @@
+MODEL (
+  name published.release_metadata,
+  kind FULL
+);
+
+with latest as (
+    select *
+    from cleaned.release_metadata
+    qualify row_number() over (partition by release_id order by scraped_date desc) = 1
+)
+
+select
+    latest.release_id
+    , latest.movie_title
+    , distributors.distributor
+    , latest.opening_amount
+    , latest.opening_theaters
+    , latest.release_date
+    , latest.close_date
+    , latest.rating
+    , latest.runtime
+    , latest.genres
+    , latest.widest_release
+    , latest.scraped_date as loaded_date
+    , timezone('UTC', now())::timestamp as published_timestamp_utc
+from latest
+left join cleaned.distributors as distributors
+    on latest.distributor_key = distributors.distributor_key
@@ -0,0 +1,26 @@
+MODEL (
+  name published.release_regional_snapshots,
+  kind FULL
+);
+
+with latest as (
+    select *
+    from cleaned.release_worldwide_snapshot
+    qualify dense_rank() over (partition by release_group_id order by scraped_date desc) = 1
+)
+
+select
+    latest.release_group_id
+    , latest.movie_title
+    , regions.region
+    , markets.market
+    , latest.release_date
+    , latest.opening
+    , latest.total_gross
+    , latest.scraped_date as loaded_date
+    , timezone('UTC', now())::timestamp as published_timestamp_utc
+from latest
+left join cleaned.markets as markets
+    on latest.market_key = markets.market_key
+left join cleaned.regions as regions
+    on markets.region_key = regions.region_key
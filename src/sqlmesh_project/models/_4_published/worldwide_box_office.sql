@@ -3,12 +3,18 @@ MODEL (
   kind FULL
 );
 
+-- The whole table of every scrape, rebuilt from the versions valid that day
 select
-    title
-    , revenue
-    , domestic_rev
-    , foreign_rev
-    , loaded_date
-    , release_year
+    versions.title
+    , versions.release_group_id
+    , versions.revenue
+    , versions.domestic_rev
+    , versions.foreign_rev
+    , scrapes.loaded_date
+    , versions.release_year
     , timezone('UTC', now())::timestamp as published_timestamp_utc
-from cleaned.worldwide_box_office
+from cleaned.worldwide_box_office_scrapes as scrapes
+inner join cleaned.worldwide_box_office as versions
+    on scrapes.release_year = versions.release_year
+    and scrapes.loaded_date >= versions.valid_from
+    and scrapes.loaded_date < coalesce(versions.valid_to, date '9999-12-31')
@@ -0,0 +1,127 @@
+import datetime
+import json
+import logging
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RUN_REPORT_PREFIX = 'run_reports'
+
+
+def _key(name: str, labels: dict) -> tuple[str, tuple[tuple[str, str], ...]]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsCollector:
+    """Thread-safe collector of timings, counters and histograms for one run.
+
+    Every metric is identified by a name plus optional labels, e.g.
+    ``metrics.increment('http_requests', extract='release_metadata')``.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = datetime.datetime.now(datetime.timezone.utc)
+            self._timings: list[dict] = []
+            self._counters: dict[tuple, float] = {}
+            self._histograms: dict[tuple, dict] = {}
+
+    @contextmanager
+    def timer(self, stage: str, **labels) -> Iterator[None]:
+        """Record the wall time of the wrapped block under `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_timing(stage, time.perf_counter() - start, **labels)
+
+    def record_timing(self, stage: str, seconds: float, **labels) -> None:
+        with self._lock:
+            self._timings.append(
+                {'stage': stage, 'labels': labels, 'seconds': round(seconds, 4)}
+            )
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Add a value to a histogram with LATENCY_BUCKETS upper bounds."""
+        key = _key(name, labels)
+        with self._lock:
+            hist = self._histograms.setdefault(
+                key,
+                {
+                    'count': 0,
+                    'sum': 0.0,
+                    'min': value,
+                    'max': value,
+                    'buckets': {str(b): 0 for b in (*LATENCY_BUCKETS, 'inf')},
+                },
+            )
+            hist['count'] += 1
+            hist['sum'] += value
+            hist['min'] = min(hist['min'], value)
+            hist['max'] = max(hist['max'], value)
+            bucket = next((b for b in LATENCY_BUCKETS if value <= b), 'inf')
+            hist['buckets'][str(bucket)] += 1
+
+    def report(self) -> dict:
+        """Return every metric recorded so far as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                'started_timestamp_utc': self.started_at.isoformat(),
+                'finished_timestamp_utc': datetime.datetime.now(
+                    datetime.timezone.utc
+                ).isoformat(),
+                'timings': list(self._timings),
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                'histograms': [
+                    {'name': name, 'labels': dict(labels), **hist}
+                    for (name, labels), hist in sorted(self._histograms.items())
+                ],
+            }
+
+
+metrics = MetricsCollector()
+
+
+def emit_run_report(run_name: str, upload: bool = True) -> dict:
+    """Print the run report as one JSON line and upload it to S3.
+
+    The report is written to run_reports/<run_name>/<date>/<timestamp>.json.
+
+    Args:
+        run_name: Pipeline name (e.g. 'daily', 'backfill').
+        upload: Whether to upload the report to S3.
+
+    Returns:
+        The report dict.
+    """
+    from src.utils.s3_utils import write_json_to_s3
+
+    report = {'run_name': run_name, **metrics.report()}
+    print(json.dumps(report, sort_keys=True))
+
+    if upload:
+        started = metrics.started_at
+        s3_key = (
+            f'{RUN_REPORT_PREFIX}/{run_name}/{started:%Y-%m-%d}/'
+            f'{started:%Y%m%dT%H%M%SZ}.json'
+        )
+        try:
+            write_json_to_s3(report, s3_key)
+        except Exception as e:
+            logging.warning(f'Could not upload run report to {s3_key}: {e}')
+
+    return report
@@ -0,0 +1,39 @@
+import modal
+
+# httpfs is installed here at image build so containers load it from disk
+# instead of downloading it on every cold start (see get_httpfs_extension).
+DUCKDB_EXTENSION_DIRECTORY = '/opt/duckdb_extensions'
+INSTALL_DUCKDB_EXTENSIONS = (
+    f"SET extension_directory = '{DUCKDB_EXTENSION_DIRECTORY}'; INSTALL httpfs;"
+)
+
+# Resources reserved for the daily pipeline and the backfill. The parse pool
+# gets one process per reserved core: os.cpu_count() in a Modal container is
+# the host's core count, not what the container may use.
+FUNCTION_CPU = 4.0
+FUNCTION_MEMORY_MIB = 4096
+
+# Image shared by the daily pipeline (app.py) and the backfill (backfill.py)
+modal_image = (
+    modal.Image.debian_slim(python_version='3.12')
+    .pip_install_from_pyproject('pyproject.toml')
+    .env(
+        {
+            'DUCKDB_EXTENSION_DIRECTORY': DUCKDB_EXTENSION_DIRECTORY,
+            'PARSE_WORKERS': str(int(FUNCTION_CPU)),
+        }
+    )
+    .run_commands(
+        f'python -c "import duckdb; duckdb.execute(\\"{INSTALL_DUCKDB_EXTENSIONS}\\")"'
+    )
+    .add_local_file(
+        'src/duckdb_databases/.gitkeep',
+        remote_path='/root/src/duckdb_databases/.gitkeep',
+        copy=True,
+    )
+    .add_local_dir(
+        'src/sqlmesh_project/',
+        remote_path='/root/src/sqlmesh_project',
+    )
+    .add_local_python_source('src')
+)
@@ -0,0 +1,146 @@
+import datetime
+import logging
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+SAMPLE_INTERVAL_SECONDS = 0.005
+TOP_N_ALLOCATIONS = 25
+
+_output_path: str | None = None
+_run_id: str | None = None
+
+
+def default_output_path() -> str:
+    """Profiles go to S3 by default so they survive the Modal container."""
+    from src.utils.s3_utils import get_storage_uri
+
+    return f'{get_storage_uri()}/profiles'
+
+
+def enable_profiling(output_path: str | None = None) -> None:
+    """Turn on profiling for every subsequent profile_stage() block.
+
+    Args:
+        output_path: Local directory or s3://bucket/prefix to write reports
+            to. Defaults to default_output_path().
+    """
+    global _output_path, _run_id
+    _output_path = (output_path or default_output_path()).rstrip('/')
+    _run_id = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    logging.info(f'Profiling enabled, writing reports to {_output_path}/{_run_id}.')
+
+
+def disable_profiling() -> None:
+    global _output_path, _run_id
+    _output_path = None
+    _run_id = None
+
+
+class _StackSampler(threading.Thread):
+    """Periodically samples the Python stacks of all other threads.
+
+    Samples are kept as folded stacks ("outer;inner;leaf" -> count), the
+    input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_SECONDS):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            thread_names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f'{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})'
+                    )
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _write_artifact(name: str, content: str) -> str:
+    path = f'{_output_path}/{_run_id}/{name}'
+    if path.startswith('s3://'):
+        from src.utils.s3_utils import get_s3_filesystem
+
+        with get_s3_filesystem().open(path.removeprefix('s3://'), 'wb') as f:
+            f.write(content.encode('utf-8'))
+    else:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(content)
+    return path
+
+
+def _format_allocations(
+    snapshot: tracemalloc.Snapshot, peak_bytes: int, top_n: int
+) -> str:
+    stats = snapshot.statistics('lineno')
+    lines = [
+        f'Peak traced memory: {peak_bytes / 1024 / 1024:.1f} MiB',
+        f'Top {top_n} allocation sites still held at stage end:',
+    ]
+    lines.extend(str(stat) for stat in stats[:top_n])
+    return '\n'.join(lines) + '\n'
+
+
+@contextmanager
+def profile_stage(stage: str, **labels) -> Iterator[None]:
+    """Profile the wrapped block if profiling is enabled, otherwise do nothing.
+
+    Writes <stage>[-<label>...].folded (sampled stacks for flame graphs) and
+    <stage>[-<label>...].allocations.txt (tracemalloc peak and top-N sites).
+
+    Only this process is sampled. Release pages are parsed in the process
+    pool of src/etl/extract/stages.py, so their parsing shows up as the
+    dispatch thread waiting in _collect, not as parser frames; profile the
+    parsers in-process with benchmarks/parsers.py.
+    """
+    if _output_path is None:
+        yield
+        return
+
+    name = '-'.join([stage, *(str(v) for v in labels.values())])
+    sampler = _StackSampler()
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+        try:
+            folded = '\n'.join(
+                f'{stack} {count}' for stack, count in sampler.samples.most_common()
+            )
+            _write_artifact(f'{name}.folded', folded + '\n')
+            path = _write_artifact(
+                f'{name}.allocations.txt',
+                _format_allocations(snapshot, peak_bytes, TOP_N_ALLOCATIONS),
+            )
+            logging.info(f'Wrote {name} profile next to {path}.')
+        except Exception as e:
+            logging.warning(f'Could not write {name} profile: {e}')
@@ -1,18 +1,127 @@
+import json
 import logging
 import os
 from pathlib import Path
-
-import duckdb
-import s3fs
-from pandas import DataFrame
+from typing import TYPE_CHECKING
 
 from src import database_name
+from src.utils.metrics import metrics
+
+# duckdb, s3fs, pandas and pyarrow are imported where they are used: this
+# module is imported by every entry point, and those imports dominate cold start.
+if TYPE_CHECKING:
+    import pyarrow as pa
+    from fsspec import AbstractFileSystem
+    from pandas import DataFrame
+
+
+def get_httpfs_extension() -> str:
+    '''
+    The httpfs extension to INSTALL and LOAD in DuckDB.
+
+    The Modal image pre-installs httpfs into DUCKDB_EXTENSION_DIRECTORY at
+    build time, so containers load it from disk instead of downloading it
+    from the extension repository on every cold start. Without that
+    directory (local development) the extension is installed by name.
+
+    Returns:
+        Quoted path of the bundled extension file, or 'httpfs'
+    '''
+    extension_directory = os.getenv('DUCKDB_EXTENSION_DIRECTORY')
+    if not extension_directory:
+        return 'httpfs'
+
+    import duckdb
+
+    bundled = sorted(
+        Path(extension_directory).glob(
+            f'v{duckdb.__version__}/*/httpfs.duckdb_extension'
+        )
+    )
+    if not bundled:
+        logging.warning(
+            f'No httpfs extension for DuckDB {duckdb.__version__} in '
+            f'{extension_directory}; installing it from the repository.'
+        )
+        return 'httpfs'
+    return f"'{bundled[0]}'"
+
+
+def get_local_storage_root() -> Path | None:
+    '''
+    Local directory standing in for S3, if LOCAL_STORAGE_ROOT is set.
+
+    Buckets are subdirectories of this root, so s3://bucket/key is stored at
+    $LOCAL_STORAGE_ROOT/bucket/key. Used for offline runs such as the replay
+    benchmark.
+
+    Returns:
+        Absolute path of the local storage root, or None when using S3
+    '''
+    local_root = os.getenv('LOCAL_STORAGE_ROOT')
+    return Path(local_root).resolve() if local_root else None
+
+
+def get_bucket_root(bucket_name: str | None = None) -> str:
+    '''
+    Filesystem path of a bucket for use with get_s3_filesystem().
+
+    Args:
+        bucket_name: S3 bucket name (defaults to S3_BUCKET environment variable)
+
+    Returns:
+        The bucket name on S3, or the bucket directory under LOCAL_STORAGE_ROOT
+    '''
+    if not bucket_name:
+        bucket_name = os.getenv('S3_BUCKET')
+
+    local_root = get_local_storage_root()
+    return f'{local_root}/{bucket_name}' if local_root else bucket_name
+
+
+def get_storage_uri(bucket_name: str | None = None) -> str:
+    '''
+    URI of a bucket for DuckDB and SQLMesh (s3://bucket or a local path).
+
+    Args:
+        bucket_name: S3 bucket name (defaults to S3_BUCKET environment variable)
+
+    Returns:
+        s3://bucket_name, or the bucket directory under LOCAL_STORAGE_ROOT
+    '''
+    bucket_root = get_bucket_root(bucket_name)
+    return bucket_root if get_local_storage_root() else f's3://{bucket_root}'
+
+
+def get_s3_filesystem() -> 'AbstractFileSystem':
+    '''
+    Create an s3fs filesystem from the S3_* environment variables.
+
+    Returns a local filesystem instead when LOCAL_STORAGE_ROOT is set; paths
+    should be built with get_bucket_root() so they work with either.
+
+    Returns:
+        Configured S3FileSystem, or LocalFileSystem
+    '''
+    if get_local_storage_root():
+        from fsspec.implementations.local import LocalFileSystem
+
+        return LocalFileSystem(auto_mkdir=True)
+
+    import s3fs
+
+    return s3fs.S3FileSystem(
+        key=os.getenv('S3_ACCESS_KEY_ID'),
+        secret=os.getenv('S3_SECRET_ACCESS_KEY'),
+        endpoint_url=f'https://{os.getenv("S3_ENDPOINT")}',
+        client_kwargs={'region_name': os.getenv('S3_REGION')},
+    )
 
 
 def get_df_from_s3_parquet(
     s3_path: str,
     bucket_name: str | None = None,
-) -> DataFrame:
+) -> 'DataFrame':
     '''
     Read DataFrame from S3 Parquet files using DuckDB.
 
@@ -26,73 +135,90 @@ def get_df_from_s3_parquet(
     if not bucket_name:
         bucket_name = os.getenv('S3_BUCKET')
 
-    logging.info(f'Reading DataFrame from s3://{bucket_name}/{s3_path}')
+    uri = f'{get_storage_uri(bucket_name)}/{s3_path}'
+    logging.info(f'Reading DataFrame from {uri}')
 
-    endpoint = os.getenv('S3_ENDPOINT')
-    endpoint_url = (
-        f'{endpoint}'
-        if not endpoint.startswith('http')
-        else endpoint.replace('https://', '').replace('http://', '')
-    )
+    import duckdb
 
     con = duckdb.connect()
-    con.execute('INSTALL httpfs; LOAD httpfs;')
-    con.execute(
-        f"""
-        CREATE SECRET s3_secret (
-            TYPE S3,
-            KEY_ID '{os.getenv('S3_ACCESS_KEY_ID')}',
-            SECRET '{os.getenv('S3_SECRET_ACCESS_KEY')}',
-            REGION '{os.getenv('S3_REGION')}',
-            ENDPOINT '{endpoint_url}',
-            URL_STYLE 'path',
-            USE_SSL true
-        );
-        """
-    )
-
-    query = f"SELECT * FROM read_parquet('s3://{bucket_name}/{s3_path}')"
+    if not get_local_storage_root():
+        endpoint = os.getenv('S3_ENDPOINT')
+        endpoint_url = (
+            f'{endpoint}'
+            if not endpoint.startswith('http')
+            else endpoint.replace('https://', '').replace('http://', '')
+        )
+
+        httpfs = get_httpfs_extension()
+        con.execute(f'INSTALL {httpfs}; LOAD {httpfs};')
+        con.execute(
+            f"""
+            CREATE SECRET s3_secret (
+                TYPE S3,
+                KEY_ID '{os.getenv('S3_ACCESS_KEY_ID')}',
+                SECRET '{os.getenv('S3_SECRET_ACCESS_KEY')}',
+                REGION '{os.getenv('S3_REGION')}',
+                ENDPOINT '{endpoint_url}',
+                URL_STYLE 'path',
+                USE_SSL true
+            );
+            """
+        )
+
+    query = f"SELECT * FROM read_parquet('{uri}')"
     df = con.execute(query).df()
+    metrics.increment('s3_get_requests')
 
-    logging.info(f'Read {len(df)} rows from s3://{bucket_name}/{s3_path}')
+    logging.info(f'Read {len(df)} rows from {uri}')
     return df
 
 
-def find_latest_partition(
+def list_partitions(
     prefix: str,
     bucket_name: str | None = None,
-) -> str | None:
+) -> list[str]:
     '''
-    Find the latest scraped_date partition under an S3 prefix.
+    List the scraped_date partitions under an S3 prefix, oldest first.
 
     Args:
         prefix: S3 prefix (e.g., 'raw/release_id_lookup/release_year=2026')
         bucket_name: S3 bucket name (defaults to S3_BUCKET environment variable)
 
     Returns:
-        Relative S3 path to the latest partition, or None if no partitions exist.
+        Relative S3 paths of the partitions. Empty if none exist.
     '''
     if not bucket_name:
         bucket_name = os.getenv('S3_BUCKET')
 
-    fs = s3fs.S3FileSystem(
-        key=os.getenv('S3_ACCESS_KEY_ID'),
-        secret=os.getenv('S3_SECRET_ACCESS_KEY'),
-        endpoint_url=f'https://{os.getenv("S3_ENDPOINT")}',
-        client_kwargs={'region_name': os.getenv('S3_REGION')},
-    )
+    fs = get_s3_filesystem()
+    bucket_root = get_bucket_root(bucket_name)
 
+    metrics.increment('s3_list_requests')
     try:
-        entries = fs.ls(f'{bucket_name}/{prefix}', detail=False)
+        entries = fs.ls(f'{bucket_root}/{prefix}', detail=False)
     except FileNotFoundError:
-        return None
-
-    if not entries:
-        return None
+        return []
 
     # scraped_date=YYYY-MM-DD sorts lexicographically
-    latest = sorted(entries)[-1]
-    return latest.removeprefix(f'{bucket_name}/')
+    return [entry.removeprefix(f'{bucket_root}/') for entry in sorted(entries)]
+
+
+def find_latest_partition(
+    prefix: str,
+    bucket_name: str | None = None,
+) -> str | None:
+    '''
+    Find the latest scraped_date partition under an S3 prefix.
+
+    Args:
+        prefix: S3 prefix (e.g., 'raw/release_id_lookup/release_year=2026')
+        bucket_name: S3 bucket name (defaults to S3_BUCKET environment variable)
+
+    Returns:
+        Relative S3 path to the latest partition, or None if no partitions exist.
+    '''
+    partitions = list_partitions(prefix, bucket_name=bucket_name)
+    return partitions[-1] if partitions else None
 
 
 def list_year_partitions(
@@ -113,14 +239,11 @@ def list_year_partitions(
     if not bucket_name:
         bucket_name = os.getenv('S3_BUCKET')
 
-    fs = s3fs.S3FileSystem(
-        key=os.getenv('S3_ACCESS_KEY_ID'),
-        secret=os.getenv('S3_SECRET_ACCESS_KEY'),
-        endpoint_url=f'https://{os.getenv("S3_ENDPOINT")}',
-        client_kwargs={'region_name': os.getenv('S3_REGION')},
-    )
+    fs = get_s3_filesystem()
+    bucket_root = get_bucket_root(bucket_name)
 
-    prefix = f'{bucket_name}/raw/{extract_name}'
+    prefix = f'{bucket_root}/raw/{extract_name}'
+    metrics.increment('s3_list_requests')
     try:
         entries = fs.ls(prefix, detail=False)
     except FileNotFoundError:
@@ -137,8 +260,126 @@ def list_year_partitions(
     return years
 
 
+def list_partition_values(
+    prefix: str,
+    key: str,
+    bucket_name: str | None = None,
+) -> set[str]:
+    '''
+    List the values of the key=value partitions directly under an S3 prefix.
+
+    Args:
+        prefix: S3 prefix (e.g., 'raw/release_domestic')
+        key: Partition key (e.g., 'release_id')
+        bucket_name: S3 bucket name (defaults to S3_BUCKET env var)
+
+    Returns:
+        Set of values (e.g., release IDs) that have a partition.
+    '''
+    if not bucket_name:
+        bucket_name = os.getenv('S3_BUCKET')
+
+    fs = get_s3_filesystem()
+    bucket_root = get_bucket_root(bucket_name)
+
+    metrics.increment('s3_list_requests')
+    try:
+        entries = fs.ls(f'{bucket_root}/{prefix}', detail=False)
+    except FileNotFoundError:
+        return set()
+
+    return {
+        part.split('=', 1)[1]
+        for part in (entry.rstrip('/').split('/')[-1] for entry in entries)
+        if part.startswith(f'{key}=')
+    }
+
+
+def delete_s3_prefix(
+    prefix: str,
+    bucket_name: str | None = None,
+) -> None:
+    '''
+    Delete every object under an S3 prefix.
+
+    Args:
+        prefix: S3 prefix (e.g., 'published_tables/daily_ranks/v2/loaded_date=...')
+        bucket_name: S3 bucket name (defaults to S3_BUCKET env var)
+    '''
+    if not bucket_name:
+        bucket_name = os.getenv('S3_BUCKET')
+
+    fs = get_s3_filesystem()
+    bucket_root = get_bucket_root(bucket_name)
+
+    metrics.increment('s3_delete_requests')
+    try:
+        fs.rm(f'{bucket_root}/{prefix}', recursive=True)
+    except FileNotFoundError:
+        return
+
+
+def s3_object_exists(
+    s3_key: str,
+    bucket_name: str | None = None,
+) -> bool:
+    '''
+    Check whether an S3 object exists.
+
+    Args:
+        s3_key: S3 key path (including the extension)
+        bucket_name: S3 bucket name (defaults to S3_BUCKET environment variable)
+
+    Returns:
+        True if the object exists
+    '''
+    if not bucket_name:
+        bucket_name = os.getenv('S3_BUCKET')
+
+    fs = get_s3_filesystem()
+    bucket_root = get_bucket_root(bucket_name)
+
+    metrics.increment('s3_list_requests')
+    return fs.exists(f'{bucket_root}/{s3_key}')
+
+
+def list_s3_object_etags(
+    prefix: str,
+    bucket_name: str | None = None,
+) -> dict[str, str]:
+    '''
+    List every object under an S3 prefix with its ETag.
+
+    Args:
+        prefix: S3 prefix (e.g., 'raw/worldwide_box_office')
+        bucket_name: S3 bucket name (defaults to S3_BUCKET environment variable)
+
+    Returns:
+        Dict of relative S3 key to ETag. Empty if the prefix does not exist.
+    '''
+    if not bucket_name:
+        bucket_name = os.getenv('S3_BUCKET')
+
+    fs = get_s3_filesystem()
+    bucket_root = get_bucket_root(bucket_name)
+
+    metrics.increment('s3_list_requests')
+    try:
+        entries = fs.find(f'{bucket_root}/{prefix}', detail=True)
+    except FileNotFoundError:
+        return {}
+
+    return {
+        path.removeprefix(f'{bucket_root}/'): str(
+            # Local files have no ETag; their mtime changes on every rewrite
+            info.get('ETag', info.get('mtime', info.get('size')))
+        )
+        for path, info in entries.items()
+    }
+
+
 def load_df_to_s3_parquet(
-    df: DataFrame,
+    df: 'DataFrame',
     s3_key: str,
     bucket_name: str | None = None,
 ) -> int:
@@ -158,22 +399,16 @@ def load_df_to_s3_parquet(
 
     logging.info(f'Loading DataFrame to s3://{bucket_name}/{s3_key}.parquet')
 
-    access_key_id = os.getenv('S3_ACCESS_KEY_ID')
-    secret_access_key = os.getenv('S3_SECRET_ACCESS_KEY')
-    endpoint = os.getenv('S3_ENDPOINT')
-    region = os.getenv('S3_REGION')
-
-    fs = s3fs.S3FileSystem(
-        key=access_key_id,
-        secret=secret_access_key,
-        endpoint_url=f'https://{endpoint}',
-        client_kwargs={'region_name': region},
-    )
+    fs = get_s3_filesystem()
+    bucket_root = get_bucket_root(bucket_name)
 
-    s3_file = f'{bucket_name}/{s3_key}.parquet'
+    s3_file = f'{bucket_root}/{s3_key}.parquet'
 
     with fs.open(s3_file, 'wb') as f:
         df.to_parquet(f, engine='pyarrow', index=False)
+        bytes_written = f.tell()
+    metrics.increment('s3_put_requests')
+    metrics.increment('s3_put_bytes', bytes_written)
 
     rows_loaded = len(df)
     logging.info(
@@ -183,12 +418,102 @@ def load_df_to_s3_parquet(
     return rows_loaded
 
 
+def load_arrow_table_to_s3_parquet(
+    table: 'pa.Table',
+    s3_key: str,
+    bucket_name: str | None = None,
+    dictionary_columns: list[str] | None = None,
+    compression: str = 'snappy',
+    compression_level: int | None = None,
+) -> int:
+    '''
+    Load a pyarrow Table directly to S3 as Parquet.
+
+    Args:
+        table: Table to upload
+        s3_key: S3 key path (without .parquet extension)
+        bucket_name: S3 bucket name (defaults to S3_BUCKET environment variable)
+        dictionary_columns: Columns to dictionary-encode; the others are
+            written plain (defaults to dictionary-encoding every column)
+        compression: Parquet compression codec (e.g. 'snappy', 'zstd')
+        compression_level: Codec level (defaults to the codec's default)
+
+    Returns:
+        Number of rows loaded
+    '''
+    import pyarrow.parquet as pq
+
+    if not bucket_name:
+        bucket_name = os.getenv('S3_BUCKET')
+
+    logging.info(f'Loading table to s3://{bucket_name}/{s3_key}.parquet')
+
+    fs = get_s3_filesystem()
+    bucket_root = get_bucket_root(bucket_name)
+
+    s3_file = f'{bucket_root}/{s3_key}.parquet'
+
+    with fs.open(s3_file, 'wb') as f:
+        pq.write_table(
+            table,
+            f,
+            use_dictionary=True if dictionary_columns is None else dictionary_columns,
+            compression=compression,
+            compression_level=compression_level,
+        )
+        bytes_written = f.tell()
+    metrics.increment('s3_put_requests')
+    metrics.increment('s3_put_bytes', bytes_written)
+
+    rows_loaded = table.num_rows
+    logging.info(
+        f'Updated s3://{bucket_name}/{s3_key}.parquet with {rows_loaded} rows.'
+    )
+
+    return rows_loaded
+
+
+def read_arrow_table_from_s3_parquet(
+    s3_key: str,
+    bucket_name: str | None = None,
+) -> 'pa.Table | None':
+    '''
+    Read one Parquet object from S3 as a pyarrow Table.
+
+    Args:
+        s3_key: S3 key path (including the .parquet extension)
+        bucket_name: S3 bucket name (defaults to S3_BUCKET environment variable)
+
+    Returns:
+        Table with the file's own schema, or None if the object does not exist.
+    '''
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if not bucket_name:
+        bucket_name = os.getenv('S3_BUCKET')
+
+    fs = get_s3_filesystem()
+    bucket_root = get_bucket_root(bucket_name)
+
+    try:
+        with fs.open(f'{bucket_root}/{s3_key}', 'rb') as f:
+            body = f.read()
+    except FileNotFoundError:
+        return None
+
+    metrics.increment('s3_get_requests')
+    metrics.increment('s3_get_bytes', len(body))
+    return pq.read_table(pa.BufferReader(body))
+
+
 def load_duckdb_table_to_s3_parquet(
     database_path: Path | str,
     table_name: str,
     s3_key: str,
     schema_name: str,
     bucket_name: str | None = None,
+    where: str | None = None,
 ) -> int:
     '''
     Load DuckDB table to S3 as Parquet by querying to DataFrame first.
@@ -199,6 +524,7 @@ def load_duckdb_table_to_s3_parquet(
         s3_key: S3 key path (without .parquet extension)
         schema_name: Schema name (e.g., 'published')
         bucket_name: S3 bucket name (defaults to S3_BUCKET environment variable)
+        where: Optional SQL predicate to filter the rows that are exported
 
     Returns:
         Number of rows loaded
@@ -212,7 +538,72 @@ def load_duckdb_table_to_s3_parquet(
 
     database_path_str = str(database_path)
 
+    query = f'select * from {database_name}.{schema_name}.{table_name}'
+    if where:
+        query += f' where {where}'
+
+    import duckdb
+
     with duckdb.connect(database=database_path_str) as con:
-        df = con.query(f'select * from {database_name}.{schema_name}.{table_name}').df()
+        df = con.query(query).df()
 
     return load_df_to_s3_parquet(df=df, s3_key=s3_key, bucket_name=bucket_name)
+
+
+def read_json_from_s3(
+    s3_key: str,
+    bucket_name: str | None = None,
+) -> dict | None:
+    '''
+    Read a JSON object from S3.
+
+    Args:
+        s3_key: S3 key path (including the .json extension)
+        bucket_name: S3 bucket name (defaults to S3_BUCKET environment variable)
+
+    Returns:
+        Parsed JSON object, or None if the object does not exist.
+    '''
+    if not bucket_name:
+        bucket_name = os.getenv('S3_BUCKET')
+
+    fs = get_s3_filesystem()
+    bucket_root = get_bucket_root(bucket_name)
+
+    try:
+        with fs.open(f'{bucket_root}/{s3_key}', 'rb') as f:
+            body = f.read()
+    except FileNotFoundError:
+        return None
+
+    metrics.increment('s3_get_requests')
+    metrics.increment('s3_get_bytes', len(body))
+    return json.loads(body)
+
+
+def write_json_to_s3(
+    data: dict,
+    s3_key: str,
+    bucket_name: str | None = None,
+) -> None:
+    '''
+    Write a JSON object to S3.
+
+    Args:
+        data: JSON-serializable object to upload
+        s3_key: S3 key path (including the .json extension)
+        bucket_name: S3 bucket name (defaults to S3_BUCKET environment variable)
+    '''
+    if not bucket_name:
+        bucket_name = os.getenv('S3_BUCKET')
+
+    fs = get_s3_filesystem()
+    bucket_root = get_bucket_root(bucket_name)
+
+    body = json.dumps(data, indent=2, sort_keys=True).encode('utf-8')
+    with fs.open(f'{bucket_root}/{s3_key}', 'wb') as f:
+        f.write(body)
+    metrics.increment('s3_put_requests')
+    metrics.increment('s3_put_bytes', len(body))
+
+    logging.info(f'Updated s3://{bucket_name}/{s3_key}.')
@@ -1,17 +1,28 @@
+import datetime
+import functools
 import logging
+import os
 import time
+from urllib.parse import urlsplit, urlunsplit
 
 import requests
 from bs4 import BeautifulSoup
 
+from src.utils.metrics import metrics
+
 BOX_OFFICE_MOJO_UA = (
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) '
     'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 )
 
-DEFAULT_REQUEST_DELAY = 1.0
+# Overridable so the replay benchmark can point the scrapers at a local
+# fixture server without the politeness delays meant for the real site.
+BOX_OFFICE_MOJO_BASE = os.getenv(
+    'BOX_OFFICE_MOJO_BASE', 'https://www.boxofficemojo.com'
+).rstrip('/')
+DEFAULT_REQUEST_DELAY = float(os.getenv('SCRAPE_REQUEST_DELAY', '1.0'))
 MAX_RETRIES = 3
-INITIAL_BACKOFF = 2.0
+INITIAL_BACKOFF = float(os.getenv('SCRAPE_INITIAL_BACKOFF', '2.0'))
 
 
 def create_scrape_session() -> requests.Session:
@@ -26,18 +37,45 @@ def create_scrape_session() -> requests.Session:
     return session
 
 
-def get_soup(
+@functools.cache
+def get_scrape_session() -> requests.Session:
+    """Return the session shared by the scrapers, creating it on first use."""
+    return create_scrape_session()
+
+
+def canonicalize(url: str | None) -> str | None:
+    """URL without its query string and fragment (e.g. ?ref_=...)."""
+    if not url:
+        return None
+
+    p = urlsplit(url)
+    return urlunsplit((p.scheme, p.netloc, p.path, '', ''))
+
+
+def make_soup(html: str | bytes) -> BeautifulSoup:
+    """Parse HTML with the lxml parser used for all Box Office Mojo pages."""
+    return BeautifulSoup(html, 'lxml')
+
+
+def get_html(
     session: requests.Session,
     url: str,
     max_retries: int = MAX_RETRIES,
     initial_backoff: float = INITIAL_BACKOFF,
-) -> BeautifulSoup:
-    """Fetch a URL and return parsed HTML with retry + exponential backoff on 503s."""
+) -> str:
+    """Fetch a URL and return its HTML with retry + exponential backoff on 503s."""
     for attempt in range(max_retries + 1):
+        start = time.perf_counter()
         r = session.get(url, timeout=30)
+        metrics.observe('http_latency_seconds', time.perf_counter() - start)
+        metrics.increment('http_requests')
+        metrics.increment('http_bytes', len(r.content))
+        if r.status_code == 503:
+            metrics.increment('http_503s')
+
         if r.status_code != 503 or attempt == max_retries:
             r.raise_for_status()
-            return BeautifulSoup(r.text, 'lxml')
+            return r.text
 
         wait = initial_backoff * (2**attempt)
         logging.warning(
@@ -48,4 +86,29 @@ def get_soup(
 
     # Should not reach here, but satisfy type checker
     r.raise_for_status()
-    return BeautifulSoup(r.text, 'lxml')
+    return r.text
+
+
+def get_soup(
+    session: requests.Session,
+    url: str,
+    max_retries: int = MAX_RETRIES,
+    initial_backoff: float = INITIAL_BACKOFF,
+) -> BeautifulSoup:
+    """Fetch a URL and return parsed HTML with retry + exponential backoff on 503s."""
+    return make_soup(get_html(session, url, max_retries, initial_backoff))
+
+
+@functools.lru_cache(maxsize=4)
+def _year_world_html(year: int, day: datetime.date) -> str:
+    return get_html(get_scrape_session(), f'{BOX_OFFICE_MOJO_BASE}/year/world/{year}/')
+
+
+def get_year_world_html(year: int) -> str:
+    """HTML of a year/world page, downloaded once per process and day.
+
+    worldwide_box_office parses its table and release_id_lookup its release
+    group links, so the two extracts share one download. Failed downloads
+    are not cached.
+    """
+    return _year_world_html(year, datetime.date.today())